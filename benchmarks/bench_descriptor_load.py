@@ -0,0 +1,102 @@
+"""Compares loading a large descriptor set from the JSON and the binary formats.
+
+Usage: python benchmarks/bench_descriptor_load.py [messages] [fields] [repeat]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+from google.protobuf.descriptor_pb2 import FieldDescriptorProto, FileDescriptorProto, FileDescriptorSet
+
+from pyease_grpc import Protobuf, _protocol
+
+TYPES = [
+    FieldDescriptorProto.TYPE_STRING,
+    FieldDescriptorProto.TYPE_INT64,
+    FieldDescriptorProto.TYPE_DOUBLE,
+    FieldDescriptorProto.TYPE_BOOL,
+]
+
+
+def build_descriptor(messages: int, fields: int) -> FileDescriptorSet:
+    proto = FileDescriptorProto(name="bench_descriptor_load.proto", package="bench.v1", syntax="proto3")
+    for i in range(messages):
+        message = proto.message_type.add(name=f"Message{i}")
+        for j in range(fields):
+            message.field.add(
+                name=f"field_{j}",
+                json_name=f"field{j}",
+                number=j + 1,
+                type=TYPES[j % len(TYPES)],
+                label=FieldDescriptorProto.LABEL_OPTIONAL,
+            )
+        if i:
+            message.field.add(
+                name="previous",
+                json_name="previous",
+                number=fields + 1,
+                type=FieldDescriptorProto.TYPE_MESSAGE,
+                type_name=f".bench.v1.Message{i - 1}",
+                label=FieldDescriptorProto.LABEL_REPEATED,
+            )
+    service = proto.service.add(name="BenchService")
+    for i in range(0, messages, 2):
+        service.method.add(name=f"Call{i}", input_type=f".bench.v1.Message{i}", output_type=f".bench.v1.Message{i}")
+    return FileDescriptorSet(file=[proto])
+
+
+def measure(load, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    fields = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    proto = Protobuf(build_descriptor(messages, fields))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_file = os.path.join(tmp_dir, "descriptor.json")
+        binary_file = os.path.join(tmp_dir, "descriptor.bin")
+        proto.save_file(json_file)
+        proto.save_binary_file(binary_file)
+        print(f"{messages} messages of {fields} fields")
+        print(f"{'json':>12}: {os.path.getsize(json_file) / (1 << 20):8.2f} MiB")
+        print(f"{'binary':>12}: {os.path.getsize(binary_file) / (1 << 20):8.2f} MiB")
+
+        def parse_json():
+            with open(json_file, encoding="utf8") as fp:
+                return _protocol.parse_message(FileDescriptorSet, json.load(fp))
+
+        def parse_binary():
+            with open(binary_file, "rb") as fp:
+                return FileDescriptorSet.FromString(fp.read())
+
+        assert parse_json() == parse_binary() == proto.descriptor
+
+        print("Parsing the descriptor set")
+        report(("json", measure(parse_json, repeat)), ("binary", measure(parse_binary, repeat)))
+
+        print("Protobuf.restore_file")
+        report(
+            ("json", measure(lambda: Protobuf.restore_file(json_file), repeat)),
+            ("binary", measure(lambda: Protobuf.restore_file(binary_file), repeat)),
+            ("binary mmap", measure(lambda: Protobuf.restore_file(binary_file, use_mmap=True), repeat)),
+        )
+
+
+def report(baseline: tuple, *others: tuple):
+    for label, elapsed in [baseline, *others]:
+        print(f"{label:>12}: {elapsed * 1000:8.2f} ms {baseline[1] / elapsed:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
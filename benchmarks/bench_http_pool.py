@@ -0,0 +1,110 @@
+"""Compares the throughput of gRPC-Web unary calls by thread count and connection pool size.
+
+Runs a local HTTP/1.1 server, which waits `delay` milliseconds before each response,
+and counts the connections opened by each configuration of the session.
+
+Usage: python benchmarks/bench_http_pool.py [calls] [delay_ms] [max_threads]
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+import sys
+import threading
+import time
+
+from pyease_grpc import Protobuf, RpcSession, RpcUri, _protocol
+
+PROTO = """
+syntax = "proto3";
+
+package bench.v1;
+
+message Request {
+  string name = 1;
+}
+
+message Reply {
+  string message = 1;
+}
+
+service Greeter {
+  rpc SayHello (Request) returns (Reply);
+}
+"""
+
+
+def start_server(delay: float):
+    body = _protocol.wrap_message(b"\n\x05hello")
+    body += _protocol.wrap_message(b"grpc-status:0\r\n", trailer=True)
+    connections = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+        wbufsize = 1 << 16
+
+        def setup(self):
+            super().setup()
+            connections.append(self.client_address)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/grpc-web+proto")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.request_queue_size = 256
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, connections
+
+
+def measure(proto: Protobuf, uri: RpcUri, calls: int, threads: int, **kwargs) -> float:
+    with RpcSession(proto, **kwargs) as session:
+        start = time.perf_counter()
+        batch = session.request_many([(uri, {"name": "world"})] * calls, concurrency=threads)
+        failed = sum(not result.ok for result in batch)
+        elapsed = time.perf_counter() - start
+    assert not failed, f"{failed} calls failed"
+    return elapsed
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    delay = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.002
+    max_threads = int(sys.argv[3]) if len(sys.argv) > 3 else 64
+
+    # The default pool logs a warning for every discarded connection
+    logging.getLogger("urllib3").setLevel(logging.ERROR)
+
+    proto = Protobuf.from_proto(PROTO, "bench_http_pool")
+    server, connections = start_server(delay)
+    uri = RpcUri(f"http://127.0.0.1:{server.server_port}", "bench.v1", "Greeter", "SayHello")
+    print(f"{calls} calls, {delay * 1000:.1f} ms server delay")
+    print(f"{'threads':>8} {'session':>12} {'calls/s':>10} {'connections':>12}")
+
+    threads = 1
+    while threads <= max_threads:
+        for label, kwargs in [
+            ("default", {}),
+            ("pooled", {"pool_maxsize": threads}),
+            ("thread-safe", {"pool_maxsize": threads, "thread_safe": True}),
+        ]:
+            del connections[:]
+            elapsed = measure(proto, uri, calls, threads, **kwargs)
+            print(f"{threads:>8} {label:>12} {calls / elapsed:10.0f} {len(connections):>12}")
+        threads *= 2
+
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
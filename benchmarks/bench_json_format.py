@@ -0,0 +1,104 @@
+"""Compares json_format.ParseDict and MessageToDict with the compiled converters.
+
+Usage: python benchmarks/bench_json_format.py [children] [depth] [repeat]
+"""
+
+import sys
+import time
+
+from google.protobuf import json_format
+
+from pyease_grpc import _json_format
+from pyease_grpc.protobuf import Protobuf
+
+PROTO = """
+syntax = "proto3";
+
+package bench.v1;
+
+enum Kind {
+  KIND_UNSPECIFIED = 0;
+  FILE = 1;
+  FOLDER = 2;
+}
+
+message Node {
+  string name = 1;
+  int64 size = 2;
+  double score = 3;
+  bool hidden = 4;
+  Kind kind = 5;
+  repeated string tags = 6;
+  map<string, string> labels = 7;
+  repeated Node children = 8;
+}
+"""
+
+
+def build_tree(children: int, depth: int) -> dict:
+    node = {
+        "name": "node",
+        "size": "1234567890123",
+        "score": 0.5,
+        "hidden": False,
+        "kind": "FILE",
+        "tags": ["a", "b", "c"],
+        "labels": {"owner": "me", "group": "us"},
+    }
+    if depth > 1:
+        node["kind"] = "FOLDER"
+        node["children"] = [build_tree(children, depth - 1) for _ in range(children)]
+    return node
+
+
+def measure(parse, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    children = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    node_type = Protobuf.from_proto(PROTO, "bench_json_format").messages["bench.v1.Node"]
+    data = build_tree(children, depth)
+
+    expected = json_format.ParseDict(data, node_type())
+    assert _json_format.parse_dict(node_type, data) == expected
+    nodes = sum(children**i for i in range(depth))
+    print(f"{nodes} nodes, {expected.ByteSize()} bytes")
+
+    baseline = measure(lambda: json_format.ParseDict(data, node_type(), ignore_unknown_fields=True), repeat)
+    compiled = measure(lambda: _json_format.parse_dict(node_type, data), repeat)
+    report(nodes, ("ParseDict", baseline), ("compiled", compiled))
+
+    kwargs = {_json_format._PRINT_DEFAULTS: True}
+    assert _json_format.message_to_dict(expected) == json_format.MessageToDict(expected, **kwargs)
+    baseline = measure(lambda: json_format.MessageToDict(expected, **kwargs), repeat)
+    compiled = measure(lambda: _json_format.message_to_dict(expected), repeat)
+    report(nodes, ("MessageToDict", baseline), ("compiled", compiled))
+
+    # Reading two fields of the root, as consumers of large responses often do
+    def read_view():
+        view = _json_format.MessageView(expected)
+        return view["name"], view["size"]
+
+    report(nodes, ("compiled", compiled), ("MessageView", measure(read_view, repeat)))
+
+    project = _json_format.message_projector(node_type, ["name", "children.size"])
+    report(nodes, ("compiled", compiled), ("projection", measure(lambda: project(expected), repeat)))
+
+
+def report(nodes: int, baseline: tuple, other: tuple):
+    for label, elapsed in [baseline, other]:
+        print(f"{label:>13}: {elapsed * 1000:8.2f} ms {nodes / elapsed:12.0f} nodes/s")
+    print(f"{'speedup':>13}: {baseline[1] / other[1]:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
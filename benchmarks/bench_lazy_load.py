@@ -0,0 +1,80 @@
+"""Measures the startup time and memory of a Protobuf with many messages.
+
+Compares making the Protobuf, looking up a few methods, and making every
+message class and method, as the Protobuf did before they were made lazily.
+
+Usage: python benchmarks/bench_lazy_load.py [messages] [fields] [methods]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from google.protobuf.descriptor_pb2 import FieldDescriptorProto, FileDescriptorProto, FileDescriptorSet
+
+from pyease_grpc import Protobuf
+
+
+def build_descriptor(messages: int, fields: int, package: str) -> FileDescriptorSet:
+    proto = FileDescriptorProto(name=package.replace(".", "_") + ".proto", package=package, syntax="proto3")
+    for i in range(messages):
+        message = proto.message_type.add(name=f"Message{i}")
+        for j in range(fields):
+            message.field.add(
+                name=f"field_{j}",
+                number=j + 1,
+                type=FieldDescriptorProto.TYPE_STRING if j % 2 else FieldDescriptorProto.TYPE_INT64,
+                label=FieldDescriptorProto.LABEL_OPTIONAL,
+            )
+    service = proto.service.add(name="BenchService")
+    for i in range(0, messages, 2):
+        service.method.add(
+            name=f"Call{i}", input_type=f".{package}.Message{i}", output_type=f".{package}.Message{i + 1}"
+        )
+    return FileDescriptorSet(file=[proto])
+
+
+def measure(label: str, load, fds: FileDescriptorSet):
+    start = time.perf_counter()
+    load(fds)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>10}: {elapsed * 1000:9.2f} ms", end="")
+
+
+def measure_memory(load, fds: FileDescriptorSet):
+    tracemalloc.start()
+    load(fds)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f" {peak / (1 << 20):9.2f} MiB")
+
+
+def lazy(fds: FileDescriptorSet, methods: int):
+    proto = Protobuf(fds)
+    service = proto.services["BenchService"]
+    for i in range(methods):
+        service[f"Call{2 * i}"]
+
+
+def eager(fds: FileDescriptorSet, methods: int):
+    proto = Protobuf(fds)
+    for service in proto.services.values():
+        list(service.values())
+    list(proto.messages.values())
+
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    fields = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    methods = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    print(f"{messages} messages of {fields} fields, {methods} methods used")
+
+    # Each run uses its own package, since the descriptor pool keeps the files it has loaded
+    for label, load in [("lazy", lazy), ("eager", eager)]:
+        load_methods = lambda fds: load(fds, methods)  # noqa: E731
+        measure(label, load_methods, build_descriptor(messages, fields, f"bench.{label}.time.v1"))
+        measure_memory(load_methods, build_descriptor(messages, fields, f"bench.{label}.memory.v1"))
+
+
+if __name__ == "__main__":
+    main()
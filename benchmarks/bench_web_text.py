@@ -0,0 +1,63 @@
+"""Compares decoding of binary and base64 text gRPC-Web response streams.
+
+Usage: python benchmarks/bench_web_text.py [message_size] [message_count]
+"""
+
+import io
+import os
+import sys
+import time
+
+from pyease_grpc import _protocol
+
+
+class FakeResponse(object):
+    def __init__(self, body: bytes, content_type: str) -> None:
+        self.body = body
+        self.headers = {"content-type": content_type}
+        self.raw = io.BytesIO(body)
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i : i + chunk_size]
+
+
+def build_stream(message_size: int, message_count: int) -> bytes:
+    message = _protocol.wrap_message(os.urandom(message_size))
+    trailer = _protocol.wrap_message(b"grpc-status:0\r\n", trailer=True)
+    return message * message_count + trailer
+
+
+def measure(body: bytes, content_type: str, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        response = FakeResponse(body, content_type)
+        start = time.perf_counter()
+        for _ in _protocol.unwrap_message_stream(response):
+            pass
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    message_size = int(sys.argv[1]) if len(sys.argv) > 1 else 64 << 10
+    message_count = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+
+    binary = build_stream(message_size, message_count)
+    text = b"".join(
+        _protocol.encode_text(_protocol.wrap_message(bytes(data), trailer=trailer))
+        for data, trailer, _ in _protocol.unwrap_message_stream(FakeResponse(binary, "application/grpc-web"))
+    )
+
+    megabytes = len(binary) / (1 << 20)
+    print(f"{message_count} messages of {message_size} bytes ({megabytes:.1f} MiB)")
+    for name, body, content_type in [
+        ("binary", binary, "application/grpc-web+proto"),
+        ("text", text, "application/grpc-web-text+proto"),
+    ]:
+        elapsed = measure(body, content_type)
+        print(f"{name:>8}: {elapsed * 1000:8.2f} ms {megabytes / elapsed:10.1f} MiB/s")
+
+
+if __name__ == "__main__":
+    main()
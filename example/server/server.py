@@ -5,6 +5,7 @@ import time
 from concurrent.futures import ThreadPoolExecutor
 
 import grpc
+from grpc_reflection.v1alpha import reflection
 
 try:
     path = os.path.realpath(os.path.abspath(__file__))
@@ -12,12 +13,13 @@ try:
     sys.path.insert(0, os.path.dirname(path))
     sys.path.insert(0, os.path.dirname(os.path.dirname(path)))
 
-    from abc_pb2 import HelloRequest, HelloResponse
+    from abc_pb2 import DESCRIPTOR, HelloRequest, HelloResponse
     from abc_pb2_grpc import GreeterServicer, add_GreeterServicer_to_server
 finally:
     pass
 
 NUMBER_OF_REPLY = 5
+SERVICE_NAMES = [DESCRIPTOR.services_by_name["Greeter"].full_name, reflection.SERVICE_NAME]
 
 
 class Greeter(GreeterServicer):
@@ -67,6 +69,7 @@ class Greeter(GreeterServicer):
 async def async_serve(listen_addr) -> None:
     server = grpc.aio.server()
     add_GreeterServicer_to_server(Greeter(), server)
+    reflection.enable_server_reflection(SERVICE_NAMES, server)
     server.add_insecure_port(listen_addr)
     print("Server started, listening on " + listen_addr)
     await server.start()
@@ -76,6 +79,7 @@ async def async_serve(listen_addr) -> None:
 def serve(listen_addr):
     server = grpc.server(ThreadPoolExecutor(max_workers=10))
     add_GreeterServicer_to_server(Greeter(), server)
+    reflection.enable_server_reflection(SERVICE_NAMES, server)
     server.add_insecure_port(listen_addr)
     print("Server started, listening on " + listen_addr)
     server.start()
@@ -2,10 +2,20 @@ __version__ = "1.8.0"
 
 from .generator import main
 from .protobuf import Protobuf
-from .rpc_response import RpcResponse
+from .rpc_batch import RpcBatch, RpcBatchResult, RpcBatchStats
+from .rpc_channel_pool import RpcChannelPool
+from .rpc_codec import RpcCodec, register_codec
+from .rpc_decode_pool import RpcDecodePool
+from .rpc_response import MessageView, RpcResponse
+from .rpc_response_async import AsyncRpcResponse
 from .rpc_response_native import RpcNativeResponse
+from .rpc_response_native_async import AsyncRpcNativeResponse
 from .rpc_response_web import RpcWebResponse
+from .rpc_response_web_async import AsyncRpcWebResponse
 from .rpc_session import RpcSession
+from .rpc_session_async import AsyncRpcSession
+from .rpc_stub import RpcStub
+from .rpc_transport import AsyncHttpResponse, AsyncHttpTransport, AsyncioHttpTransport
 from .rpc_uri import RpcUri
 
 __all__ = [
@@ -15,6 +25,22 @@ __all__ = [
     "Protobuf",
     "RpcSession",
     "RpcResponse",
+    "MessageView",
     "RpcWebResponse",
     "RpcNativeResponse",
+    "RpcChannelPool",
+    "RpcDecodePool",
+    "RpcStub",
+    "RpcBatch",
+    "RpcBatchResult",
+    "RpcBatchStats",
+    "RpcCodec",
+    "register_codec",
+    "AsyncRpcSession",
+    "AsyncRpcResponse",
+    "AsyncRpcWebResponse",
+    "AsyncRpcNativeResponse",
+    "AsyncHttpTransport",
+    "AsyncHttpResponse",
+    "AsyncioHttpTransport",
 ]
@@ -0,0 +1,120 @@
+"""A content-addressed cache of the descriptor sets compiled by protoc.
+
+The key of a descriptor set is a hash of the protoc version, the include paths, the
+name of the compiled file, and the contents of every file it imports transitively. It
+is computed without running protoc, or importing ``grpc_tools.protoc``.
+"""
+
+import hashlib
+import importlib.metadata
+import importlib.util
+import logging
+import os
+import re
+import tempfile
+import time
+from typing import List, Optional
+
+from google.protobuf.descriptor_pb2 import FileDescriptorSet
+from google.protobuf.message import DecodeError
+
+logger = logging.getLogger(__name__)
+
+# Imports inside comments are hashed too, which is harmless
+_IMPORT_RE = re.compile(rb'\bimport\s+(?:public\s+|weak\s+)?"([^"]+)"')
+
+
+def cache_key(name: str, content: bytes, include_paths: List[str]) -> str:
+    """Returns the cache key of a proto file.
+
+    Arguments:
+        name (str): Name of the compiled file, e.g. its absolute path.
+        content (bytes): Content of the file.
+        include_paths (List[str]): The paths where its imports are searched.
+    """
+    digest = hashlib.sha256()
+    digest.update(_protoc_version().encode())
+    for path in include_paths:
+        digest.update(b"\0path\0" + path.encode())
+    digest.update(b"\0file\0" + name.encode() + b"\0" + hashlib.sha256(content).digest())
+
+    search_paths = _protoc_include() + include_paths
+    seen = set()
+    pending = _imports(content)
+    while pending:
+        imported = pending.pop()
+        if imported in seen:
+            continue
+        seen.add(imported)
+        digest.update(b"\0import\0" + imported)
+        # Every candidate is hashed, so the key does not depend on the search order of protoc
+        for path in search_paths:
+            file_path = os.path.join(path, os.fsdecode(imported))
+            if not os.path.isfile(file_path):
+                continue
+            with open(file_path, "rb") as f:
+                data = f.read()
+            digest.update(b"\0" + path.encode() + b"\0" + hashlib.sha256(data).digest())
+            pending.extend(_imports(data))
+    return digest.hexdigest()
+
+
+def load(cache_dir: str, key: str, max_age: Optional[float] = None) -> Optional[FileDescriptorSet]:
+    """Returns the cached descriptor set of a key, or None if it is not cached.
+
+    If a `max_age` is given, the files written more than that many seconds ago are ignored.
+    """
+    try:
+        with open(_cache_file(cache_dir, key), "rb") as f:
+            if max_age is not None and time.time() - os.fstat(f.fileno()).st_mtime > max_age:
+                logger.debug(f"Ignored the expired cached descriptor {key}")
+                return None
+            return FileDescriptorSet.FromString(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, DecodeError) as e:
+        logger.debug(f"Ignored the cached descriptor {key}: {e}")
+        return None
+
+
+def store(cache_dir: str, key: str, data: bytes) -> None:
+    """Caches the serialized descriptor set of a key.
+
+    The file is written under a temporary name, and renamed to its final name, so
+    that the processes sharing the cache never read a partial file.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_file = tempfile.mkstemp(prefix=key + ".", suffix=".tmp", dir=cache_dir)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_file, _cache_file(cache_dir, key))
+    except BaseException:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+        raise
+
+
+def _cache_file(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, key + ".bin")
+
+
+def _imports(content: bytes) -> List[bytes]:
+    return _IMPORT_RE.findall(content)
+
+
+def _protoc_version() -> str:
+    try:
+        return importlib.metadata.version("grpcio-tools")
+    except importlib.metadata.PackageNotFoundError:
+        return ""
+
+
+def _protoc_include() -> List[str]:
+    # Locates the bundled proto files without importing grpc_tools
+    spec = importlib.util.find_spec("grpc_tools")
+    if spec is None or not spec.submodule_search_locations:
+        return []
+    return [os.path.join(list(spec.submodule_search_locations)[0], "_proto")]
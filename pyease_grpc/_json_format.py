@@ -0,0 +1,903 @@
+"""Specialized converters between JSON like dicts and protobuf messages.
+
+The converters are compiled once per message descriptor, and produce the same
+results as :mod:`google.protobuf.json_format`. Inputs that are not handled by
+a compiled converter, including every invalid input, are converted again by
+:mod:`google.protobuf.json_format`, so its results and errors are kept as they are.
+"""
+
+import base64
+from collections import OrderedDict
+from collections.abc import ItemsView, ValuesView
+import inspect
+import math
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+from google.protobuf import json_format, message_factory, reflection
+from google.protobuf.descriptor import Descriptor, FieldDescriptor
+from google.protobuf.internal import type_checkers
+from google.protobuf.message import Message
+
+# Messages with their own JSON mapping, which are converted by json_format
+_WKT_NAMES = frozenset(
+    [
+        "google.protobuf.Any",
+        "google.protobuf.Duration",
+        "google.protobuf.FieldMask",
+        "google.protobuf.ListValue",
+        "google.protobuf.Struct",
+        "google.protobuf.Timestamp",
+        "google.protobuf.Value",
+        "google.protobuf.BoolValue",
+        "google.protobuf.BytesValue",
+        "google.protobuf.DoubleValue",
+        "google.protobuf.FloatValue",
+        "google.protobuf.Int32Value",
+        "google.protobuf.Int64Value",
+        "google.protobuf.StringValue",
+        "google.protobuf.UInt32Value",
+        "google.protobuf.UInt64Value",
+    ]
+)
+
+_MAX_RECURSION_DEPTH = 100
+_FLOAT_MAX = 3.4028234663852886e38
+
+_INT_TYPES = frozenset(
+    [
+        FieldDescriptor.CPPTYPE_INT32,
+        FieldDescriptor.CPPTYPE_INT64,
+        FieldDescriptor.CPPTYPE_UINT32,
+        FieldDescriptor.CPPTYPE_UINT64,
+    ]
+)
+
+# Converts a JSON value of a field. Raises _Fallback if it can not be converted.
+_Converter = Callable[..., Any]
+
+# The keyword argument of MessageToDict to print the fields that are not set.
+# Newer protobuf releases have replaced `including_default_value_fields`.
+if "always_print_fields_with_no_presence" in inspect.signature(json_format.MessageToDict).parameters:
+    _PRINT_DEFAULTS = "always_print_fields_with_no_presence"
+else:
+    _PRINT_DEFAULTS = "including_default_value_fields"
+
+
+class _Fallback(Exception):
+    """The input must be converted by :mod:`google.protobuf.json_format`"""
+
+
+def is_well_known(descriptor: Descriptor) -> bool:
+    return descriptor.full_name in _WKT_NAMES
+
+
+# ---------------------------------------------------------------------------
+# dict -> message
+# ---------------------------------------------------------------------------
+
+
+def parse_dict(message_type: Type[Message], data: Any, ignore_unknown: bool = True) -> Message:
+    """Converts a JSON like value to a message, like :func:`json_format.ParseDict`"""
+    encode = _encoders.get(message_type.DESCRIPTOR)
+    if encode is None:
+        encode = _message_encoder(message_type.DESCRIPTOR)
+    if encode is not _parse_with_json_format:
+        try:
+            return message_type(**encode(data, ignore_unknown, 1))
+        except Exception:
+            pass  # invalid or unusual input; let json_format decide
+    return json_format.ParseDict(
+        data,
+        message_type(),
+        ignore_unknown_fields=ignore_unknown,
+        descriptor_pool=message_type.DESCRIPTOR.file.pool,
+    )
+
+
+def _parse_with_json_format(data: Any, ignore_unknown: bool, depth: int) -> Any:
+    raise _Fallback()
+
+
+_encoders: Dict[Descriptor, _Converter] = {}
+_encoders_lock = threading.RLock()
+
+
+def _message_encoder(descriptor: Descriptor) -> _Converter:
+    with _encoders_lock:
+        encode = _encoders.get(descriptor)
+        if encode is not None:
+            return encode
+        if is_well_known(descriptor):
+            _encoders[descriptor] = _parse_with_json_format
+            return _parse_with_json_format
+
+        # The nested messages are compiled when they are first converted, so the
+        # encoder is registered once it is complete
+        fields: Dict[str, Tuple[str, _Converter, Any]] = {}
+        # The JSON names take precedence over the field names, as in json_format
+        for field in descriptor.fields:
+            fields[field.json_name] = (field.name, _field_encoder(field), field.containing_oneof)
+        for field in descriptor.fields:
+            fields.setdefault(field.name, fields[field.json_name])
+        encode = _encoders[descriptor] = _compile_message_encoder(descriptor, fields)
+        return encode
+
+
+def _compile_message_encoder(descriptor: Descriptor, fields: Dict[str, Tuple[str, _Converter, Any]]) -> _Converter:
+    has_oneofs = bool(descriptor.oneofs)
+
+    def encode(data: Any, ignore_unknown: bool, depth: int) -> Dict[str, Any]:
+        # Returns the keyword arguments of the message constructor
+        if type(data) is not dict or depth > _MAX_RECURSION_DEPTH:
+            raise _Fallback()
+        kwargs = {}
+        oneofs = set() if has_oneofs else None
+        for key, value in data.items():
+            entry = fields.get(key)
+            if entry is None:
+                if ignore_unknown and not key.startswith("["):
+                    continue
+                raise _Fallback()
+            name, convert, oneof = entry
+            if value is None or name in kwargs:
+                raise _Fallback()
+            if oneof is not None:
+                if oneof in oneofs:
+                    raise _Fallback()
+                oneofs.add(oneof)
+            kwargs[name] = convert(value, ignore_unknown, depth)
+        return kwargs
+
+    return encode
+
+
+def _field_encoder(field: FieldDescriptor) -> _Converter:
+    if field.message_type is not None and field.message_type.GetOptions().map_entry:
+        key_field = field.message_type.fields_by_name["key"]
+        value_field = field.message_type.fields_by_name["value"]
+        return _map_encoder(_map_key_encoder(key_field), _value_encoder(value_field))
+    convert = _value_encoder(field)
+    if _is_repeated(field):
+        return _repeated_encoder(convert)
+    return convert
+
+
+def _is_repeated(field: FieldDescriptor) -> bool:
+    is_repeated = getattr(field, "is_repeated", None)
+    if is_repeated is None:
+        return field.label == FieldDescriptor.LABEL_REPEATED
+    return is_repeated
+
+
+def _repeated_encoder(convert: _Converter) -> _Converter:
+    def encode(value: Any, ignore_unknown: bool, depth: int) -> list:
+        if type(value) is not list and type(value) is not tuple:
+            raise _Fallback()
+        return [convert(item, ignore_unknown, depth) for item in value]
+
+    return encode
+
+
+def _map_encoder(convert_key: _Converter, convert_value: _Converter) -> _Converter:
+    def encode(value: Any, ignore_unknown: bool, depth: int) -> dict:
+        if type(value) is not dict:
+            raise _Fallback()
+        return {convert_key(k): convert_value(v, ignore_unknown, depth) for k, v in value.items()}
+
+    return encode
+
+
+def _map_key_encoder(field: FieldDescriptor) -> _Converter:
+    if field.cpp_type == FieldDescriptor.CPPTYPE_STRING:
+        return _encode_string
+    if field.cpp_type in _INT_TYPES:
+        return _encode_int
+    # bool keys are spelled "true" and "false"
+    return _fallback
+
+
+def _value_encoder(field: FieldDescriptor) -> _Converter:
+    cpp_type = field.cpp_type
+    if cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+        return _submessage_encoder(field.message_type)
+    if cpp_type in _INT_TYPES:
+        return _encode_int
+    if cpp_type == FieldDescriptor.CPPTYPE_DOUBLE:
+        return _encode_double
+    if cpp_type == FieldDescriptor.CPPTYPE_FLOAT:
+        return _encode_float
+    if cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+        return _encode_bool
+    if cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+        return _enum_encoder(field)
+    if field.type == FieldDescriptor.TYPE_BYTES:
+        return _encode_bytes
+    return _encode_string
+
+
+def _submessage_encoder(descriptor: Descriptor) -> _Converter:
+    if is_well_known(descriptor):
+        message_class = []
+
+        def encode_well_known(value: Any, ignore_unknown: bool, depth: int) -> Message:
+            if value is None:
+                raise _Fallback()
+            # The depth of the whole message is limited, as in json_format
+            limit = _MAX_RECURSION_DEPTH - depth
+            if limit < 1:
+                raise _Fallback()
+            if not message_class:
+                message_class.append(_get_message_class(descriptor))
+            return json_format.ParseDict(
+                value,
+                message_class[0](),
+                ignore_unknown_fields=ignore_unknown,
+                descriptor_pool=descriptor.file.pool,
+                max_recursion_depth=limit,
+            )
+
+        return encode_well_known
+
+    encoder = []
+
+    def encode(value: Any, ignore_unknown: bool, depth: int) -> dict:
+        if not encoder:
+            encoder.append(_message_encoder(descriptor))
+        return encoder[0](value, ignore_unknown, depth + 1)
+
+    return encode
+
+
+def _get_message_class(descriptor: Descriptor) -> Type[Message]:
+    if hasattr(message_factory, "GetMessageClass"):
+        return message_factory.GetMessageClass(descriptor)
+    return reflection.MakeClass(descriptor)
+
+
+# The scalar converters accept and ignore the `ignore_unknown` and `depth` arguments
+# of the message converters, so that they can be called the same way.
+
+
+def _fallback(value: Any, *_) -> Any:
+    raise _Fallback()
+
+
+def _encode_int(value: Any, *_) -> int:
+    kind = type(value)
+    if kind is int:
+        return value
+    if kind is str:
+        if " " in value:
+            raise _Fallback()
+        try:
+            return int(value)
+        except ValueError:
+            raise _Fallback() from None
+    if kind is float and value.is_integer():
+        return int(value)
+    raise _Fallback()
+
+
+def _encode_double(value: Any, *_) -> float:
+    kind = type(value)
+    if kind is float:
+        if math.isnan(value) or math.isinf(value):
+            raise _Fallback()
+        return value
+    if kind is int:
+        return float(value)
+    raise _Fallback()
+
+
+def _encode_float(value: Any, *_) -> float:
+    value = _encode_double(value)
+    if type(value) is float and not -_FLOAT_MAX <= value <= _FLOAT_MAX:
+        raise _Fallback()
+    return value
+
+
+def _encode_bool(value: Any, *_) -> bool:
+    if type(value) is not bool:
+        raise _Fallback()
+    return value
+
+
+def _encode_string(value: Any, *_) -> str:
+    if type(value) is not str:
+        raise _Fallback()
+    # Unpaired surrogates are rejected when the message is built
+    return value
+
+
+def _encode_bytes(value: Any, *_) -> bytes:
+    if type(value) is not str:
+        raise _Fallback()
+    encoded = value.encode("utf-8")
+    return base64.urlsafe_b64decode(encoded + b"=" * (4 - len(encoded) % 4))
+
+
+def _enum_encoder(field: FieldDescriptor) -> _Converter:
+    enum_type = field.enum_type
+    numbers_by_name = {value.name: value.number for value in enum_type.values}
+    numbers = frozenset(numbers_by_name.values())
+    closed = getattr(enum_type, "is_closed", None)
+    if closed is None:
+        closed = enum_type.file.syntax != "proto3"
+
+    def encode(value: Any, *_) -> int:
+        kind = type(value)
+        if kind is str:
+            number = numbers_by_name.get(value)
+            if number is not None:
+                return number
+        elif kind is int and (not closed or value in numbers):
+            return value
+        raise _Fallback()
+
+    return encode
+
+
+# ---------------------------------------------------------------------------
+# message -> dict
+# ---------------------------------------------------------------------------
+
+
+def message_to_dict(
+    message: Message,
+    including_defaults: bool = True,
+    float_precision: Optional[int] = None,
+    use_integers_for_enums: bool = False,
+) -> dict:
+    """Converts a message to a JSON like dict, like :func:`json_format.MessageToDict`"""
+    if float_precision is None and not use_integers_for_enums:
+        decode = _decoders.get((message.DESCRIPTOR, including_defaults))
+        if decode is None:
+            decode = _message_decoder(message.DESCRIPTOR, including_defaults)
+        if decode is not _print_with_json_format:
+            try:
+                return decode(message)
+            except Exception:
+                pass  # unusual message; let json_format decide
+    return _print_message(message, including_defaults, float_precision, use_integers_for_enums)
+
+
+def message_decoder(message_type: Type[Message], including_defaults: bool = True) -> Callable[[Message], dict]:
+    """Returns a function that converts messages of the given type to dicts,
+    like :func:`message_to_dict` with the default arguments."""
+    decode = _message_decoder(message_type.DESCRIPTOR, including_defaults)
+    if decode is _print_with_json_format:
+        return lambda message: _print_message(message, including_defaults)
+
+    def to_dict(message: Message) -> dict:
+        try:
+            return decode(message)
+        except Exception:
+            return _print_message(message, including_defaults)
+
+    return to_dict
+
+
+def _print_message(
+    message: Message,
+    including_defaults: bool = True,
+    float_precision: Optional[int] = None,
+    use_integers_for_enums: bool = False,
+) -> dict:
+    return json_format.MessageToDict(
+        message,
+        float_precision=float_precision,
+        use_integers_for_enums=use_integers_for_enums,
+        descriptor_pool=message.DESCRIPTOR.file.pool,
+        **{_PRINT_DEFAULTS: including_defaults},
+    )
+
+
+def _print_with_json_format(message: Message) -> dict:
+    raise _Fallback()
+
+
+# The JSON name and converter of the fields, and the JSON names and values of
+# the fields that are printed when they are not set
+_Fields = Dict[FieldDescriptor, Tuple[str, Callable[[Any], Any]]]
+_Defaults = List[Tuple[str, Any, Optional[Callable[[], Any]]]]
+
+_decoders: Dict[Tuple[Descriptor, bool], Callable[[Message], dict]] = {}
+
+
+def _message_decoder(descriptor: Descriptor, including_defaults: bool) -> Callable[[Message], dict]:
+    key = (descriptor, including_defaults)
+    with _encoders_lock:
+        decode = _decoders.get(key)
+        if decode is not None:
+            return decode
+        if is_well_known(descriptor):
+            _decoders[key] = _print_with_json_format
+            return _print_with_json_format
+
+        fields: _Fields = {}
+        defaults: _Defaults = []
+        _compile_fields(descriptor, including_defaults, False, fields, defaults)
+        decode = _decoders[key] = _compile_message_decoder(fields, defaults)
+        return decode
+
+
+def _compile_fields(
+    descriptor: Descriptor,
+    including_defaults: bool,
+    lazy: bool,
+    fields: _Fields,
+    defaults: _Defaults,
+    tree: Optional["_FieldTree"] = None,
+) -> None:
+    # Only the fields in the tree are compiled, if it is given
+    for field in descriptor.fields:
+        if tree is None:
+            fields[field] = (field.json_name, _field_decoder(field, including_defaults, lazy))
+        elif field in tree:
+            fields[field] = (field.json_name, _selected_field_decoder(field, tree[field], including_defaults))
+    if not including_defaults:
+        return
+    for field in descriptor.fields:
+        if field not in fields or not _prints_default(field):
+            continue
+        if _is_map(field):
+            defaults.append((field.json_name, None, dict))
+        elif _is_repeated(field):
+            defaults.append((field.json_name, None, list))
+        else:
+            defaults.append((field.json_name, fields[field][1](field.default_value), None))
+
+
+def _compile_message_decoder(fields: _Fields, defaults: _Defaults, select: bool = False) -> Callable[[Message], dict]:
+    def decode(message: Message) -> dict:
+        js = {}
+        for field, value in message.ListFields():
+            entry = fields.get(field)
+            if entry is None:
+                if select:
+                    continue
+                raise _Fallback()  # extensions
+            name, convert = entry
+            js[name] = convert(value)
+        for name, value, factory in defaults:
+            if name not in js:
+                js[name] = factory() if factory else value
+        return js
+
+    return decode
+
+
+def _prints_default(field: FieldDescriptor) -> bool:
+    # Whether the field is printed when it is not set, as in json_format
+    if _PRINT_DEFAULTS == "always_print_fields_with_no_presence":
+        return not field.has_presence
+    if _is_repeated(field):
+        return True
+    return field.cpp_type != FieldDescriptor.CPPTYPE_MESSAGE and field.containing_oneof is None
+
+
+def _is_map(field: FieldDescriptor) -> bool:
+    return field.message_type is not None and field.message_type.GetOptions().map_entry
+
+
+def _field_decoder(field: FieldDescriptor, including_defaults: bool, lazy: bool) -> Callable[[Any], Any]:
+    if _is_map(field):
+        value_field = field.message_type.fields_by_name["value"]
+        return _container_decoder(field, _value_decoder(value_field, including_defaults, lazy))
+    return _container_decoder(field, _value_decoder(field, including_defaults, lazy))
+
+
+def _container_decoder(field: FieldDescriptor, convert: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    # Applies the converter of the values to the items of the maps and repeated fields
+    if _is_map(field):
+        return _map_decoder(field.message_type.fields_by_name["key"], convert)
+    if _is_repeated(field):
+        if convert is _identity:
+            return list
+        return lambda value: [convert(item) for item in value]
+    return convert
+
+
+def _map_decoder(key_field: FieldDescriptor, convert: Callable[[Any], Any]) -> Callable[[Any], dict]:
+    if key_field.cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+        convert_key = _decode_bool_key
+    elif key_field.cpp_type == FieldDescriptor.CPPTYPE_STRING:
+        convert_key = _identity
+    else:
+        convert_key = str
+    if convert is _identity:
+        return lambda value: {convert_key(k): v for k, v in value.items()}
+    return lambda value: {convert_key(k): convert(v) for k, v in value.items()}
+
+
+def _value_decoder(field: FieldDescriptor, including_defaults: bool, lazy: bool) -> Callable[[Any], Any]:
+    cpp_type = field.cpp_type
+    if cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+        return _submessage_decoder(field.message_type, including_defaults, lazy)
+    if cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+        return _enum_decoder(field)
+    if cpp_type in (FieldDescriptor.CPPTYPE_INT64, FieldDescriptor.CPPTYPE_UINT64):
+        return str
+    if cpp_type == FieldDescriptor.CPPTYPE_DOUBLE:
+        return _decode_double
+    if cpp_type == FieldDescriptor.CPPTYPE_FLOAT:
+        return _decode_float
+    if field.type == FieldDescriptor.TYPE_BYTES:
+        return _decode_bytes
+    return _identity
+
+
+def _submessage_decoder(descriptor: Descriptor, including_defaults: bool, lazy: bool) -> Callable[[Message], dict]:
+    if is_well_known(descriptor):
+        return lambda message: _print_message(message, including_defaults)
+    if lazy:
+        return lambda message: MessageView(message, including_defaults)
+
+    decoder = []
+
+    def decode(message: Message) -> dict:
+        if not decoder:
+            decoder.append(_message_decoder(descriptor, including_defaults))
+        return decoder[0](message)
+
+    return decode
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _decode_bool_key(value: bool) -> str:
+    return "true" if value else "false"
+
+
+def _decode_double(value: float) -> Any:
+    if math.isfinite(value):
+        return value
+    if math.isnan(value):
+        return "NaN"
+    return "Infinity" if value > 0 else "-Infinity"
+
+
+def _decode_float(value: float) -> Any:
+    if math.isfinite(value):
+        return type_checkers.ToShortestFloat(value)
+    return _decode_double(value)
+
+
+def _decode_bytes(value: bytes) -> str:
+    return base64.b64encode(value).decode("utf-8")
+
+
+def _enum_decoder(field: FieldDescriptor) -> Callable[[int], Any]:
+    enum_type = field.enum_type
+    if enum_type.full_name == "google.protobuf.NullValue":
+        return lambda value: None
+    names = {number: value.name for number, value in enum_type.values_by_number.items()}
+    closed = getattr(enum_type, "is_closed", None)
+    if closed is None:
+        closed = enum_type.file.syntax != "proto3"
+
+    def decode(value: int) -> Any:
+        name = names.get(value)
+        if name is not None:
+            return name
+        if closed:
+            raise _Fallback()
+        return value
+
+    return decode
+
+
+# ---------------------------------------------------------------------------
+# message -> lazy dict
+# ---------------------------------------------------------------------------
+
+
+class _Pending(object):
+    """A field value that has not been converted yet"""
+
+    __slots__ = ("convert", "value")
+
+    def __init__(self, convert: Callable[[Any], Any], value: Any) -> None:
+        self.convert = convert
+        self.value = value
+
+
+class MessageView(dict):
+    """A read-only dict of a message, which converts the fields when they are read.
+
+    The view has the same keys, and compares equal to the dict of :func:`message_to_dict`.
+    Nested messages are views too, and the converted values are kept in the view.
+    It can be serialized by :mod:`json` like the dict.
+    """
+
+    __slots__ = ("message", "including_defaults")
+
+    def __init__(self, message: Message, including_defaults: bool = True) -> None:
+        super().__init__()
+        self.message = message
+        self.including_defaults = including_defaults
+        table = _view_tables.get((message.DESCRIPTOR, including_defaults))
+        if table is None:
+            table = _view_table(message.DESCRIPTOR, including_defaults)
+        if table and self._load(message, table):
+            return
+        # well-known types and extensions
+        data = _print_message(message, including_defaults)
+        if not isinstance(data, dict):
+            raise TypeError(f"{message.DESCRIPTOR.full_name} is not converted to a dict")
+        dict.clear(self)
+        dict.update(self, data)
+
+    def _load(self, message: Message, table: Tuple[_Fields, _Defaults]) -> bool:
+        fields, defaults = table
+        for field, value in message.ListFields():
+            entry = fields.get(field)
+            if entry is None:
+                return False
+            name, convert = entry
+            dict.__setitem__(self, name, value if convert is _identity else _Pending(convert, value))
+        for name, value, factory in defaults:
+            if not dict.__contains__(self, name):
+                dict.__setitem__(self, name, factory() if factory else value)
+        return True
+
+    def __getitem__(self, key: str) -> Any:
+        value = dict.__getitem__(self, key)
+        if type(value) is _Pending:
+            try:
+                value = value.convert(value.value)
+            except _Fallback:
+                # json_format raises the error of the message
+                value = _print_message(self.message, self.including_defaults)[key]
+            dict.__setitem__(self, key, value)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if dict.__contains__(self, key):
+            return self[key]
+        return default
+
+    def __iter__(self):
+        # Makes dict(view) and {**view} read the values with __getitem__
+        return dict.__iter__(self)
+
+    def items(self) -> ItemsView:
+        return ItemsView(self)
+
+    def values(self) -> ValuesView:
+        return ValuesView(self)
+
+    def copy(self) -> dict:
+        """Returns a dict of the converted values. The nested messages are views."""
+        return {key: self[key] for key in dict.__iter__(self)}
+
+    def to_dict(self) -> dict:
+        """Returns the dict of :func:`message_to_dict`, without views"""
+        return message_to_dict(self.message, self.including_defaults)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, MessageView):
+            other = other.copy()
+        return self.copy() == other
+
+    def __ne__(self, other: Any) -> bool:
+        return not self == other
+
+    __hash__ = None
+
+    def __or__(self, other: Any) -> dict:
+        if not isinstance(other, dict):
+            return NotImplemented
+        return {**self, **other}
+
+    def __ror__(self, other: Any) -> dict:
+        if not isinstance(other, dict):
+            return NotImplemented
+        return {**other, **self}
+
+    def __repr__(self) -> str:
+        return repr(self.copy())
+
+    def __reduce__(self):
+        # Copied and pickled as dicts, since the message classes may not be importable
+        return (dict, (self.copy(),))
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("MessageView is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+
+def message_to_view(message: Message, including_defaults: bool = True) -> Any:
+    """Returns a :class:`MessageView` of the message, or the value of :func:`message_to_dict`
+    for the well-known types, which are not always converted to dicts."""
+    if is_well_known(message.DESCRIPTOR):
+        return message_to_dict(message, including_defaults)
+    return MessageView(message, including_defaults)
+
+
+_view_tables: Dict[Tuple[Descriptor, bool], Tuple] = {}
+
+
+def _view_table(descriptor: Descriptor, including_defaults: bool) -> Tuple:
+    """Returns the compiled fields of the views of a message type, or an empty tuple
+    if the message is converted by json_format."""
+    key = (descriptor, including_defaults)
+    with _encoders_lock:
+        table = _view_tables.get(key)
+        if table is not None:
+            return table
+        if is_well_known(descriptor):
+            _view_tables[key] = ()
+            return ()
+        fields: _Fields = {}
+        defaults: _Defaults = []
+        _compile_fields(descriptor, including_defaults, True, fields, defaults)
+        table = _view_tables[key] = (fields, defaults)
+        return table
+
+
+# ---------------------------------------------------------------------------
+# message -> dict of selected fields
+# ---------------------------------------------------------------------------
+
+# The selected fields of a message. The value is the tree of the selected fields
+# of the nested message, or None if the whole field is selected.
+_FieldTree = Dict[FieldDescriptor, Optional[Dict]]
+
+
+def message_projector(
+    message_type: Type[Message],
+    fields: Iterable[str],
+    including_defaults: bool = True,
+) -> Callable[[Message], dict]:
+    """Returns a function that converts messages of the given type to dicts with
+    only the given fields. The other fields are not converted.
+
+    The fields are paths of field names separated by dots, e.g. ``user.id``. The
+    fields after a repeated message or a map are selected in every item. The dicts
+    are the same as the dicts of :func:`message_to_dict` without the other fields.
+
+    Raises:
+        ValueError: If a path does not exist in the message type.
+    """
+    if isinstance(fields, str):
+        fields = [fields]
+    return _projector(message_type.DESCRIPTOR, tuple(fields), including_defaults)
+
+
+# The most recently used projectors, by descriptor, fields and including_defaults
+_projectors: "OrderedDict[Tuple[Descriptor, Tuple[str, ...], bool], Callable[[Message], dict]]" = OrderedDict()
+_MAX_PROJECTORS = 256
+
+
+def _projector(descriptor: Descriptor, fields: Tuple[str, ...], including_defaults: bool) -> Callable[[Message], dict]:
+    key = (descriptor, fields, including_defaults)
+    with _encoders_lock:
+        project = _projectors.get(key)
+        if project is not None:
+            _projectors.move_to_end(key)
+            return project
+        project = _projectors[key] = _compile_projector(descriptor, fields, including_defaults)
+        if len(_projectors) > _MAX_PROJECTORS:
+            _projectors.popitem(last=False)
+        return project
+
+
+def _compile_projector(
+    descriptor: Descriptor,
+    fields: Tuple[str, ...],
+    including_defaults: bool,
+) -> Callable[[Message], dict]:
+    tree = _field_tree(descriptor, fields)
+    decode = _compile_projection(descriptor, tree, including_defaults)
+
+    def project(message: Message) -> dict:
+        try:
+            return decode(message)
+        except _Fallback:
+            # json_format raises the error of the message
+            return _select(_print_message(message, including_defaults), tree)
+
+    return project
+
+
+def _field_tree(descriptor: Descriptor, paths: Tuple[str, ...]) -> _FieldTree:
+    tree: _FieldTree = {}
+    for path in paths:
+        node, message = tree, descriptor
+        names = path.split(".")
+        for i, name in enumerate(names):
+            field = _find_field(message, name)
+            if field is None:
+                raise ValueError(f"No such field: {path} in {descriptor.full_name}")
+            if i == len(names) - 1:
+                node[field] = None
+            elif field in node and node[field] is None:
+                break  # the whole field is selected
+            else:
+                message = _selectable_message(field)
+                if message is None:
+                    raise ValueError(f"Can not select fields of {'.'.join(names[: i + 1])} in {descriptor.full_name}")
+                node = node.setdefault(field, {})
+    return tree
+
+
+def _find_field(descriptor: Descriptor, name: str) -> Optional[FieldDescriptor]:
+    # The JSON names take precedence over the field names, as in json_format
+    for field in descriptor.fields:
+        if field.json_name == name:
+            return field
+    return descriptor.fields_by_name.get(name)
+
+
+def _selectable_message(field: FieldDescriptor) -> Optional[Descriptor]:
+    # The message whose fields can be selected after the field
+    if _is_map(field):
+        field = field.message_type.fields_by_name["value"]
+    message = field.message_type
+    if message is None or is_well_known(message):
+        return None
+    return message
+
+
+def _compile_projection(
+    descriptor: Descriptor, tree: _FieldTree, including_defaults: bool
+) -> Callable[[Message], dict]:
+    fields: _Fields = {}
+    defaults: _Defaults = []
+    _compile_fields(descriptor, including_defaults, False, fields, defaults, tree)
+    return _compile_message_decoder(fields, defaults, select=True)
+
+
+def _selected_field_decoder(
+    field: FieldDescriptor,
+    tree: Optional[_FieldTree],
+    including_defaults: bool,
+) -> Callable[[Any], Any]:
+    if tree is None:
+        return _field_decoder(field, including_defaults, False)
+    project = _compile_projection(_selectable_message(field), tree, including_defaults)
+    return _container_decoder(field, project)
+
+
+def _select(data: dict, tree: _FieldTree) -> dict:
+    selected = {}
+    for name, value in data.items():
+        field = next((field for field in tree if field.json_name == name), None)
+        if field is None:
+            continue
+        subtree = tree[field]
+        if subtree is None:
+            selected[name] = value
+        elif _is_map(field):
+            selected[name] = {key: _select(item, subtree) for key, item in value.items()}
+        elif _is_repeated(field):
+            selected[name] = [_select(item, subtree) for item in value]
+        else:
+            selected[name] = _select(value, subtree)
+    return selected
+
+
+# ---------------------------------------------------------------------------
+# cache eviction
+# ---------------------------------------------------------------------------
+
+
+def forget_pool(pool: Any) -> None:
+    """Drops the compiled converters of the messages of a descriptor pool.
+
+    The converters keep the descriptors of their messages, and so the pool, alive.
+    """
+    with _encoders_lock:
+        for cache in (_encoders, _decoders, _view_tables, _projectors):
+            for key in [key for key in cache if _key_descriptor(key).file.pool is pool]:
+                del cache[key]
+
+
+def _key_descriptor(key: Any) -> Descriptor:
+    return key[0] if isinstance(key, tuple) else key
@@ -0,0 +1,55 @@
+from collections.abc import MutableMapping
+from typing import Callable, Dict, Generic, Iterable, Iterator, Tuple, TypeVar
+
+_K = TypeVar("_K")
+_S = TypeVar("_S")
+_V = TypeVar("_V")
+
+
+class _Unbuilt(object):
+    __slots__ = ("source",)
+
+    def __init__(self, source) -> None:
+        self.source = source
+
+
+class LazyMapping(MutableMapping, Generic[_K, _V]):
+    """A mapping whose values are built from a source the first time they are looked up.
+
+    The keys are known up front, so membership tests, iteration and ``len`` build nothing.
+    Iterating the values or the items builds all of them.
+    """
+
+    def __init__(self, sources: Iterable[Tuple[_K, _S]], build: Callable[[_S], _V]) -> None:
+        self._entries: Dict[_K, object] = {key: _Unbuilt(source) for key, source in sources}
+        self._build = build
+
+    def __getitem__(self, key: _K) -> _V:
+        value = self._entries[key]
+        if type(value) is _Unbuilt:
+            value = self._build(value.source)
+            self._entries[key] = value
+        return value
+
+    def __setitem__(self, key: _K, value: _V) -> None:
+        self._entries[key] = value
+
+    def __delitem__(self, key: _K) -> None:
+        del self._entries[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def __iter__(self) -> Iterator[_K]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} of {len(self)} items, {self.built} built>"
+
+    @property
+    def built(self) -> int:
+        """Number of values that have been built"""
+        return sum(type(value) is not _Unbuilt for value in self._entries.values())
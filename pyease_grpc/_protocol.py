@@ -1,20 +1,33 @@
+import base64
+import binascii
 import logging
 import os
 import struct
-from typing import Dict, Generator, List, Optional, Tuple, Type
+from typing import Any, AsyncGenerator, Awaitable, Callable, Generator, Iterator, List, Optional, Tuple, Type, Union
 
 from google.protobuf import message_factory, reflection, symbol_database
-from google.protobuf.descriptor_pb2 import FileDescriptorSet
-from google.protobuf.json_format import MessageToDict, ParseDict
+from google.protobuf.descriptor_pb2 import DescriptorProto, FileDescriptorSet
+from google.protobuf.internal import enum_type_wrapper
 from google.protobuf.message import Message
 from requests import Response
 from requests.exceptions import ContentDecodingError, InvalidHeader
 
+from . import _json_format
+from ._lazy import LazyMapping
+
 logger = logging.getLogger(__name__)
 
 _HEADER_FORMAT = ">BI"
 _HEADER_LENGTH = struct.calcsize(_HEADER_FORMAT)
+_HEADER_STRUCT = struct.Struct(_HEADER_FORMAT)
 _DEFAULT_CHUNK_SIZE = 512
+_MAX_READ_SIZE = 1 << 20
+# The frame buffers grow as the bytes arrive beyond this size, since the length
+# in a frame header can not be trusted before the body is received
+_MAX_PREALLOCATION = 1 << 20
+_TEXT_CHUNK_SIZE = 1 << 16
+_ASYNC_CHUNK_SIZE = 1 << 16
+_TEXT_CONTENT_TYPE = "application/grpc-web-text"
 
 
 def _pack_header(trailer: bool, compressed: bool, length: int) -> bytes:
@@ -23,7 +36,7 @@ def _pack_header(trailer: bool, compressed: bool, length: int) -> bytes:
 
 
 def _unpack_header(message: bytes) -> Tuple[bool, bool, int]:
-    flags, length = struct.unpack(_HEADER_FORMAT, message[:_HEADER_LENGTH])
+    flags, length = _HEADER_STRUCT.unpack_from(message)
     trailer = bool(flags & (1 << 7))
     compressed = bool(flags & 1)
     return trailer, compressed, length
@@ -44,31 +57,253 @@ def unwrap_message(message: bytes) -> Tuple[bytes, bool, bool]:
     return data, trailer, compressed
 
 
+class MessageDecoder(object):
+    """Incremental decoder for length-prefixed gRPC-Web frames.
+
+    Chunks of the response body are passed to :meth:`feed` as they arrive, and
+    every completed frame is returned as a ``(data, trailer, compressed)`` tuple.
+    The ``data`` is a :class:`memoryview` which is never copied or reused by the
+    decoder: frames that are fully contained in a chunk are views into that chunk,
+    and frames that span multiple chunks are assembled into a buffer, which grows
+    up to the length in the frame header as the bytes arrive.
+
+    The chunks must not be modified after they have been fed to the decoder.
+    """
+
+    def __init__(self) -> None:
+        self._header = bytearray(_HEADER_LENGTH)
+        self._header_size = 0
+        self._body: Optional[bytearray] = None
+        self._body_size = 0
+        self._length = 0
+        self._trailer = False
+        self._compressed = False
+
+    @property
+    def pending(self) -> bool:
+        """Returns True if a frame has been started but not completed yet"""
+        return self._header_size > 0 or self._body is not None
+
+    def feed(self, chunk: bytes) -> List[Tuple[memoryview, bool, bool]]:
+        """Consumes a chunk and returns the list of frames completed by it.
+
+        Arguments:
+            chunk (bytes): The next bytes-like chunk of the stream.
+        """
+        frames = []
+        view = memoryview(chunk)
+        pos, end = 0, len(view)
+        while pos < end:
+            if self._body is None:
+                if self._header_size == 0 and end - pos >= _HEADER_LENGTH:
+                    trailer, compressed, length = _unpack_header(view[pos:])
+                    pos += _HEADER_LENGTH
+                else:
+                    size = min(_HEADER_LENGTH - self._header_size, end - pos)
+                    self._header[self._header_size : self._header_size + size] = view[pos : pos + size]
+                    self._header_size += size
+                    pos += size
+                    if self._header_size < _HEADER_LENGTH:
+                        break
+                    self._header_size = 0
+                    trailer, compressed, length = _unpack_header(self._header)
+
+                if end - pos >= length:
+                    frames.append((view[pos : pos + length], trailer, compressed))
+                    pos += length
+                    continue
+
+                self._body = bytearray(min(length, _MAX_PREALLOCATION))
+                self._body_size = 0
+                self._length = length
+                self._trailer = trailer
+                self._compressed = compressed
+
+            size = min(self._length - self._body_size, end - pos)
+            if self._body_size + size > len(self._body):
+                # Doubles the buffer, or grows it to the received bytes if they are more
+                grown = max(min(2 * len(self._body), self._length), self._body_size + size)
+                self._body.extend(bytes(grown - len(self._body)))
+            self._body[self._body_size : self._body_size + size] = view[pos : pos + size]
+            self._body_size += size
+            pos += size
+            if self._body_size == self._length:
+                frames.append((memoryview(self._body), self._trailer, self._compressed))
+                self._body = None
+
+        return frames
+
+    def close(self) -> None:
+        """Verifies that the stream has not ended in the middle of a frame."""
+        if self._body is not None:
+            raise ContentDecodingError(f"Expected {self._length} bytes, got {self._body_size} bytes")
+        if self._header_size:
+            raise InvalidHeader(f"Expected {_HEADER_LENGTH} bytes, got {self._header_size} bytes")
+
+
+def _read_into(raw, buffer: Union[bytearray, memoryview], max_read_size: int = _MAX_READ_SIZE) -> int:
+    view = memoryview(buffer)
+    filled = 0
+    while filled < len(view):
+        size = raw.readinto(view[filled : filled + max_read_size])
+        if not size:
+            break
+        filled += size
+    return filled
+
+
+def read_message_stream(
+    raw,
+    max_read_size: int = _MAX_READ_SIZE,
+) -> Generator[Tuple[memoryview, bool, bool], None, None]:
+    """Reads frames from a raw stream supporting ``readinto``.
+
+    The 5-byte header is read first, and the body is read straight into a buffer
+    of the length given by the header. Each ``readinto`` call is limited to
+    `max_read_size` bytes to bound the transient memory of the underlying reader.
+    """
+    header = bytearray(_HEADER_LENGTH)
+    while True:
+        size = _read_into(raw, header)
+        if size != _HEADER_LENGTH:
+            raise InvalidHeader(f"Expected {_HEADER_LENGTH} bytes, got {size} bytes")
+        trailer, compressed, length = _unpack_header(header)
+        data = bytearray(min(length, _MAX_PREALLOCATION))
+        size = _read_into(raw, data, max_read_size)
+        while size == len(data) < length:
+            # Doubles the buffer only once it is filled
+            start = len(data)
+            data.extend(bytes(min(start, length - start)))
+            size = start + _read_into(raw, memoryview(data)[start:], max_read_size)
+        if size != length:
+            raise ContentDecodingError(f"Expected {length} bytes, got {size} bytes")
+        yield memoryview(data), trailer, compressed
+        if trailer:
+            return
+
+
+def _iter_message_chunks(
+    response: Response,
+    chunk_size: int,
+) -> Generator[Tuple[memoryview, bool, bool], None, None]:
+    decoder = MessageDecoder()
+    for chunk in response.iter_content(chunk_size):
+        for frame in decoder.feed(chunk):
+            yield frame
+            if frame[1]:
+                return
+    decoder.close()
+    raise InvalidHeader(f"Expected {_HEADER_LENGTH} bytes, got 0 bytes")
+
+
+class Base64Decoder(object):
+    """Incremental decoder for the base64 body of ``grpc-web-text`` streams.
+
+    Only complete 4-character quanta are decoded on each :meth:`feed`, and the
+    rest is kept for the next chunk. Every frame is base64 encoded separately,
+    so padding may appear in the middle of the stream as well.
+    """
+
+    def __init__(self) -> None:
+        self._pending = b""
+
+    def feed(self, chunk: bytes) -> bytes:
+        """Consumes a chunk of base64 text and returns the decoded bytes"""
+        data = self._pending + bytes(chunk)
+        end = len(data) - len(data) % 4
+        self._pending = data[end:]
+        view = memoryview(data)[:end]
+        if data.find(b"=", 0, end) < 0:
+            return binascii.a2b_base64(view)
+        decoded = bytearray()
+        start = 0
+        while start < end:
+            padding = data.find(b"=", start, end)
+            stop = end if padding < 0 else (padding // 4 + 1) * 4
+            decoded += binascii.a2b_base64(view[start:stop])
+            start = stop
+        return bytes(decoded)
+
+    def close(self) -> None:
+        """Verifies that the stream has not ended in the middle of a quantum."""
+        if self._pending:
+            raise ContentDecodingError(f"Incomplete base64 content: {self._pending!r}")
+
+
+def encode_text(message: bytes) -> bytes:
+    return base64.b64encode(message)
+
+
+def _iter_text_message_chunks(
+    response: Response,
+    chunk_size: int,
+) -> Generator[Tuple[memoryview, bool, bool], None, None]:
+    text = Base64Decoder()
+    decoder = MessageDecoder()
+    for chunk in response.iter_content(chunk_size):
+        for frame in decoder.feed(text.feed(chunk)):
+            yield frame
+            if frame[1]:
+                return
+    text.close()
+    decoder.close()
+    raise InvalidHeader(f"Expected {_HEADER_LENGTH} bytes, got 0 bytes")
+
+
+def is_text_response(response) -> bool:
+    return response.headers.get("content-type", "").startswith(_TEXT_CONTENT_TYPE)
+
+
 def unwrap_message_stream(
     response: Response,
-    chunk_size: int = _DEFAULT_CHUNK_SIZE,
-) -> Generator[Tuple[bytes, bool, bool], None, None]:
-    it = response.iter_content(chunk_size)
-
-    def read_upto(length, previous):
-        while len(previous) < length:
-            try:
-                previous += next(it)
-            except StopIteration:
-                break
-        return previous[:length], previous[length:]
-
-    content = b""
-    trailer = None
-    while not trailer:
-        header, content = read_upto(_HEADER_LENGTH, content)
-        if len(header) != _HEADER_LENGTH:
-            raise InvalidHeader(f"Expected {_HEADER_LENGTH} bytes, got {len(header)} bytes")
-        trailer, compressed, length = _unpack_header(header)
-        data, content = read_upto(length, content)
-        if length != len(data):
-            raise ContentDecodingError(f"Expected {length} bytes, got {len(data)} bytes")
-        yield data, trailer, compressed
+    chunk_size: Optional[int] = None,
+) -> Generator[Tuple[memoryview, bool, bool], None, None]:
+    """Iterates over the frames of a streamed gRPC-Web response.
+
+    By default the reads are directed by the frame lengths and go straight to
+    ``response.raw``. If a `chunk_size` is given, or the body has a HTTP content
+    encoding, the body is pulled through ``response.iter_content`` instead.
+
+    The body of ``grpc-web-text`` responses is decoded incrementally, in chunks
+    of `chunk_size` (64 KiB by default).
+    """
+    if is_text_response(response):
+        return _iter_text_message_chunks(response, chunk_size or _TEXT_CHUNK_SIZE)
+    encoding = response.headers.get("content-encoding", "identity")
+    if chunk_size is None and encoding == "identity":
+        return read_message_stream(response.raw)
+    return _iter_message_chunks(response, chunk_size or _DEFAULT_CHUNK_SIZE)
+
+
+async def aiter_message_stream(
+    read: Callable[[int], Awaitable[bytes]],
+    text: bool = False,
+    chunk_size: int = _ASYNC_CHUNK_SIZE,
+) -> AsyncGenerator[Tuple[memoryview, bool, bool], None]:
+    """Asynchronously iterates over the frames of a gRPC-Web response body.
+
+    Arguments:
+        read (Callable): A coroutine function reading up to N bytes of the body.
+            It must return an empty bytes at the end of the body.
+        text (bool): Whether the body is base64 encoded ``grpc-web-text``.
+        chunk_size (int): Maximum number of bytes to read at once.
+    """
+    decoder = MessageDecoder()
+    text_decoder = Base64Decoder() if text else None
+    while True:
+        chunk = await read(chunk_size)
+        if not chunk:
+            break
+        if text_decoder:
+            chunk = text_decoder.feed(chunk)
+        for frame in decoder.feed(chunk):
+            yield frame
+            if frame[1]:
+                return
+    if text_decoder:
+        text_decoder.close()
+    decoder.close()
+    raise InvalidHeader(f"Expected {_HEADER_LENGTH} bytes, got 0 bytes")
 
 
 def serialize_timeout(seconds: float):
@@ -79,9 +314,8 @@ def parse_message(
     message_type: Type[Message],
     data: dict,
     ignore_unknown=True,
-) -> bytes:
-    message = message_type()
-    return ParseDict(data, message, ignore_unknown_fields=ignore_unknown)
+) -> Message:
+    return _json_format.parse_dict(message_type, data, ignore_unknown)
 
 
 def message_to_dict(
@@ -90,20 +324,7 @@ def message_to_dict(
     float_precision=None,
     use_integers_for_enums=False,
 ) -> dict:
-    try:
-        return MessageToDict(
-            message,
-            float_precision=float_precision,
-            use_integers_for_enums=use_integers_for_enums,
-            including_default_value_fields=including_defaults,
-        )
-    except TypeError:
-        return MessageToDict(
-            message,
-            float_precision=float_precision,
-            use_integers_for_enums=use_integers_for_enums,
-            always_print_fields_with_no_presence=including_defaults,
-        )
+    return _json_format.message_to_dict(message, including_defaults, float_precision, use_integers_for_enums)
 
 
 def deserialize_message(message_type: Type[Message], data: bytes) -> Message:
@@ -111,7 +332,7 @@ def deserialize_message(message_type: Type[Message], data: bytes) -> Message:
 
 
 def deserialize_trailer(data: bytes) -> dict:
-    return dict([line.split(":", 1) for line in data.decode("utf8").splitlines()])
+    return dict([line.split(":", 1) for line in bytes(data).decode("utf8").splitlines()])
 
 
 def _strip_extension_brackets(obj: dict):
@@ -133,36 +354,100 @@ def _strip_extension_brackets(obj: dict):
     return obj
 
 
-def _add_to_pool(db, proto) -> None:
+def _add_to_pool(pool, proto) -> None:
     try:
-        db.pool.Add(proto)
+        pool.Add(proto)
     except TypeError:
         pass  # already registered with identical content
 
 
-def load_messages(fds: FileDescriptorSet) -> Dict[str, Type[Message]]:
-    db = symbol_database.Default()
-    messages: Dict[str, Type[Message]] = {}
+def add_files(fds: FileDescriptorSet, pool=None):
+    """Adds the files to a descriptor pool, and returns the pool.
+
+    Arguments:
+        fds (FileDescriptorSet): The files to add.
+        pool (Optional[DescriptorPool]): The pool to add the files to. If None, the
+            default pool of the process is used. Default = None
+    """
+    if pool is None:
+        pool = symbol_database.Default().pool
     # Register all protos before any lookup so
     # cross-file type references resolve correctly.
     for proto in fds.file:
-        _add_to_pool(db, proto)
+        _add_to_pool(pool, proto)
+    return pool
+
+
+def load_messages(fds: FileDescriptorSet, pool=None) -> LazyMapping[str, Type[Message]]:
+    """Returns the classes of the messages by full name, including the nested messages.
+
+    The classes are made the first time they are looked up.
+
+    Arguments:
+        fds (FileDescriptorSet): The files of the messages.
+        pool (Optional[DescriptorPool]): The pool to add the files to. If None, the
+            default pool of the process is used. Default = None
+    """
+    pool = add_files(fds, pool)
+    names = (name for name, is_enum in type_names(fds) if not is_enum)
+    return LazyMapping(((name, name) for name in names), lambda name: _make_message_class(pool, name))
+
+
+def load_types(fds: FileDescriptorSet, pool) -> LazyMapping[str, Any]:
+    """Returns the message classes and the enum types of the files by full name,
+    including the nested ones. The files must have been added to the pool.
+
+    The message classes and the :class:`EnumTypeWrapper` of the enums are made the
+    first time they are looked up.
+    """
+    return LazyMapping(((name, (name, is_enum)) for name, is_enum in type_names(fds)), lambda x: _make_type(pool, *x))
+
+
+def type_names(fds: FileDescriptorSet) -> Iterator[Tuple[str, bool]]:
+    """Iterates over the full names of the messages and the enums of the files, with a
+    flag which is True for the enums. The synthetic entries of the map fields are skipped."""
     for proto in fds.file:
+        prefix = proto.package + "." if proto.package else ""
+        for enum in proto.enum_type:
+            yield prefix + enum.name, True
         for message in proto.message_type:
-            name = f"{proto.package}.{message.name}" if proto.package else message.name
-            md = db.pool.FindMessageTypeByName(name)
-            if hasattr(reflection, "MakeClass"):
-                messages[name] = reflection.MakeClass(md)
-            else:
-                messages[name] = message_factory.GetMessageClass(md)
-    return messages
-
-
-def _ensure_fds_in_pool(fds: FileDescriptorSet) -> None:
-    # Register protos in the pool so MessageToDict resolves extension types correctly.
-    db = symbol_database.Default()
-    for proto in fds.file:
-        _add_to_pool(db, proto)
+            yield from _nested_type_names(prefix, message)
+
+
+def _nested_type_names(prefix: str, message: DescriptorProto) -> Iterator[Tuple[str, bool]]:
+    if message.options.map_entry:
+        return
+    name = prefix + message.name
+    yield name, False
+    for enum in message.enum_type:
+        yield name + "." + enum.name, True
+    for nested in message.nested_type:
+        yield from _nested_type_names(name + ".", nested)
+
+
+def _make_type(pool, name: str, is_enum: bool) -> Any:
+    if is_enum:
+        return enum_type_wrapper.EnumTypeWrapper(pool.FindEnumTypeByName(name))
+    return _make_message_class(pool, name)
+
+
+def _make_message_class(pool, name: str) -> Type[Message]:
+    md = pool.FindMessageTypeByName(name)
+    if hasattr(reflection, "MakeClass"):
+        return reflection.MakeClass(md)
+    return message_factory.GetMessageClass(md)
+
+
+def descriptor_set_in_pool(fds: FileDescriptorSet, pool) -> Message:
+    """Returns the descriptor set as a message of the pool, if the pool has its own
+    ``descriptor.proto``, so that the custom options defined in the pool are printed."""
+    try:
+        descriptor = pool.FindMessageTypeByName("google.protobuf.FileDescriptorSet")
+    except KeyError:
+        return fds
+    if descriptor is FileDescriptorSet.DESCRIPTOR:
+        return fds
+    return _make_message_class(pool, descriptor.full_name).FromString(fds.SerializeToString())
 
 
 def get_resource_path(package, path):
@@ -177,6 +462,13 @@ def get_resource_path(package, path):
         return os.path.abspath(str(files / path))
 
 
+def resolve_include_paths(proto_file: str, include_paths: Optional[List[str]] = None) -> List[str]:
+    """Returns the absolute include paths that are passed to protoc for a proto file"""
+    if not include_paths:
+        include_paths = [os.path.dirname(os.path.abspath(proto_file))]
+    return [os.path.abspath(x) for x in include_paths if os.path.isdir(x)]
+
+
 def generate_descriptor(out_file: str, proto_file: str, include_paths: Optional[List[str]] = None):
     try:
         from grpc_tools import protoc
@@ -189,10 +481,7 @@ def generate_descriptor(out_file: str, proto_file: str, include_paths: Optional[
 
     out_file = os.path.abspath(out_file)
     proto_file = os.path.abspath(proto_file)
-
-    if not include_paths:
-        include_paths = [os.path.dirname(proto_file)]
-    include_paths = [os.path.abspath(x) for x in include_paths if os.path.isdir(x)]
+    include_paths = resolve_include_paths(proto_file, include_paths)
 
     protoc_py_file = os.path.abspath(protoc.__file__)
     proto_include = get_resource_path("grpc_tools", "_proto")
@@ -0,0 +1,220 @@
+"""Loads the descriptors of the services of a server with the gRPC Server Reflection protocol.
+
+Only the files that define the requested services are asked for, and then the files
+they import, which were not sent with them. The descriptor sets are cached in memory,
+and optionally on disk, for a limited time.
+"""
+
+import hashlib
+import logging
+import queue
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from google.protobuf.descriptor_pb2 import FileDescriptorProto, FileDescriptorSet
+import grpc
+
+from . import _descriptor_cache
+
+logger = logging.getLogger(__name__)
+
+# The versions of the reflection service, in the order they are tried
+_REFLECTION_SERVICES = [
+    "grpc.reflection.v1.ServerReflection",
+    "grpc.reflection.v1alpha.ServerReflection",
+]
+
+# The cached descriptor sets by key, with the time they expire at
+_cache: Dict[str, Tuple[float, FileDescriptorSet]] = {}
+_cache_lock = threading.Lock()
+
+
+def cache_key(target: str, services: Optional[Sequence[str]]) -> str:
+    """Returns the cache key of the descriptors of some services of a server.
+
+    Arguments:
+        target (str): The server address. e.g. localhost:50050
+        services (Optional[Sequence[str]]): Full names of the services. If None, all services.
+    """
+    digest = hashlib.sha256(b"reflection\0" + target.encode())
+    if services is None:
+        digest.update(b"\0all")
+    for service in sorted(services or []):
+        digest.update(b"\0service\0" + service.encode())
+    return digest.hexdigest()
+
+
+def load(key: str, cache_dir: Optional[str], ttl: Optional[float]) -> Optional[FileDescriptorSet]:
+    """Returns the cached descriptor set of a key, or None if it is not cached or has expired."""
+    if ttl is not None and ttl <= 0:
+        return None
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            if now < entry[0]:
+                return entry[1]
+            del _cache[key]
+    if cache_dir is None:
+        return None
+    descriptor = _descriptor_cache.load(cache_dir, key, ttl)
+    if descriptor is not None:
+        _remember(key, descriptor, ttl)
+    return descriptor
+
+
+def store(key: str, descriptor: FileDescriptorSet, cache_dir: Optional[str], ttl: Optional[float]) -> None:
+    """Caches the descriptor set of a key in memory, and in the `cache_dir` if it is given."""
+    if ttl is not None and ttl <= 0:
+        return
+    _remember(key, descriptor, ttl)
+    if cache_dir is not None:
+        _descriptor_cache.store(cache_dir, key, descriptor.SerializeToString())
+
+
+def _remember(key: str, descriptor: FileDescriptorSet, ttl: Optional[float]) -> None:
+    now = time.monotonic()
+    expires = float("inf") if ttl is None else now + ttl
+    with _cache_lock:
+        for stale in [k for k, (expiry, _) in _cache.items() if expiry <= now]:
+            del _cache[stale]
+        _cache[key] = (expires, descriptor)
+
+
+def fetch(
+    channel: grpc.Channel,
+    services: Optional[Sequence[str]] = None,
+    timeout: Optional[float] = None,
+) -> FileDescriptorSet:
+    """Fetches the files of some services of a server, and all the files they import.
+
+    The ``v1`` reflection service is used, or ``v1alpha`` if the server does not implement it.
+
+    Arguments:
+        channel (grpc.Channel): The channel to the server.
+        services (Optional[Sequence[str]]): Full names of the services. If None, all services
+            of the server, except the reflection service, are fetched.
+        timeout (Optional[float]): Timeout in seconds of the whole exchange.
+
+    Raises:
+        ValueError: If the server does not know a service or a file, or can not list its services.
+    """
+    for name in _REFLECTION_SERVICES[:-1]:
+        try:
+            return _fetch(channel, name, services, timeout)
+        except grpc.RpcError as e:
+            if e.code() != grpc.StatusCode.UNIMPLEMENTED:
+                raise
+            logger.debug(f"The server does not implement {name}")
+    return _fetch(channel, _REFLECTION_SERVICES[-1], services, timeout)
+
+
+def _fetch(
+    channel: grpc.Channel,
+    reflection_service: str,
+    services: Optional[Sequence[str]],
+    timeout: Optional[float],
+) -> FileDescriptorSet:
+    stream = _ReflectionStream(channel, reflection_service, timeout)
+    try:
+        return _fetch_files(stream, services)
+    finally:
+        stream.close()
+
+
+def _fetch_files(stream: "_ReflectionStream", services: Optional[Sequence[str]]) -> FileDescriptorSet:
+    if services is None:
+        response = stream.ask(list_services="")
+        if response.HasField("error_response"):
+            raise ValueError("Can not list the services: " + response.error_response.error_message)
+        services = [s.name for s in response.list_services_response.service if s.name not in _REFLECTION_SERVICES]
+
+    files: Dict[str, FileDescriptorProto] = {}
+    for service in services:
+        if service in _defined_services(files.values()):
+            continue
+        response = stream.ask(file_containing_symbol=service)
+        if response.HasField("error_response"):
+            raise ValueError("No such service: " + service)
+        _add_files(files, response)
+
+    # The servers usually send the imports with a file, but they are not required to
+    requested: Set[str] = set()
+    missing = _missing_files(files)
+    while missing:
+        for name in missing:
+            if name in requested:
+                raise ValueError("No such file: " + name)
+            requested.add(name)
+            response = stream.ask(file_by_filename=name)
+            if response.HasField("error_response"):
+                raise ValueError("No such file: " + name)
+            _add_files(files, response)
+        missing = _missing_files(files)
+    return FileDescriptorSet(file=_sorted_files(files))
+
+
+def _add_files(files: Dict[str, FileDescriptorProto], response) -> None:
+    for data in response.file_descriptor_response.file_descriptor_proto:
+        proto = FileDescriptorProto.FromString(data)
+        files.setdefault(proto.name, proto)
+
+
+def _defined_services(files: Iterable[FileDescriptorProto]) -> Set[str]:
+    return {f"{proto.package}.{s.name}" if proto.package else s.name for proto in files for s in proto.service}
+
+
+def _missing_files(files: Dict[str, FileDescriptorProto]) -> List[str]:
+    return sorted({name for proto in files.values() for name in proto.dependency if name not in files})
+
+
+def _sorted_files(files: Dict[str, FileDescriptorProto]) -> List[FileDescriptorProto]:
+    # The imports of a file are added to a pool before the file
+    ordered: List[FileDescriptorProto] = []
+    visited: Set[str] = set()
+
+    def visit(name: str) -> None:
+        if name in visited:
+            return
+        visited.add(name)
+        for dependency in files[name].dependency:
+            visit(dependency)
+        ordered.append(files[name])
+
+    for name in files:
+        visit(name)
+    return ordered
+
+
+class _ReflectionStream(object):
+    """A bidirectional reflection call, which sends a request and waits for its response."""
+
+    def __init__(self, channel: grpc.Channel, service: str, timeout: Optional[float]) -> None:
+        request_type, response_type = _reflection_messages()
+        self._request_type = request_type
+        self._requests: "queue.Queue" = queue.Queue()
+        multicallable = channel.stream_stream(
+            f"/{service}/ServerReflectionInfo",
+            request_serializer=request_type.SerializeToString,
+            response_deserializer=response_type.FromString,
+        )
+        self._responses = multicallable(iter(self._requests.get, None), timeout=timeout)
+
+    def ask(self, **request):
+        self._requests.put(self._request_type(**request))
+        return next(self._responses)
+
+    def close(self) -> None:
+        self._requests.put(None)
+        self._responses.cancel()
+
+
+def _reflection_messages():
+    try:
+        from grpc_reflection.v1alpha.reflection_pb2 import ServerReflectionRequest, ServerReflectionResponse
+    except ImportError as e:
+        logger.debug(str(e) + " Run 'pip install grpcio-reflection' to install it. It is required for reflection.")
+        raise ModuleNotFoundError("Missing package: 'grpcio-reflection'") from e
+    # The messages of v1 are the same as v1alpha
+    return ServerReflectionRequest, ServerReflectionResponse
@@ -10,7 +10,7 @@ from .protobuf import Protobuf
 
 
 def get_args():
-    parser = ArgumentParser("pyease-grpc", description="Generate descriptor json from a proto file.")
+    parser = ArgumentParser("pyease-grpc", description="Generate descriptor json or binary from a proto file.")
     parser.add_argument("-v", "--version", action="version", version="%(prog)s " + __version__)
     parser.add_argument(
         "-o",
@@ -28,6 +28,13 @@ def get_args():
         help="Specify the directory in which to search for imports.",
         required=True,
     )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=["json", "binary"],
+        default="json",
+        help="The output format. The binary format is restored faster. Default: json",
+    )
     parser.add_argument("proto_file", type=str, help="The proto file path")
     return parser.parse_args()
 
@@ -40,13 +47,20 @@ def main():
         include_paths=args.proto_path,
     )
 
-    output = json.dumps(protobuf.save())
+    if args.format == "binary":
+        output = protobuf.save_binary()
+    else:
+        output = json.dumps(protobuf.save()).encode()
 
     if not args.output:
-        print(output)
+        if args.format == "binary":
+            sys.stdout.buffer.write(output)
+            sys.stdout.flush()
+        else:
+            print(output.decode())
         sys.exit(0)
 
     output_dir = os.path.dirname(os.path.abspath(args.output))
     os.makedirs(output_dir, exist_ok=True)
-    with open(args.output, "w") as f:
+    with open(args.output, "wb") as f:
         f.write(output)
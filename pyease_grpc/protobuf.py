@@ -1,14 +1,19 @@
 import json
 import logging
+import mmap
 import os
 import shutil
 import tempfile
-from typing import Dict, Generator, List, Optional, Type
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Type, Union
+import weakref
 
+from google.protobuf import descriptor_pool, symbol_database
 from google.protobuf.descriptor_pb2 import FileDescriptorSet
 from google.protobuf.message import Message
+import grpc
 
-from . import _protocol
+from . import _descriptor_cache, _json_format, _protocol, _reflection
+from ._lazy import LazyMapping
 from .rpc_method import RpcMethod
 from .rpc_method_type import get_method_type
 from .rpc_uri import RpcUri
@@ -23,6 +28,8 @@ class Protobuf(object):
         proto_file: str,
         include_paths: Optional[List[str]] = None,
         work_dir: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        shared: bool = False,
     ):
         """Creates a :class:`Protobuf` from protobuf file.
 
@@ -30,18 +37,21 @@ class Protobuf(object):
             proto_file (str) A *.proto file containing protobuf definitions.
             include_paths (List[str]) Additional paths to include when parsing. Default = []
             work_dir (Optional[str]): Main working folder. Default = None
+            cache_dir (Optional[str]): A folder to cache the compiled descriptors in. They are
+                keyed by the contents of the proto file and all its imports, the include paths
+                and the protoc version, and can be shared by many processes. Default = None
+            shared (bool): Use the default descriptor pool of the process. Default = False
         """
-        basename = os.path.basename(proto_file)
-        tmp_dir = work_dir or tempfile.mkdtemp(basename)
-        os.makedirs(tmp_dir, exist_ok=True)
-        try:
-            out_file = os.path.join(tmp_dir, "descriptor.bin")
-            res = _protocol.generate_descriptor(out_file, proto_file, include_paths or [])
-            with open(res, "rb") as f:
-                return cls(FileDescriptorSet.FromString(f.read()))
-        finally:
-            if work_dir != tmp_dir:
-                shutil.rmtree(tmp_dir, ignore_errors=True)
+        if cache_dir is None:
+            return cls(_generate_descriptor(proto_file, include_paths, work_dir), shared)
+        with open(proto_file, "rb") as f:
+            content = f.read()
+        paths = _protocol.resolve_include_paths(proto_file, include_paths)
+        key = _descriptor_cache.cache_key(os.path.abspath(proto_file), content, paths)
+        return cls(
+            _cached_descriptor(cache_dir, key, lambda: _generate_descriptor(proto_file, include_paths, work_dir)),
+            shared,
+        )
 
     @classmethod
     def from_proto(
@@ -50,6 +60,8 @@ class Protobuf(object):
         filename: str = "pyease",
         include_paths: Optional[List[str]] = None,
         work_dir: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        shared: bool = False,
     ):
         """Creates a :class:`Protobuf` from protobuf definitions.
 
@@ -58,51 +70,178 @@ class Protobuf(object):
             filename (str) A filename to use. Default = "pyease"
             include_paths (List[str]) Additional paths to include when parsing. Default = []
             work_dir (Optional[str]): Main working folder. Default = None
+            cache_dir (Optional[str]): A folder to cache the compiled descriptors in. Default = None
+            shared (bool): Use the default descriptor pool of the process. Default = False
         """
-        tmp_dir = work_dir or tempfile.mkdtemp(filename)
-        os.makedirs(tmp_dir, exist_ok=True)
-        try:
-            proto_file = os.path.join(tmp_dir, filename + ".proto")
-            with open(proto_file, "w") as f:
-                f.write(proto)
-            return cls.from_file(proto_file, (include_paths or []) + [tmp_dir], work_dir=tmp_dir)
-        finally:
-            if work_dir != tmp_dir:
-                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        def generate() -> FileDescriptorSet:
+            tmp_dir = work_dir or tempfile.mkdtemp(filename)
+            os.makedirs(tmp_dir, exist_ok=True)
+            try:
+                proto_file = os.path.join(tmp_dir, filename + ".proto")
+                with open(proto_file, "w") as f:
+                    f.write(proto)
+                return _generate_descriptor(proto_file, (include_paths or []) + [tmp_dir], tmp_dir)
+            finally:
+                if work_dir != tmp_dir:
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        if cache_dir is None:
+            return cls(generate(), shared)
+        # The temporary folder is left out of the key, since its name is random
+        paths = [os.path.abspath(x) for x in include_paths or [] if os.path.isdir(x)]
+        key = _descriptor_cache.cache_key("proto:" + filename + ".proto", proto.encode(), paths)
+        return cls(_cached_descriptor(cache_dir, key, generate), shared)
 
     @classmethod
-    def restore(cls, descriptor_json: dict):
+    def from_reflection(
+        cls,
+        target: str,
+        services: Optional[Sequence[str]] = None,
+        channel: Optional[grpc.Channel] = None,
+        credentials: Optional[grpc.ChannelCredentials] = None,
+        timeout: Optional[float] = None,
+        cache_dir: Optional[str] = None,
+        ttl: Optional[float] = 300,
+        shared: bool = False,
+    ):
+        """Creates a :class:`Protobuf` from the gRPC Server Reflection service of a server.
+
+        Only the files of the given services, and the files they import, are fetched. It
+        requires the ``grpcio-reflection`` package.
+
+        Arguments:
+            target (str): The server address. e.g. localhost:50050
+            services (Optional[Sequence[str]]): Full names of the services to load, e.g.
+                ``pyease.sample.v1.Greeter``. If None, all services of the server. Default = None
+            channel (Optional[grpc.Channel]): The channel to the server. If None, a channel
+                is opened for the call and closed after it. Default = None
+            credentials (Optional[grpc.ChannelCredentials]): Credentials of the opened channel.
+                If None, an insecure channel is used. Default = None
+            timeout (Optional[float]): Timeout in seconds of the reflection call. Default = None
+            cache_dir (Optional[str]): A folder to cache the descriptors in, in addition to the
+                memory of the process. Default = None
+            ttl (Optional[float]): Seconds for which the cached descriptors are used. If None,
+                they never expire, and if 0, they are not cached. Default = 300
+            shared (bool): Use the default descriptor pool of the process. Default = False
+        """
+        key = _reflection.cache_key(target, services)
+        descriptor = _reflection.load(key, cache_dir, ttl)
+        if descriptor is None:
+            if channel is not None:
+                descriptor = _reflection.fetch(channel, services, timeout)
+            else:
+                with _open_channel(target, credentials) as channel:
+                    descriptor = _reflection.fetch(channel, services, timeout)
+            _reflection.store(key, descriptor, cache_dir, ttl)
+        return cls(descriptor, shared)
+
+    @classmethod
+    def restore(cls, descriptor_json: dict, shared: bool = False):
         """Creates a :class:`Protobuf` from a JSON.
 
         Arguments:
             descriptor_json (dict) A :class:`FileDescriptorSet` message content as JSON
+            shared (bool) Use the default descriptor pool of the process. Default = False
         """
         fds = _protocol.parse_message(FileDescriptorSet, descriptor_json)
-        return cls(fds)
+        return cls(fds, shared)
 
     @classmethod
-    def restore_file(cls, descriptor_json_file: str):
-        """Creates a :class:`Protobuf` from a :class:`FileDescriptorSet` JSON content.
+    def restore_binary(cls, data: Union[bytes, memoryview], shared: bool = False):
+        """Creates a :class:`Protobuf` from a serialized :class:`FileDescriptorSet`.
 
         Arguments:
-            descriptor_json_file (str) Path to the JSON file.
+            data (bytes) The serialized file descriptor set, e.g. from :meth:`save_binary`
+            shared (bool) Use the default descriptor pool of the process. Default = False
         """
-        with open(descriptor_json_file, "r", encoding="utf8") as fp:
-            data = json.load(fp)
-            return Protobuf.restore(data)
+        return cls(FileDescriptorSet.FromString(data), shared)
+
+    @classmethod
+    def restore_binary_file(cls, descriptor_file: str, use_mmap: bool = False, shared: bool = False):
+        """Creates a :class:`Protobuf` from a serialized :class:`FileDescriptorSet` file.
+
+        Arguments:
+            descriptor_file (str) Path to the binary file, e.g. from :meth:`save_binary_file`
+            use_mmap (bool) Parse the file from a memory map, instead of reading it first.
+                Default = False
+            shared (bool) Use the default descriptor pool of the process. Default = False
+        """
+        with open(descriptor_file, "rb") as fp:
+            if not use_mmap or os.fstat(fp.fileno()).st_size == 0:
+                return cls.restore_binary(fp.read(), shared)
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                return cls.restore_binary(view, shared)
+
+    @classmethod
+    def restore_file(cls, descriptor_json_file: str, use_mmap: bool = False, shared: bool = False):
+        """Creates a :class:`Protobuf` from a :class:`FileDescriptorSet` file.
+
+        The file can be the JSON of :meth:`save_file`, or the binary of :meth:`save_binary_file`.
+        The format is detected from the content: a file whose first non-whitespace byte
+        is ``{`` is JSON, and any other file is binary.
+
+        Arguments:
+            descriptor_json_file (str) Path to the JSON or binary file.
+            use_mmap (bool) Parse a binary file from a memory map. Default = False
+            shared (bool) Use the default descriptor pool of the process. Default = False
+
+        Raises:
+            ValueError: If the file is empty or only has whitespace.
+        """
+        with open(descriptor_json_file, "rb") as fp:
+            first = head = fp.read(4096)
+            while head.isspace():
+                head = fp.read(4096)
+        if not head:
+            raise ValueError("Empty descriptor file: " + descriptor_json_file)
+        if not head.lstrip().startswith(b"{"):
+            return cls.restore_binary_file(descriptor_json_file, use_mmap, shared)
+        try:
+            with open(descriptor_json_file, "r", encoding="utf8") as fp:
+                data = json.load(fp)
+        except ValueError:
+            # A binary file starts with the tag of the `file` field, which is a newline,
+            # followed by the size of the first file, which can be the code of "{"
+            if not first.startswith(b"\n"):
+                raise
+            return cls.restore_binary_file(descriptor_json_file, use_mmap, shared)
+        return cls.restore(data, shared)
 
-    def __init__(self, descriptor: FileDescriptorSet) -> None:
+    def __init__(self, descriptor: FileDescriptorSet, shared: bool = False) -> None:
         """Initializes an instance from a :class:`FileDescriptorSet`.
 
+        The files are added to a private descriptor pool, which is freed with the instance,
+        and can hold other versions of the same files than the other instances. The
+        well-known types of a private pool are distinct from the classes of the ``*_pb2``
+        modules, e.g. a ``timestamp_pb2.Timestamp`` can not be assigned to their fields.
+
         Arguments:
             descriptor (FileDescriptorSet) A file descriptor set message
+            shared (bool) Add the files to the default descriptor pool of the process instead.
+                They are never freed, and the files already in the pool are not replaced.
+                Default = False
         """
         self._descriptor = descriptor
-        self.messages = _protocol.load_messages(self._descriptor)
-        self.services: Dict[str, Dict[str, RpcMethod]] = {}
-        for method in _load_rpc_methods(self._descriptor, self.messages):
-            self.services.setdefault(method.service, {})
-            self.services[method.service][method.method] = method
+        self.shared = shared
+        if shared:
+            self.pool = symbol_database.Default().pool
+        else:
+            self.pool = descriptor_pool.DescriptorPool()
+            # The compiled converters of the messages would keep the pool alive
+            weakref.finalize(self, _json_format.forget_pool, self.pool)
+        _protocol.add_files(self._descriptor, self.pool)
+        # The message classes and the methods are made the first time they are looked up.
+        # The types are the messages and enums by full name, including the nested ones,
+        # and the methods are indexed by their gRPC path, e.g. /package.Service/Method
+        self.types = _protocol.load_types(self._descriptor, self.pool)
+        self.messages = LazyMapping(
+            ((name, name) for name, is_enum in _protocol.type_names(self._descriptor) if not is_enum),
+            self.types.__getitem__,
+        )
+        self.methods = _load_rpc_methods(self._descriptor, self.messages)
+        self._services = _load_services(self._descriptor, self.methods)
+        self.services = _merge_services(self._descriptor, self.methods)
 
     def __str__(self) -> str:
         return json.dumps(self.save(), ensure_ascii=False)
@@ -114,8 +253,7 @@ class Protobuf(object):
 
     def save(self) -> dict:
         """Returns the :class:`FileDescriptorSet` of the current protobuf as JSON"""
-        _protocol._ensure_fds_in_pool(self._descriptor)
-        json_output = _protocol.message_to_dict(self._descriptor)
+        json_output = _protocol.message_to_dict(_protocol.descriptor_set_in_pool(self._descriptor, self.pool))
         _protocol._strip_extension_brackets(json_output)
         return json_output
 
@@ -128,39 +266,122 @@ class Protobuf(object):
         with open(file_path, "w", encoding="utf8") as fp:
             json.dump(self.save(), fp, ensure_ascii=False)
 
+    def save_binary(self) -> bytes:
+        """Returns the :class:`FileDescriptorSet` of the current protobuf serialized"""
+        return self._descriptor.SerializeToString()
+
+    def save_binary_file(self, file_path: str) -> None:
+        """Saves the serialized :class:`FileDescriptorSet` of the current protobuf to a file.
+
+        The binary file is restored much faster than the JSON of :meth:`save_file`.
+
+        Arguments:
+            file_path (str): A file path to write the binary content
+        """
+        with open(file_path, "wb") as fp:
+            fp.write(self.save_binary())
+
     def get_method(self, uri: RpcUri) -> Optional[RpcMethod]:
         """Gets the method corresponding to a :class:`RpcUri`"""
-        if uri.service not in self.services:
-            return None
-        methods = self.services[uri.service]
-        if uri.method not in methods:
-            return None
-        method = methods[uri.method]
-        if method.package != uri.package:
-            return None
-        return method
+        return self.methods.get(uri.path)
+
+    def find_method(self, path: str) -> Optional[RpcMethod]:
+        """Gets the method of a gRPC path, e.g. ``/pyease.sample.v1.Greeter/SayHello``"""
+        return self.methods.get(path)
+
+    def get_service(self, name: str) -> Optional[Mapping[str, RpcMethod]]:
+        """Gets the methods of a service by the full name of the service, e.g. ``pyease.sample.v1.Greeter``"""
+        return self._services.get(name)
 
     def has_method(self, uri: RpcUri) -> bool:
         """Check whether the method corresponding to a :class:`RpcUri` exists"""
         return isinstance(self.get_method(uri), RpcMethod)
 
 
+def _generate_descriptor(
+    proto_file: str,
+    include_paths: Optional[List[str]],
+    work_dir: Optional[str],
+) -> FileDescriptorSet:
+    basename = os.path.basename(proto_file)
+    tmp_dir = work_dir or tempfile.mkdtemp(basename)
+    os.makedirs(tmp_dir, exist_ok=True)
+    try:
+        out_file = os.path.join(tmp_dir, "descriptor.bin")
+        res = _protocol.generate_descriptor(out_file, proto_file, include_paths or [])
+        with open(res, "rb") as f:
+            return FileDescriptorSet.FromString(f.read())
+    finally:
+        if work_dir != tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _open_channel(target: str, credentials: Optional[grpc.ChannelCredentials]) -> grpc.Channel:
+    if credentials is None:
+        return grpc.insecure_channel(target)
+    return grpc.secure_channel(target, credentials)
+
+
+def _cached_descriptor(
+    cache_dir: str,
+    key: str,
+    generate: Callable[[], FileDescriptorSet],
+) -> FileDescriptorSet:
+    descriptor = _descriptor_cache.load(cache_dir, key)
+    if descriptor is None:
+        descriptor = generate()
+        _descriptor_cache.store(cache_dir, key, descriptor.SerializeToString())
+    return descriptor
+
+
 def _load_rpc_methods(
     fds: FileDescriptorSet,
-    messages: Dict[str, Type[Message]],
-) -> Generator[RpcMethod, None, None]:
+    messages: Mapping[str, Type[Message]],
+) -> LazyMapping[str, RpcMethod]:
+    sources = [
+        (RpcUri("", proto.package, service.name, method.name).path, (proto.package, service.name, method))
+        for proto in fds.file
+        for service in proto.service
+        for method in service.method
+    ]
+
+    def make_method(source: tuple) -> RpcMethod:
+        package, service, method = source
+        return RpcMethod(
+            package=package,
+            service=service,
+            method=method.name,
+            type=get_method_type(method.client_streaming, method.server_streaming),
+            request=messages[method.input_type[1:]],
+            response=messages[method.output_type[1:]],
+        )
+
+    return LazyMapping(sources, make_method)
+
+
+def _service_paths(fds: FileDescriptorSet) -> Iterator[Tuple[str, str, Dict[str, str]]]:
     for proto in fds.file:
         for service in proto.service:
-            for method in service.method:
-                method_type = get_method_type(
-                    method.client_streaming,
-                    method.server_streaming,
-                )
-                yield RpcMethod(
-                    package=proto.package,
-                    service=service.name,
-                    method=method.name,
-                    type=method_type,
-                    request=messages[method.input_type[1:]],
-                    response=messages[method.output_type[1:]],
-                )
+            paths = {
+                method.name: RpcUri("", proto.package, service.name, method.name).path for method in service.method
+            }
+            yield proto.package, service.name, paths
+
+
+def _load_services(
+    fds: FileDescriptorSet,
+    methods: Mapping[str, RpcMethod],
+) -> LazyMapping[str, LazyMapping[str, RpcMethod]]:
+    sources = [(f"{package}.{name}" if package else name, paths) for package, name, paths in _service_paths(fds)]
+    return LazyMapping(sources, lambda paths: LazyMapping(paths.items(), methods.__getitem__))
+
+
+def _merge_services(
+    fds: FileDescriptorSet,
+    methods: Mapping[str, RpcMethod],
+) -> LazyMapping[str, LazyMapping[str, RpcMethod]]:
+    # Services of the same name in different packages are merged
+    sources: Dict[str, Dict[str, str]] = {}
+    for _, name, paths in _service_paths(fds):
+        sources.setdefault(name, {}).update(paths)
+    return LazyMapping(sources.items(), lambda paths: LazyMapping(paths.items(), methods.__getitem__))
@@ -0,0 +1,202 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import threading
+import time
+from typing import Callable, Deque, Iterable, Iterator, Optional, Set, Tuple, Union
+
+from .rpc_method import RequestData
+from .rpc_response_native import RpcNativeResponse
+from .rpc_response_web import RpcWebResponse
+from .rpc_uri import RpcUri
+
+BatchCall = Tuple[Union[str, RpcUri], RequestData]
+BatchResponse = Union[RpcWebResponse, RpcNativeResponse]
+
+
+class RpcBatchResult(object):
+    def __init__(
+        self,
+        index: int,
+        uri: Union[str, RpcUri],
+        data: RequestData,
+        response: Optional[BatchResponse] = None,
+        error: Optional[Exception] = None,
+    ) -> None:
+        """The outcome of one call of an :class:`RpcBatch`.
+
+        Arguments:
+            index (int): Position of the call in the batch.
+            uri (str|RpcUri): The URI of the call.
+            data (dict|Message|bytes): The request message of the call.
+            response (Optional[RpcWebResponse|RpcNativeResponse]): The response, which has been read completely.
+            error (Optional[Exception]): The error raised by the call, e.g. an :class:`RpcTrailer`.
+        """
+        self.index = index
+        self.uri = uri
+        self.data = data
+        self.response = response
+        self.error = error
+
+    def __repr__(self) -> str:
+        state = "ok" if self.ok else repr(self.error)
+        return f"<RpcBatchResult #{self.index} {self.uri}: {state}>"
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def single(self):
+        """Returns the last response payload. Raises the error of a failed call."""
+        if self.error is not None:
+            raise self.error
+        return self.response.single
+
+
+class RpcBatchStats(object):
+    """Progress of an :class:`RpcBatch`. Updated while the calls run."""
+
+    def __init__(self) -> None:
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"<RpcBatchStats completed={self.completed}/{self.submitted} failed={self.failed}"
+            f" elapsed={self.elapsed:.2f}s throughput={self.throughput:.1f}/s>"
+        )
+
+    @property
+    def succeeded(self) -> int:
+        return self.completed - self.failed
+
+    @property
+    def in_flight(self) -> int:
+        """Number of calls that were submitted, but have not completed yet"""
+        return self.submitted - self.completed
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the batch started, until it finished"""
+        end = self.finished if self.finished is not None else time.monotonic()
+        return end - self.started
+
+    @property
+    def throughput(self) -> float:
+        """Completed calls per second"""
+        elapsed = self.elapsed
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+
+class RpcBatch(object):
+    def __init__(
+        self,
+        call: Callable[[Union[str, RpcUri], RequestData], BatchResponse],
+        calls: Iterable[BatchCall],
+        concurrency: int = 8,
+        ordered: bool = True,
+        window: Optional[int] = None,
+    ) -> None:
+        """Runs many independent calls in a pool of threads. Made by
+        :meth:`RpcSession.request_many` and :meth:`RpcSession.call_many`.
+
+        Iterating the batch yields an :class:`RpcBatchResult` for each call. The error of
+        a call is kept in its result, and does not stop the batch. The responses are read
+        completely by the threads, so their connections and channels are given back to
+        the pools of the session before the results are yielded.
+
+        Arguments:
+            call (Callable): Calls one method, and returns its response.
+            calls (Iterable[Tuple[str|RpcUri, RequestData]]): The URI and the request
+                message of each call. It is read as the calls are submitted.
+            concurrency (int): Number of calls that run at a time. Default = 8
+            ordered (bool): Yield the results in the order of the calls. If False, they are
+                yielded as soon as they complete. Default = True
+            window (Optional[int]): Maximum number of calls that are submitted and not yielded
+                yet. If None, twice the `concurrency`. Default = None
+        """
+        if concurrency < 1:
+            raise ValueError("The concurrency must be at least 1")
+        if window is None:
+            window = 2 * concurrency
+        if window < concurrency:
+            raise ValueError("The window must be at least the concurrency")
+        self.concurrency = concurrency
+        self.ordered = ordered
+        self.window = window
+        self.stats = RpcBatchStats()
+        self._call = call
+        self._calls = calls
+        self._lock = threading.Lock()
+        self._results = self._run()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __iter__(self) -> Iterator[RpcBatchResult]:
+        return self
+
+    def __next__(self) -> RpcBatchResult:
+        return next(self._results)
+
+    def close(self) -> None:
+        """Stops submitting calls, and cancels the calls that have not started yet.
+
+        The calls that are running are completed, and their results are discarded.
+        """
+        self._results.close()
+
+    def _run(self) -> Iterator[RpcBatchResult]:
+        executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix="pyease-grpc-batch")
+        pending: Union[Deque[Future], Set[Future]] = deque() if self.ordered else set()
+        self.stats.started = time.monotonic()
+        try:
+            for index, (uri, data) in enumerate(self._calls):
+                if len(pending) >= self.window:
+                    yield from self._collect(pending)
+                future = executor.submit(self._invoke, index, uri, data)
+                with self._lock:
+                    self.stats.submitted += 1
+                if self.ordered:
+                    pending.append(future)
+                else:
+                    pending.add(future)
+            while pending:
+                yield from self._collect(pending)
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown()
+            self.stats.finished = time.monotonic()
+
+    def _collect(self, pending: Union[Deque[Future], Set[Future]]) -> Iterator[RpcBatchResult]:
+        if self.ordered:
+            yield pending.popleft().result()
+            return
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in sorted(done, key=lambda f: f.result().index):
+            pending.discard(future)
+            yield future.result()
+
+    def _invoke(self, index: int, uri: Union[str, RpcUri], data: RequestData) -> RpcBatchResult:
+        result = RpcBatchResult(index, uri, data)
+        try:
+            response = self._call(uri, data)
+            try:
+                response.single  # reads the response completely
+            finally:
+                response.close()
+            result.response = response
+        except Exception as e:
+            result.error = e
+        with self._lock:
+            self.stats.completed += 1
+            if result.error is not None:
+                self.stats.failed += 1
+        return result
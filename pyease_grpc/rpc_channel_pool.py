@@ -0,0 +1,123 @@
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import grpc
+
+ChannelOptions = Sequence[Tuple[str, object]]
+
+
+class _PoolEntry(object):
+    def __init__(self, channels: List[grpc.Channel]) -> None:
+        self.channels = channels
+        self.counter = itertools.count()
+        self.active = 0
+        self.last_used = time.monotonic()
+
+
+class RpcChannelPool(object):
+    def __init__(
+        self,
+        subchannels: int = 1,
+        idle_timeout: Optional[float] = None,
+        options: Optional[ChannelOptions] = None,
+    ) -> None:
+        """A pool of reusable native channels keyed by target, credentials and channel options.
+
+        Arguments:
+            subchannels (int): Number of channels, each with its own connection, to open
+                per key. The calls are spread over them in round-robin order. Default = 1
+            idle_timeout (Optional[float]): Seconds after which unused channels are closed.
+                If None, the channels are kept until the pool is closed. Default = None
+            options (Optional[List[Tuple[str, Any]]]): Default channel arguments, e.g.
+                ``[("grpc.keepalive_time_ms", 10000), ("grpc.max_receive_message_length", -1)]``
+        """
+        if subchannels < 1:
+            raise ValueError("At least one subchannel is required")
+        self.subchannels = subchannels
+        self.idle_timeout = idle_timeout
+        self.options: Dict[str, object] = dict(options or [])
+        self._entries: Dict[tuple, _PoolEntry] = {}
+        self._owners: Dict[int, _PoolEntry] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def acquire(
+        self,
+        target: str,
+        credentials: Optional[grpc.ChannelCredentials] = None,
+        options: Optional[ChannelOptions] = None,
+    ) -> grpc.Channel:
+        """Returns a pooled channel. It must be given back with :meth:`release` after use.
+
+        Arguments:
+            target (str): The server address. e.g. localhost:50050
+            credentials (Optional[grpc.ChannelCredentials]): Credentials for a secure channel.
+                If None, an insecure channel is used.
+            options (Optional[List[Tuple[str, Any]]]): Channel arguments overriding the defaults.
+        """
+        merged = dict(self.options)
+        merged.update(options or [])
+        key = (target, credentials, tuple(sorted(merged.items(), key=lambda x: x[0])))
+        with self._lock:
+            self._evict_idle()
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _PoolEntry([self._create(target, credentials, merged) for _ in range(self.subchannels)])
+                self._entries[key] = entry
+                for channel in entry.channels:
+                    self._owners[id(channel)] = entry
+            entry.active += 1
+            entry.last_used = time.monotonic()
+            return entry.channels[next(entry.counter) % len(entry.channels)]
+
+    def release(self, channel: grpc.Channel) -> None:
+        """Gives back a channel returned by :meth:`acquire`"""
+        with self._lock:
+            entry = self._owners.get(id(channel))
+            if entry is not None and entry.active:
+                entry.active -= 1
+                entry.last_used = time.monotonic()
+
+    def close(self) -> None:
+        """Closes all channels of the pool."""
+        with self._lock:
+            entries, self._entries, self._owners = self._entries, {}, {}
+        for entry in entries.values():
+            for channel in entry.channels:
+                channel.close()
+
+    def _create(
+        self,
+        target: str,
+        credentials: Optional[grpc.ChannelCredentials],
+        options: Dict[str, object],
+    ) -> grpc.Channel:
+        options = list(options.items())
+        if self.subchannels > 1:
+            # Channels with a global subchannel pool would share one connection
+            options.append(("grpc.use_local_subchannel_pool", 1))
+        if credentials is not None:
+            return grpc.secure_channel(target, credentials, options=options)
+        return grpc.insecure_channel(target, options=options)
+
+    def _evict_idle(self) -> None:
+        if self.idle_timeout is None:
+            return
+        deadline = time.monotonic() - self.idle_timeout
+        for key, entry in list(self._entries.items()):
+            if entry.active or entry.last_used > deadline:
+                continue
+            del self._entries[key]
+            for channel in entry.channels:
+                self._owners.pop(id(channel), None)
+                channel.close()
@@ -0,0 +1,112 @@
+from typing import Dict, List, Optional
+import zlib
+
+from requests.exceptions import ContentDecodingError
+
+_DECOMPRESS_CHUNK_SIZE = 1 << 16
+
+
+class RpcCodec(object):
+    """Base class of the per-message compression codecs.
+
+    Subclasses must set a unique `name`, which is sent in the ``grpc-encoding``
+    header, and implement :meth:`compress` and :meth:`decompress`.
+    """
+
+    name = "identity"
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(data)
+
+    def decompress(self, data: bytes, max_length: Optional[int] = None) -> bytes:
+        """Decompresses a message.
+
+        Arguments:
+            data (bytes): The compressed message.
+            max_length (Optional[int]): Maximum size of the decompressed message.
+                If exceeded, a :class:`ContentDecodingError` is raised. Default = None
+        """
+        _check_length(len(data), max_length)
+        return bytes(data)
+
+
+class ZlibCodec(RpcCodec):
+    """Codec based on :mod:`zlib` streams. The `wbits` selects the container format."""
+
+    wbits = zlib.MAX_WBITS
+
+    def __init__(self, level: int = zlib.Z_DEFAULT_COMPRESSION) -> None:
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, self.wbits)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data: bytes, max_length: Optional[int] = None) -> bytes:
+        # The input is fed in chunks, and the output of each step is limited, so
+        # a small message can not expand beyond `max_length` in memory.
+        decompressor = zlib.decompressobj(self.wbits)
+        output = bytearray()
+        view = memoryview(data)
+        for start in range(0, len(view), _DECOMPRESS_CHUNK_SIZE):
+            pending = view[start : start + _DECOMPRESS_CHUNK_SIZE]
+            while pending:
+                limit = max_length - len(output) + 1 if max_length is not None else 0
+                output += decompressor.decompress(pending, limit)
+                _check_length(len(output), max_length)
+                pending = decompressor.unconsumed_tail
+        output += decompressor.flush()
+        _check_length(len(output), max_length)
+        if not decompressor.eof:
+            raise ContentDecodingError(f"Incomplete {self.name} stream")
+        return bytes(output)
+
+
+class GzipCodec(ZlibCodec):
+    name = "gzip"
+    wbits = 16 + zlib.MAX_WBITS
+
+
+class DeflateCodec(ZlibCodec):
+    name = "deflate"
+    wbits = zlib.MAX_WBITS
+
+
+_codecs: Dict[str, RpcCodec] = {}
+
+
+def register_codec(codec: RpcCodec) -> None:
+    """Registers a codec for the ``grpc-encoding`` in its name.
+
+    Arguments:
+        codec (RpcCodec): The codec instance. Replaces any codec with the same name.
+    """
+    _codecs[codec.name] = codec
+
+
+def get_codec(name: str) -> Optional[RpcCodec]:
+    """Returns the registered codec of a ``grpc-encoding``, or None if not found"""
+    return _codecs.get(name)
+
+
+def available_codecs() -> List[str]:
+    """Returns the names of all registered codecs"""
+    return list(_codecs)
+
+
+def decompress_message(encoding: str, data: bytes, max_length: Optional[int] = None) -> bytes:
+    """Decompresses a message flagged as compressed with the codec of a ``grpc-encoding``"""
+    codec = get_codec(encoding)
+    if codec is None or codec.name == "identity":
+        raise NotImplementedError(f"Compression is not supported: {encoding}")
+    return codec.decompress(data, max_length)
+
+
+def _check_length(length: int, max_length: Optional[int]) -> None:
+    if max_length is not None and length > max_length:
+        raise ContentDecodingError(f"Decompressed message exceeds {max_length} bytes")
+
+
+register_codec(RpcCodec())
+register_codec(GzipCodec())
+register_codec(DeflateCodec())
@@ -0,0 +1,151 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+import multiprocessing
+import os
+import threading
+from typing import Deque, Iterable, Iterator, Mapping, Optional, Sequence, Set, Tuple, Type, Union
+
+from google.protobuf.descriptor_pb2 import FileDescriptorSet
+from google.protobuf.message import Message
+
+from . import _json_format, _protocol
+from .protobuf import Protobuf
+
+# The message classes of the worker process, rebuilt once from the descriptor
+_worker_messages: Mapping[str, Type[Message]] = {}
+
+
+class RpcDecodePool(object):
+    def __init__(
+        self,
+        proto: Protobuf,
+        workers: Optional[int] = None,
+        window: Optional[int] = None,
+        ordered: bool = True,
+        mp_context: Optional[Union[str, multiprocessing.context.BaseContext]] = "spawn",
+    ) -> None:
+        """A pool of worker processes that convert serialized messages to dicts in parallel.
+
+        Converting large or deeply nested messages to dicts is bound to one core. Pass
+        the pool to :meth:`RpcResponse.iter_payloads` to convert the messages of a stream
+        in the workers instead. Each worker rebuilds the `proto` from its descriptor once,
+        when it starts.
+
+        Arguments:
+            proto (Protobuf): The protobuf definition of the response messages.
+            workers (Optional[int]): Number of worker processes. If None, the number
+                of CPUs is used. Default = None
+            window (Optional[int]): Maximum number of messages that are being converted
+                at a time. If None, twice the number of workers. Default = None
+            ordered (bool): Yield the dicts in the order of the messages. If False, they
+                are yielded as soon as they are converted. Default = True
+            mp_context (str|BaseContext): The multiprocessing start method, or context,
+                of the workers. The workers are spawned by default, since forking a process
+                that runs gRPC threads is unsafe. Default = "spawn"
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers < 1:
+            raise ValueError("At least one worker is required")
+        if window is None:
+            window = 2 * workers
+        if window < 1:
+            raise ValueError("The window must be at least 1")
+        if isinstance(mp_context, str):
+            mp_context = multiprocessing.get_context(mp_context)
+        self.proto = proto
+        self.workers = workers
+        self.window = window
+        self.ordered = ordered
+        self._mp_context = mp_context
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def imap(
+        self,
+        message_type: Type[Message],
+        messages: Iterable[bytes],
+        fields: Optional[Sequence[str]] = None,
+    ) -> Iterator[dict]:
+        """Converts serialized messages to dicts in the worker processes.
+
+        At most `window` messages are read ahead of the consumer. If the iteration
+        is stopped, the messages that were not converted yet are discarded.
+
+        Arguments:
+            message_type (Type[Message]): The class of the messages.
+            messages (Iterable[bytes]): The serialized messages.
+            fields (Optional[Sequence[str]]): Paths of the fields to convert, e.g. ``user.id``.
+                If None, all fields are converted.
+        """
+        name = message_type.DESCRIPTOR.full_name
+        if name not in self.proto.messages:
+            raise ValueError("No such message: " + name)
+        if fields is not None:
+            fields = (fields,) if isinstance(fields, str) else tuple(fields)
+            _json_format.message_projector(message_type, fields)
+        return self._imap(name, messages, fields)
+
+    def _imap(self, name: str, messages: Iterable[bytes], fields: Optional[Tuple[str, ...]]) -> Iterator[dict]:
+        executor = self._get_executor()
+        pending: Union[Deque[Future], Set[Future]] = deque() if self.ordered else set()
+        try:
+            for message in messages:
+                if len(pending) >= self.window:
+                    yield from self._collect(pending)
+                future = executor.submit(_decode, name, fields, bytes(message))
+                if self.ordered:
+                    pending.append(future)
+                else:
+                    pending.add(future)
+            while pending:
+                yield from self._collect(pending)
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _collect(self, pending: Union[Deque[Future], Set[Future]]) -> Iterator[dict]:
+        if self.ordered:
+            yield pending.popleft().result()
+            return
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.discard(future)
+            yield future.result()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    self.workers,
+                    mp_context=self._mp_context,
+                    initializer=_init_worker,
+                    initargs=(self.proto.descriptor.SerializeToString(),),
+                )
+            return self._executor
+
+    def close(self) -> None:
+        """Stops the worker processes. The pool starts new workers if it is used again."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+def _init_worker(descriptor: bytes) -> None:
+    global _worker_messages
+    _worker_messages = Protobuf(FileDescriptorSet.FromString(descriptor)).messages
+
+
+def _decode(name: str, fields: Optional[Tuple[str, ...]], data: bytes) -> dict:
+    message_type = _worker_messages[name]
+    message = _protocol.deserialize_message(message_type, data)
+    if fields is not None:
+        return _json_format.message_projector(message_type, fields)(message)
+    return _protocol.message_to_dict(message)
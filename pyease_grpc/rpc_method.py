@@ -1,12 +1,14 @@
-from typing import Type
+from typing import Callable, Optional, Sequence, Type, Union
 
 from google.protobuf.message import Message
 
-from . import _protocol
+from . import _json_format, _protocol
 from .rpc_method_type import MethodType
 from .rpc_trailer import RpcTrailer
 from .rpc_uri import RpcUri
 
+RequestData = Union[dict, Message, bytes]
+
 
 class RpcMethod(object):
     def __init__(
@@ -24,6 +26,7 @@ class RpcMethod(object):
         self.request = request
         self.response = response
         self.type = type
+        self._response_to_dict: Optional[Callable[[Message], dict]] = None
 
     def __str__(self) -> str:
         return str(
@@ -53,17 +56,54 @@ class RpcMethod(object):
             method=self.method,
         ).build()
 
-    def parse_request(self, data: dict) -> Message:
-        return _protocol.parse_message(self.request, data)
+    def parse_request(self, data: RequestData) -> Message:
+        """Returns the request message of a JSON like dict, a message or serialized message bytes"""
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            return _protocol.deserialize_message(self.request, data)
+        return self._check_message(data)
+
+    def prepare_request(self, data: RequestData) -> Union[Message, bytes]:
+        """Returns the request message of a JSON like dict. Messages and bytes are returned as is."""
+        if type(data) is self.request or isinstance(data, bytes):
+            return data
+        if isinstance(data, (bytearray, memoryview)):
+            return bytes(data)
+        return self._check_message(data)
 
-    def serialize_request(self, data: dict) -> bytes:
-        return self.parse_request(data).SerializeToString()
+    def serialize_request(self, data: RequestData) -> bytes:
+        data = self.prepare_request(data)
+        if isinstance(data, bytes):
+            return data
+        return data.SerializeToString()
+
+    def _check_message(self, data: Union[dict, Message]) -> Message:
+        if not isinstance(data, Message):
+            return _protocol.parse_message(self.request, data)
+        if type(data) is not self.request and data.DESCRIPTOR.full_name != self.request.DESCRIPTOR.full_name:
+            raise TypeError(f"Expected {self.request.DESCRIPTOR.full_name}, got {data.DESCRIPTOR.full_name}")
+        return data
 
     def deserialize_response(self, data: bytes) -> Message:
         return _protocol.deserialize_message(self.response, data)
 
-    def deserialize_response_dict(self, data: bytes) -> dict:
-        return _protocol.message_to_dict(self.deserialize_response(data))
+    def deserialize_response_dict(self, data: bytes, fields: Optional[Sequence[str]] = None) -> dict:
+        """Converts a serialized response to a dict.
+
+        Arguments:
+            data (bytes): The serialized response message.
+            fields (Optional[Sequence[str]]): Paths of the fields to convert, e.g. ``user.id``.
+                The other fields are left out. If None, all fields are converted.
+        """
+        if fields is not None:
+            return _json_format.message_projector(self.response, fields)(self.deserialize_response(data))
+        to_dict = self._response_to_dict
+        if to_dict is None:
+            # Compiled on first use, for the methods that are never called
+            to_dict = self._response_to_dict = _json_format.message_decoder(self.response)
+        return to_dict(self.deserialize_response(data))
+
+    def deserialize_response_view(self, data: bytes) -> dict:
+        return _json_format.message_to_view(self.deserialize_response(data))
 
     def deserialize_trailer(self, trailer: bytes) -> RpcTrailer:
         trailer = _protocol.deserialize_trailer(trailer)
@@ -1,27 +1,327 @@
 from collections import deque
-from typing import Generator, List, Optional
+import queue
+import threading
+from typing import TYPE_CHECKING, Generator, Iterable, Iterator, List, Optional, Sequence, Tuple, Type, TypeVar, Union
+import weakref
+
+from google.protobuf.message import Message
+
+from . import _json_format, _protocol
+from ._json_format import MessageView
+
+if TYPE_CHECKING:
+    from .rpc_decode_pool import RpcDecodePool
+
+Payload = Union[dict, MessageView, Message, bytes]
+
+_OUTPUTS = ("dict", "view", "message", "raw")
+
+_T = TypeVar("_T")
+_END = object()
+_POLL_INTERVAL = 0.1
+
+
+def _check_output(output: str) -> str:
+    """Validates the name of a payload format. Returns the name."""
+    if output not in _OUTPUTS:
+        raise ValueError("Invalid output: " + str(output))
+    return output
+
+
+def _check_fields(
+    fields: Optional[Sequence[str]],
+    output: str,
+    message_type: Optional[Type[Message]],
+) -> Optional[Tuple[str, ...]]:
+    """Validates the paths of the selected fields. Returns the paths."""
+    if fields is None:
+        return None
+    if output != "dict":
+        raise ValueError("Fields can only be selected with the dict output")
+    fields = (fields,) if isinstance(fields, str) else tuple(fields)
+    if message_type is not None:
+        _json_format.message_projector(message_type, fields)
+    return fields
+
+
+class _Prefetcher(object):
+    """Reads items in a background thread, up to `size` items ahead of the consumer.
+
+    The errors of the reader are raised to the consumer. After :meth:`stop`, the
+    reader stops once the item it is reading arrives, and the consumer stops once
+    the items that were read ahead are consumed.
+    """
+
+    def __init__(self, items: Iterable[_T], size: int) -> None:
+        self._items = items
+        self._queue: queue.Queue = queue.Queue(size)
+        self._stopped = threading.Event()
+        self._done = False
+        self._thread = threading.Thread(target=self._read, name="pyease-grpc-prefetch", daemon=True)
+        self._thread.start()
+
+    def __iter__(self) -> "_Prefetcher":
+        return self
+
+    def __next__(self) -> _T:
+        while not self._done:
+            try:
+                item, error = self._queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                if not self._thread.is_alive() and self._queue.empty():
+                    self._done = True  # stopped
+                continue
+            if item is not _END:
+                return item
+            self._done = True
+            if error is not None:
+                raise error
+        raise StopIteration
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _read(self) -> None:
+        try:
+            for item in self._items:
+                if not self._put((item, None)):
+                    return
+        except BaseException as e:
+            self._put((_END, e))
+        else:
+            self._put((_END, None))
+
+    def _put(self, entry: tuple) -> bool:
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(entry, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+
+def _iter_source(ref: "weakref.ReferenceType[RpcResponse]") -> Iterator[Payload]:
+    """Yields the payloads of the source of a response, while the response is alive.
+
+    The response is only referred to while a payload is read, so that a prefetch
+    thread does not keep a response that was dropped.
+    """
+    while True:
+        response = ref()
+        if response is None:
+            return
+        try:
+            payload = next(response._source)
+        except StopIteration:
+            return
+        finally:
+            del response
+        yield payload
 
 
 class RpcResponse(object):
     def __init__(
         self,
-        payloads: Optional[List[dict]] = None,
+        payloads: Optional[List[Payload]] = None,
+        output: str = "dict",
+        message_type: Optional[Type[Message]] = None,
+        fields: Optional[Sequence[str]] = None,
+        retain: bool = True,
+        prefetch: int = 0,
     ) -> None:
-        self._payloads: List[dict] = payloads if payloads is not None else []
+        """Initializes a response.
+
+        Arguments:
+            payloads (Optional[List]): The response payloads.
+            output (str): Format of the payloads. One of "dict" for JSON like dicts,
+                "view" for :class:`MessageView` dicts that convert the fields when they
+                are read, "message" for protobuf :class:`Message` instances, or "raw"
+                for the serialized messages. Default = "dict"
+            message_type (Optional[Type[Message]]): The response message class.
+            fields (Optional[Sequence[str]]): Paths of the fields of the dict payloads,
+                e.g. ``user.id``. The other fields are not converted. Default = None
+            retain (bool): Keep the payloads that are read from a stream in `payloads`.
+                If False, the stream can be read only once, and only the last payload is
+                kept for `single`. Default = True
+            prefetch (int): Number of payloads that are received and converted ahead of
+                the consumer in a background thread. If 0, the payloads are received
+                when they are read. Default = 0
+        """
+        self._payloads: List[Payload] = payloads if payloads is not None else []
         self._payloads_ready = True
+        self._last: Optional[Payload] = None
+        self.output = _check_output(output)
+        self.message_type = message_type
+        self.fields = _check_fields(fields, self.output, message_type)
+        self.retain = retain
+        self.prefetch = prefetch
+        self._prefetcher: Optional[_Prefetcher] = None
+        self._received: Optional[Iterator[Payload]] = None
+        self._source: Optional[Iterator[Payload]] = None
+        self._consumed = False
+
+    def iter_payloads(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        pool: Optional["RpcDecodePool"] = None,
+    ) -> Generator[Payload, None, None]:
+        """Yields the response payloads.
+
+        Arguments:
+            fields (Optional[Sequence[str]]): Paths of the fields to convert, e.g. ``user.id``.
+                If given, dicts of these fields are yielded instead of the payloads,
+                and the messages are read like :meth:`iter_messages`.
+            pool (Optional[RpcDecodePool]): Convert the received messages to dicts in the
+                worker processes of this pool. Only supported for the dict output.
+        """
+        if pool is not None and fields is None and self.output != "dict":
+            raise ValueError("Parallel decoding is only supported for the dict output")
+        if fields is not None:
+            yield from self._iter_selected(fields, pool)
+            return
+        if self._payloads_ready:
+            if not self.retain:
+                raise ValueError("The payloads are not retained, and have been read already")
+            yield from self._payloads
+            return
+        if self._consumed:
+            raise ValueError("The response stream has already been consumed")
+
+        payloads = []
+        for payload in self._iter_received(pool):
+            if self.retain:
+                payloads.append(payload)
+            else:
+                self._last = payload
+            yield payload
+
+        self._payloads = payloads
+        self._payloads_ready = True
+
+    def _iter_stream(self) -> Iterator[Union[Message, bytes]]:
+        """Yields the received messages, which are converted to payloads"""
+        return iter(())
+
+    def _take_stream(self) -> Iterator[Union[Message, bytes]]:
+        """Returns the received messages without keeping payloads. The stream can be read only once."""
+        if self._consumed:
+            raise ValueError("The response stream has already been consumed")
+        self._consumed = True
+        return self._iter_stream()
+
+    def _reads_payloads(self, output: str) -> bool:
+        """Whether the messages are read through the payloads instead of directly from the stream"""
+        return self._payloads_ready or self._received is not None or self.output == output
 
-    def iter_payloads(self) -> Generator[dict, None, None]:
-        yield from self._payloads
+    def _iter_received(self, pool: Optional["RpcDecodePool"] = None) -> Iterator[Payload]:
+        if self.prefetch <= 0 and pool is None:
+            return map(self._to_payload, self._iter_stream())
+        # Kept until the stream ends, so that the payloads read ahead are not lost
+        # if the iteration is stopped and started again
+        if self._received is None:
+            if pool is not None:
+                if self.message_type is None:
+                    raise ValueError("The response message type is unknown")
+                messages = map(self._as_raw, self._iter_stream())
+                self._received = pool.imap(self.message_type, messages, self.fields)
+            else:
+                self._received = map(self._to_payload, self._iter_stream())
+            if self.prefetch > 0:
+                # The reader stops when the response is dropped without being closed
+                self._source = self._received
+                self._received = self._prefetcher = _Prefetcher(_iter_source(weakref.ref(self)), self.prefetch)
+                weakref.finalize(self, self._prefetcher.stop)
+        return self._received
+
+    def _stop_prefetch(self) -> None:
+        if self._prefetcher is not None:
+            self._prefetcher.stop()
+
+    def _iter_selected(
+        self,
+        fields: Sequence[str],
+        pool: Optional["RpcDecodePool"] = None,
+    ) -> Generator[dict, None, None]:
+        if self.message_type is None:
+            raise ValueError("The response message type is unknown")
+        if pool is not None:
+            yield from pool.imap(self.message_type, self.iter_raw(), fields)
+            return
+        project = _json_format.message_projector(self.message_type, fields)
+        for message in self.iter_messages():
+            yield project(message)
+
+    def iter_messages(self) -> Generator[Message, None, None]:
+        """Yields the response messages as protobuf :class:`Message` instances.
+
+        Unless the `output` is "message", the messages are built from the received
+        messages of an unread stream, without being kept in `payloads`. The stream
+        can then not be read again.
+        """
+        if self._reads_payloads("message"):
+            for payload in self.iter_payloads():
+                yield self._as_message(payload)
+            return
+        for message in self._take_stream():
+            yield self._as_message(message)
+
+    def iter_raw(self) -> Generator[bytes, None, None]:
+        """Yields the serialized response messages.
+
+        Unless the `output` is "raw", the messages of an unread stream are not
+        decoded nor kept in `payloads`. The stream can then not be read again.
+        """
+        if self._reads_payloads("raw"):
+            for payload in self.iter_payloads():
+                yield self._as_raw(payload)
+            return
+        for message in self._take_stream():
+            yield self._as_raw(message)
 
     @property
-    def payloads(self) -> List[dict]:
+    def payloads(self) -> List[Payload]:
+        if not self.retain:
+            raise ValueError("The payloads are not retained. Read them with iter_payloads() instead")
         if not self._payloads_ready:
             deque(self.iter_payloads(), maxlen=0)
         return self._payloads
 
     @property
-    def single(self) -> Optional[dict]:
+    def single(self) -> Optional[Payload]:
         """Returns the last response payload"""
+        if not self.retain:
+            if not self._payloads_ready:
+                deque(self.iter_payloads(), maxlen=0)
+            return self._last
         if not self.payloads:
             return None
         return self.payloads[-1]
+
+    def _to_payload(self, message: Union[Message, bytes]) -> Payload:
+        if self.output == "raw":
+            return self._as_raw(message)
+        message = self._as_message(message)
+        if self.output == "message":
+            return message
+        if self.output == "view":
+            return _json_format.message_to_view(message)
+        if self.fields is not None:
+            return _json_format.message_projector(self.message_type, self.fields)(message)
+        return _protocol.message_to_dict(message)
+
+    def _as_message(self, payload: Payload) -> Message:
+        if isinstance(payload, Message):
+            return payload
+        if isinstance(payload, MessageView):
+            return payload.message
+        if self.message_type is None:
+            raise ValueError("The response message type is unknown")
+        if isinstance(payload, (bytes, bytearray, memoryview)):
+            return _protocol.deserialize_message(self.message_type, payload)
+        return _protocol.parse_message(self.message_type, payload)
+
+    def _as_raw(self, payload: Payload) -> bytes:
+        if isinstance(payload, (bytes, bytearray, memoryview)):
+            return bytes(payload)
+        return self._as_message(payload).SerializeToString()
@@ -0,0 +1,37 @@
+from typing import AsyncGenerator, List, Optional
+
+
+class AsyncRpcResponse(object):
+    def __init__(
+        self,
+        payloads: Optional[List[dict]] = None,
+    ) -> None:
+        self._payloads: List[dict] = payloads if payloads is not None else []
+        self._payloads_ready = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        await self.aclose()
+
+    async def iter_payloads(self) -> AsyncGenerator[dict, None]:
+        for payload in self._payloads:
+            yield payload
+
+    async def payloads(self) -> List[dict]:
+        """Returns all response payloads"""
+        if not self._payloads_ready:
+            async for _ in self.iter_payloads():
+                pass
+        return self._payloads
+
+    async def single(self) -> Optional[dict]:
+        """Returns the last response payload"""
+        payloads = await self.payloads()
+        if not payloads:
+            return None
+        return payloads[-1]
+
+    async def aclose(self) -> None:
+        """Releases the resources held by the response."""
@@ -1,9 +1,8 @@
-from typing import Generator, Iterable
+from typing import Callable, Generator, Iterable, Optional, Sequence, Type, Union
 
 from google.protobuf.message import Message
 import grpc
 
-from . import _protocol
 from .rpc_response import RpcResponse
 
 
@@ -11,11 +10,40 @@ class RpcNativeResponse(RpcResponse):
     def __init__(
         self,
         channel: grpc.Channel,
-        response_iter: Iterable[Message],
+        response_iter: Iterable[Union[Message, bytes]],
+        release: Optional[Callable[[grpc.Channel], None]] = None,
+        output: str = "dict",
+        message_type: Optional[Type[Message]] = None,
+        fields: Optional[Sequence[str]] = None,
+        retain: bool = True,
+        prefetch: int = 0,
     ) -> None:
-        super().__init__()
+        """Initializes the response of a native call.
+
+        Arguments:
+            channel (grpc.Channel): The channel of the call.
+            response_iter (Iterable[Message|bytes]): The response messages, or the serialized
+                response messages if the call has no response deserializer.
+            release (Optional[Callable]): Gives back the channel when the response is complete
+                or closed. If None, the channel is closed instead.
+            output (str): Format of the payloads. One of "dict", "view", "message" or "raw". Default = "dict"
+            message_type (Optional[Type[Message]]): The response message class.
+            fields (Optional[Sequence[str]]): Paths of the fields of the dict payloads. Default = None
+            retain (bool): Keep the payloads that are read in `payloads`. Default = True
+            prefetch (int): Number of payloads that are received and converted ahead of the
+                consumer in a background thread. Default = 0
+        """
+        super().__init__(
+            output=output,
+            message_type=message_type,
+            fields=fields,
+            retain=retain,
+            prefetch=prefetch,
+        )
         self.channel = channel
         self._response_iterator = response_iter
+        self._release = release
+        self._released = False
         self._payloads_ready = False
 
     def __enter__(self):
@@ -24,22 +52,35 @@ class RpcNativeResponse(RpcResponse):
     def __exit__(self, *_):
         self.close()
 
-    def iter_payloads(self) -> Generator[dict, None, None]:
-        if self._payloads_ready:
-            yield from self._payloads
-            return
+    def _iter_stream(self) -> Generator[Union[Message, bytes], None, None]:
+        try:
+            for message in self._response_iterator:
+                if not message and not isinstance(message, bytes):
+                    continue
+                yield message
+        except Exception:
+            if self._release is not None:
+                self._release_channel()
+            raise
 
-        payloads = []
-        for message in self._response_iterator:
-            if not message:
-                continue
-            payload = _protocol.message_to_dict(message)
-            payloads.append(payload)
-            yield payload
+        if self._release is not None:
+            self._release_channel()
 
-        self._payloads = payloads
-        self._payloads_ready = True
+    def _release_channel(self):
+        if not self._released:
+            self._released = True
+            self._release(self.channel)
 
     def close(self):
-        """Closes the Channel and releases all resources held by it."""
-        self.channel.close()
+        """Cancels the call if it is still in progress, and releases the channel.
+
+        The channel is closed, unless it was given back to its owner.
+        """
+        self._stop_prefetch()
+        if self._release is None:
+            self.channel.close()
+            return
+        cancel = getattr(self._response_iterator, "cancel", None)
+        if cancel is not None:
+            cancel()
+        self._release_channel()
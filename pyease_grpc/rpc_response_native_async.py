@@ -0,0 +1,47 @@
+from typing import AsyncGenerator
+
+from grpc import aio
+
+from . import _protocol
+from .rpc_response_async import AsyncRpcResponse
+
+
+class AsyncRpcNativeResponse(AsyncRpcResponse):
+    def __init__(
+        self,
+        call: aio.Call,
+        server_streaming: bool = False,
+    ) -> None:
+        super().__init__()
+        self.call = call
+        self.server_streaming = server_streaming
+        self._payloads_ready = False
+
+    async def iter_payloads(self) -> AsyncGenerator[dict, None]:
+        if self._payloads_ready:
+            for payload in self._payloads:
+                yield payload
+            return
+
+        payloads = []
+        if self.server_streaming:
+            async for message in self.call:
+                if not message:
+                    continue
+                payload = _protocol.message_to_dict(message)
+                payloads.append(payload)
+                yield payload
+        else:
+            message = await self.call
+            if message:
+                payload = _protocol.message_to_dict(message)
+                payloads.append(payload)
+                yield payload
+
+        self._payloads = payloads
+        self._payloads_ready = True
+
+    async def aclose(self) -> None:
+        """Cancels the call if it is still in progress."""
+        if not self.call.done():
+            self.call.cancel()
@@ -1,46 +1,70 @@
-from typing import Generator
+from typing import Generator, Optional, Sequence
 
 from requests import Response
 
 from . import _protocol
+from .rpc_codec import decompress_message
 from .rpc_method import RpcMethod
-from .rpc_response import RpcResponse
+from .rpc_response import Payload, RpcResponse
 
 
 class RpcWebResponse(RpcResponse):
-    def __init__(self, method: RpcMethod, response: Response) -> None:
-        super().__init__()
+    def __init__(
+        self,
+        method: RpcMethod,
+        response: Response,
+        chunk_size: Optional[int] = None,
+        max_decompressed_size: Optional[int] = None,
+        output: str = "dict",
+        fields: Optional[Sequence[str]] = None,
+        retain: bool = True,
+        prefetch: int = 0,
+    ) -> None:
+        super().__init__(
+            output=output,
+            message_type=method.response,
+            fields=fields,
+            retain=retain,
+            prefetch=prefetch,
+        )
         self.method = method
         self.response = response
         self.raw = response.raw
+        self.chunk_size = chunk_size
+        self.max_decompressed_size = max_decompressed_size
         self._payloads_ready = False
 
-    def iter_payloads(self) -> Generator[dict, None, None]:
+    def _to_payload(self, message: bytes) -> Payload:
+        if self.output == "dict" and self.fields is not None:
+            return self.method.deserialize_response_dict(message, self.fields)
+        if self.output == "dict":
+            return self.method.deserialize_response_dict(message)
+        if self.output == "view":
+            return self.method.deserialize_response_view(message)
+        if self.output == "message":
+            return self.method.deserialize_response(message)
+        return bytes(message)
+
+    def _iter_stream(self) -> Generator[bytes, None, None]:
         if self.response.status_code >= 400:
             self._payloads = []
             self._payloads_ready = True
             return
 
-        if self._payloads_ready:
-            yield from self._payloads
-            return
-
-        payloads = []
-        messages = _protocol.unwrap_message_stream(self.response)
+        messages = _protocol.unwrap_message_stream(self.response, self.chunk_size)
         for message, trailer, compressed in messages:
             if compressed:
-                raise NotImplementedError("Compression is not supported")
+                message = self._decompress(message)
             if trailer:
                 trailer = self.method.deserialize_trailer(message)
                 if not trailer.is_ok():
                     raise trailer
                 break
-            payload = self.method.deserialize_response_dict(message)
-            payloads.append(payload)
-            yield payload
+            yield message
 
-        self._payloads = payloads
-        self._payloads_ready = True
+    def _decompress(self, message: bytes) -> bytes:
+        encoding = self.response.headers.get("grpc-encoding", "identity")
+        return decompress_message(encoding, message, self.max_decompressed_size)
 
     @property
     def headers(self) -> dict:
@@ -48,4 +72,5 @@ class RpcWebResponse(RpcResponse):
 
     def close(self):
         """Closes the response and releases the connection back to the pool."""
+        self._stop_prefetch()
         self.response.close()
@@ -0,0 +1,69 @@
+from typing import AsyncGenerator, Optional
+
+from . import _protocol
+from .rpc_codec import decompress_message
+from .rpc_method import RpcMethod
+from .rpc_response_async import AsyncRpcResponse
+from .rpc_transport import AsyncHttpResponse
+
+
+class AsyncRpcWebResponse(AsyncRpcResponse):
+    def __init__(
+        self,
+        method: RpcMethod,
+        response: AsyncHttpResponse,
+        max_decompressed_size: Optional[int] = None,
+    ) -> None:
+        super().__init__()
+        self.method = method
+        self.response = response
+        self.max_decompressed_size = max_decompressed_size
+        self._payloads_ready = False
+
+    async def iter_payloads(self) -> AsyncGenerator[dict, None]:
+        if self.response.status_code >= 400:
+            self._payloads = []
+            self._payloads_ready = True
+            return
+
+        if self._payloads_ready:
+            for payload in self._payloads:
+                yield payload
+            return
+
+        payloads = []
+        text = _protocol.is_text_response(self.response)
+        messages = _protocol.aiter_message_stream(self.response.read, text)
+        try:
+            async for message, trailer, compressed in messages:
+                if compressed:
+                    encoding = self.response.headers.get("grpc-encoding", "identity")
+                    message = decompress_message(encoding, message, self.max_decompressed_size)
+                if trailer:
+                    trailer = self.method.deserialize_trailer(message)
+                    if not trailer.is_ok():
+                        raise trailer
+                    break
+                payload = self.method.deserialize_response_dict(message)
+                payloads.append(payload)
+                yield payload
+            # Read the end of the body, so that the connection can be reused
+            while await self.response.read():
+                pass
+        except BaseException:
+            # Cancelled or failed in the middle of the stream; the connection can not be reused.
+            await self.aclose()
+            raise
+        finally:
+            await messages.aclose()
+
+        self._payloads = payloads
+        self._payloads_ready = True
+
+    @property
+    def headers(self) -> dict:
+        return self.response.headers
+
+    async def aclose(self) -> None:
+        """Closes the response and releases the connection."""
+        await self.response.aclose()
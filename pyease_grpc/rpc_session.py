@@ -1,22 +1,56 @@
 import logging
-from typing import Iterable, List, Optional, Union
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
+from google.protobuf.descriptor_pb2 import FileDescriptorSet
 import grpc
 from requests import Session
+from requests.adapters import HTTPAdapter
 from requests.cookies import RequestsCookieJar
 from requests.structures import CaseInsensitiveDict
+from urllib3.connection import HTTPConnection
 
 from . import _protocol
 from .protobuf import Protobuf
-from .rpc_method import RpcMethod
+from .rpc_batch import BatchCall, RpcBatch
+from .rpc_channel_pool import ChannelOptions, RpcChannelPool
+from .rpc_codec import available_codecs, get_codec
+from .rpc_method import RequestData, RpcMethod
 from .rpc_method_type import MethodType
+from .rpc_response import _check_fields, _check_output
 from .rpc_response_native import RpcNativeResponse
 from .rpc_response_web import RpcWebResponse
+from .rpc_stub import RpcBoundMethod, RpcStub
 from .rpc_trailer import RpcTrailer
 from .rpc_uri import RpcUri
 
 log = logging.getLogger(__name__)
 
+_NATIVE_COMPRESSION = {
+    "identity": grpc.Compression.NoCompression,
+    "gzip": grpc.Compression.Gzip,
+    "deflate": grpc.Compression.Deflate,
+}
+
+SocketOptions = Sequence[Tuple[int, int, Union[int, bytes]]]
+
+# The settings of the base session that are copied to the sessions of other threads
+_SESSION_ATTRS = ("auth", "proxies", "hooks", "params", "verify", "cert", "trust_env", "max_redirects")
+
+
+class _HTTPAdapter(HTTPAdapter):
+    __attrs__ = HTTPAdapter.__attrs__ + ["socket_options"]
+
+    def __init__(self, socket_options: Optional[SocketOptions] = None, **kwargs) -> None:
+        self.socket_options = list(socket_options or [])
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        if self.socket_options:
+            # Keeps the defaults of urllib3, which disable Nagle's algorithm
+            kwargs["socket_options"] = HTTPConnection.default_socket_options + self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
 
 class RpcSession(object):
     @classmethod
@@ -25,6 +59,7 @@ class RpcSession(object):
         proto_file: str,
         include_paths: Optional[List[str]] = None,
         work_dir: Optional[str] = None,
+        **kwargs,
     ):
         """Make a :class:`RpcSession` from a proto file.
 
@@ -32,59 +67,223 @@ class RpcSession(object):
             proto_file (str) A *.proto file containing protobuf definitions.
             include_paths (List[str]) Additional paths to include when parsing. Default = []
             work_dir (Optional[str]): Main working folder. Default = None
+            kwargs: Passed to the :class:`RpcSession` constructor.
         """
         return cls(
             Protobuf.from_file(
                 proto_file=proto_file,
                 include_paths=include_paths,
                 work_dir=work_dir,
-            )
+            ),
+            **kwargs,
         )
 
     @classmethod
-    def from_descriptor(cls, descriptor_json: dict):
+    def from_descriptor(cls, descriptor_json: dict, **kwargs):
         """Make a :class:`RpcSession` from a file description set message.
 
         Arguments:
             descriptor_json (dict): File descriptor set message content.
+            kwargs: Passed to the :class:`RpcSession` constructor.
         """
-        return cls(Protobuf.restore(descriptor_json))
+        return cls(Protobuf.restore(descriptor_json), **kwargs)
+
+    @classmethod
+    def from_reflection(
+        cls,
+        target: str,
+        services: Optional[Sequence[str]] = None,
+        credentials: Optional[grpc.ChannelCredentials] = None,
+        timeout: Optional[float] = None,
+        cache_dir: Optional[str] = None,
+        ttl: Optional[float] = 300,
+        **kwargs,
+    ):
+        """Make a :class:`RpcSession` from the gRPC Server Reflection service of a server.
+
+        The descriptors are fetched over a channel of the session pool, which is kept
+        for the native calls. See :meth:`Protobuf.from_reflection`.
 
-    def __init__(self, proto: Protobuf) -> None:
+        Arguments:
+            target (str): The server address. e.g. localhost:50050
+            services (Optional[Sequence[str]]): Full names of the services to load.
+                If None, all services of the server. Default = None
+            credentials (Optional[grpc.ChannelCredentials]): Credentials of the channel.
+                If None, an insecure channel is used. Default = None
+            timeout (Optional[float]): Timeout in seconds of the reflection call. Default = None
+            cache_dir (Optional[str]): A folder to cache the descriptors in. Default = None
+            ttl (Optional[float]): Seconds for which the cached descriptors are used. Default = 300
+            kwargs: Passed to the :class:`RpcSession` constructor.
+        """
+        session = cls(Protobuf(FileDescriptorSet()), **kwargs)
+        try:
+            channel = session.channels.acquire(target, credentials)
+            try:
+                session._proto = Protobuf.from_reflection(
+                    target,
+                    services,
+                    channel=channel,
+                    timeout=timeout,
+                    cache_dir=cache_dir,
+                    ttl=ttl,
+                )
+            finally:
+                session.channels.release(channel)
+        except BaseException:
+            session.close()
+            raise
+        return session
+
+    def __init__(
+        self,
+        proto: Protobuf,
+        chunk_size: Optional[int] = None,
+        compression: Optional[str] = None,
+        compression_threshold: int = 1024,
+        max_decompressed_size: Optional[int] = None,
+        text_mode: bool = False,
+        channel_options: Optional[ChannelOptions] = None,
+        subchannels: int = 1,
+        channel_idle_timeout: Optional[float] = None,
+        output: str = "dict",
+        retain: bool = True,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        socket_options: Optional[SocketOptions] = None,
+        thread_safe: bool = False,
+        base_url: Optional[str] = None,
+    ) -> None:
         """Initializes a new RpcSession.
 
         Arguments:
             proto (Protobuf): The protobuf definition.
+            chunk_size (Optional[int]): Fixed chunk size for reading gRPC-Web responses.
+                If None, the reads are directed by the length of each message. Default = None
+            compression (Optional[str]): Name of a registered codec to compress the request
+                messages with, e.g. "gzip" or "deflate". Native calls only support the
+                "gzip" and "deflate" codecs. Default = None
+            compression_threshold (int): Request messages smaller than this many bytes
+                are sent uncompressed. Default = 1024
+            max_decompressed_size (Optional[int]): Maximum size of a decompressed response
+                message. If None, the size is not limited. Default = None
+            text_mode (bool): Use the base64 encoded ``application/grpc-web-text`` format
+                for the gRPC-Web requests. Default = False
+            channel_options (Optional[List[Tuple[str, Any]]]): Default arguments of the native
+                channels, e.g. keepalive, max message sizes or HTTP/2 window tuning. Default = None
+            subchannels (int): Number of native channels opened per target to spread
+                the calls over. Default = 1
+            channel_idle_timeout (Optional[float]): Seconds after which unused native channels
+                are closed. If None, they are kept until the session is closed. Default = None
+            output (str): Format of the response payloads. One of "dict" for JSON like dicts,
+                "view" for read-only dicts that convert the fields when they are read,
+                "message" for protobuf messages, or "raw" for the serialized messages, which
+                skip the conversion to dict. Default = "dict"
+            retain (bool): Keep the payloads of the responses in `payloads`. If False, the
+                responses can be read only once, and only the last payload is kept, so that
+                long streams use constant memory. Default = True
+            pool_connections (int): Number of hosts whose gRPC-Web connections are pooled.
+                Default = 10
+            pool_maxsize (int): Maximum number of connections kept per host. It should be
+                at least the number of threads making gRPC-Web requests at a time, or the
+                extra connections are discarded after each request. Default = 10
+            pool_block (bool): Wait for a pooled connection when all `pool_maxsize` connections
+                of a host are in use, instead of opening an extra connection. Default = False
+            keep_alive (bool): Keep the gRPC-Web connections open for the next requests.
+                If False, every request uses a new connection. Default = True
+            socket_options (Optional[List[Tuple[int, int, int|bytes]]]): Options set on the
+                sockets of the gRPC-Web connections, in addition to the defaults of urllib3,
+                e.g. ``[(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]``. Default = None
+            thread_safe (bool): Give each thread its own HTTP session for the gRPC-Web requests.
+                The sessions share the connection pools, and the cookies of :attr:`session`.
+                The other settings of :attr:`session` are copied when a thread makes its
+                first request. Default = False
+            base_url (Optional[str]): The address of the server that the gRPC paths are called at,
+                e.g. http://localhost:8080. Default = None
         """
+        if compression is not None and get_codec(compression) is None:
+            raise ValueError("No such codec: " + compression)
         self._proto = proto
-        self._session = Session()
+        self._adapter = _HTTPAdapter(
+            socket_options=socket_options,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        self._session = self._mount(Session())
+        if not keep_alive:
+            self._session.headers["Connection"] = "close"
+        self._local = threading.local()
+        self._local.session = self._session
+        self._channels = RpcChannelPool(
+            subchannels=subchannels,
+            idle_timeout=channel_idle_timeout,
+            options=channel_options,
+        )
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self.max_decompressed_size = max_decompressed_size
+        self.text_mode = text_mode
+        self.output = _check_output(output)
+        self.retain = retain
+        self.thread_safe = thread_safe
+        self.base_url = base_url
 
     def __enter__(self):
         return self
 
     def __exit__(self, exception_type, exception_value, traceback):
-        self._session.close()
+        self.close()
 
     @property
     def session(self) -> Session:
-        """The internal session used for the gRPC-Web request"""
+        """The internal session used for the gRPC-Web request.
+
+        In the thread-safe mode, the settings of this session are copied to the
+        sessions of the other threads, when they make their first request.
+        """
         return self._session
 
+    def _mount(self, session: Session) -> Session:
+        session.mount("http://", self._adapter)
+        session.mount("https://", self._adapter)
+        return session
+
+    def _http_session(self) -> Session:
+        if not self.thread_safe:
+            return self._session
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._mount(Session())
+            session.headers = CaseInsensitiveDict(self._session.headers)
+            session.cookies = self._session.cookies
+            for name in _SESSION_ATTRS:
+                setattr(session, name, getattr(self._session, name))
+            self._local.session = session
+        return session
+
+    @property
+    def channels(self) -> RpcChannelPool:
+        """The pool of channels used for the native calls"""
+        return self._channels
+
+    def close(self) -> None:
+        """Closes the HTTP session and all pooled channels."""
+        self._session.close()
+        self._channels.close()
+
     def _resolve_method(self, uri: RpcUri) -> RpcMethod:
-        if uri.service not in self._proto.services:
-            raise ValueError("No such service: " + uri.service)
-        service = self._proto.services[uri.service]
-        if uri.method not in service:
-            raise ValueError("No such method: " + uri.method)
-        method = service[uri.method]
-        if uri.package != method.package:
-            raise ValueError("Invalid package name: " + uri.package)
-        return method
+        return _resolve_method(self._proto, uri)
+
+    def _resolve(self, uri: Union[str, RpcUri]) -> Tuple[RpcMethod, RpcUri]:
+        return _resolve_uri(self._proto, self.base_url, uri)
 
     def request(
         self,
         uri: Union[str, RpcUri],
-        data: dict,
+        data: RequestData,
         headers: Optional[CaseInsensitiveDict] = None,
         timeout: Optional[float] = None,
         cookies: Optional[Union[dict, RequestsCookieJar]] = None,
@@ -92,12 +291,19 @@ class RpcSession(object):
         proxies: Optional[dict] = None,
         verify: bool = True,
         cert: Optional[Union[str, tuple]] = None,
+        text_mode: Optional[bool] = None,
+        fields: Optional[Sequence[str]] = None,
+        retain: Optional[bool] = None,
+        prefetch: int = 0,
     ) -> RpcWebResponse:
         """Calls a gRPC method using the Web protocol.
 
         Arguments:
-            uri (str|RpcUri): Full URL of an RPC method, or an :class:`RpcUri` instance.
-            data (dict): Request message as JSON.
+            uri (str|RpcUri): Full URL of an RPC method, an :class:`RpcUri` instance, or the
+                gRPC path of the method, e.g. ``/pyease.sample.v1.Greeter/SayHello``, which is
+                called at the `base_url` of the session.
+            data (dict|Message|bytes): Request message as JSON, a message of the request
+                type, or the serialized message.
             headers (dict): Additional request headers.
             timeout (float): Timeout in seconds. If None, no timeout will be enforced.
 
@@ -115,97 +321,490 @@ class RpcSession(object):
                 may be useful during local development or testing.
             cert (str|tuple) if String, path to ssl client cert file (.pem).
                 If Tuple, ('cert', 'key') pair.
+            text_mode (bool) Use the ``application/grpc-web-text`` format.
+                If None, the session default is used.
+            fields (Sequence[str]) Paths of the fields of the dict payloads, e.g. ``user.id``.
+                The other fields are not converted. If None, all fields are converted.
+            retain (bool) Keep the payloads in `payloads`. If None, the session default is used.
+            prefetch (int) Number of payloads that are received and converted ahead of the
+                consumer in a background thread. If 0, they are received when they are read.
 
         Returns:
             An :class:`RpcWebResponse` with one or more payloads.
         """
-        if isinstance(uri, str):
-            uri = RpcUri.parse(uri)
-        method = self._resolve_method(uri)
+        method, uri = self._resolve(uri)
+
+        if text_mode is None:
+            text_mode = self.text_mode
 
         # Prepare request headers
-        headers = CaseInsensitiveDict(headers or {})
-        headers["x-grpc-web"] = "1"
-        headers["content-type"] = "application/grpc-web+proto"
-        if timeout is not None:
-            grpc_timeout = _protocol.serialize_timeout(timeout)
-            headers["grpc-timeout"] = grpc_timeout
+        headers = _web_request_headers(headers, timeout, text_mode, self.compression)
 
         # Prepare request data
-        message = method.serialize_request(data)
-        message = _protocol.wrap_message(message)
-
-        # Get the response
-        response = self._session.post(
-            url=uri.build(),
-            data=message,
+        message = _web_request_body(method, data, text_mode, self.compression, self.compression_threshold)
+
+        return self._post(
+            method,
+            uri.build(),
+            message,
+            headers,
+            self.output,
             timeout=timeout,
-            headers=dict(headers),
-            allow_redirects=True,
-            stream=True,
             auth=auth,
             cookies=cookies,
             verify=verify,
             cert=cert,
             proxies=proxies,
+            fields=fields,
+            retain=self.retain if retain is None else retain,
+            prefetch=prefetch,
         )
-        response.raise_for_status()
-
-        if "grpc-status" in response.headers:
-            trailer = RpcTrailer(response.headers)
-            if not trailer.is_ok():
-                raise trailer
 
-        return RpcWebResponse(method, response)
+    def _post(
+        self,
+        method: RpcMethod,
+        url: str,
+        message: bytes,
+        headers: dict,
+        output: str,
+        timeout: Optional[float] = None,
+        verify: bool = True,
+        fields: Optional[Sequence[str]] = None,
+        retain: bool = True,
+        prefetch: int = 0,
+        **kwargs,
+    ) -> RpcWebResponse:
+        fields = _check_fields(fields, output, method.response)
+        response = self._http_session().post(
+            url=url,
+            data=message,
+            timeout=timeout,
+            headers=headers,
+            allow_redirects=True,
+            stream=True,
+            verify=verify,
+            **kwargs,
+        )
+        response.raise_for_status()
+        _check_header_trailer(response.headers)
+
+        return RpcWebResponse(
+            method,
+            response,
+            chunk_size=self.chunk_size,
+            max_decompressed_size=self.max_decompressed_size,
+            output=output,
+            fields=fields,
+            retain=retain,
+            prefetch=prefetch,
+        )
 
     def call(
         self,
         uri: Union[str, RpcUri],
-        data: Union[dict, Iterable[dict]],
+        data: Union[RequestData, Iterable[RequestData]],
         channel: grpc.Channel = None,
         timeout: Optional[float] = None,
+        credentials: Optional[grpc.ChannelCredentials] = None,
+        options: Optional[ChannelOptions] = None,
+        fields: Optional[Sequence[str]] = None,
+        retain: Optional[bool] = None,
+        prefetch: int = 0,
     ) -> RpcNativeResponse:
         """Calls the gRPC method using native gRPC protocol.
 
         Arguments:
-            uri (str|RpcUri): Full URL of an RPC method, or an :class:`RpcUri` instance.
-            data (dict|Iterable[dict]): Request message data or iterable data for stream.
-            channel (grpc.Channel): The Channel to use. If not provided,
-                an insecure channel will be used by default.
+            uri (str|RpcUri): Full URL of an RPC method, an :class:`RpcUri` instance, or the
+                gRPC path of the method, e.g. ``/pyease.sample.v1.Greeter/SayHello``, which is
+                called at the `base_url` of the session.
+            data (dict|Message|bytes|Iterable): Request message data or iterable data for stream.
+                Each message can be given as JSON, a message of the request type, or serialized bytes.
+            channel (grpc.Channel): The Channel to use. If not provided, a channel from
+                the session pool is used. The given channel is not closed by the response.
             timeout (float): Timeout in seconds. If None, no timeout will be enforced.
+            credentials (grpc.ChannelCredentials): Credentials of the pooled channel.
+                If None, an insecure channel will be used by default.
+            options (List[Tuple[str, Any]]): Arguments of the pooled channel, overriding
+                the `channel_options` of the session.
+            fields (Sequence[str]): Paths of the fields of the dict payloads, e.g. ``user.id``.
+                The other fields are not converted. If None, all fields are converted.
+            retain (bool): Keep the payloads in `payloads`. If None, the session default is used.
+            prefetch (int): Number of payloads that are received and converted ahead of the
+                consumer in a background thread. If 0, they are received when they are read.
 
         Returns:
             An :class:`RpcNativeResponse` with one or more payloads.
         """
-        if isinstance(uri, str):
-            uri = RpcUri.parse(uri)
-        method = self._resolve_method(uri)
+        method, uri = self._resolve(uri)
+        fields = _check_fields(fields, self.output, method.response)
 
         # Make caller from channel
-        if not channel:
-            channel = grpc.insecure_channel(uri.base_url)
+        if channel:
+            release = _keep_channel
+        else:
+            channel = self._channels.acquire(uri.base_url, credentials, options)
+            release = self._channels.release
+
+        try:
+            bound = _NativeMethod(method, uri.path, channel, self.compression, self.output)
+            response = bound.invoke(data, timeout)
+        except BaseException:
+            release(channel)
+            raise
+        if retain is None:
+            retain = self.retain
+        return RpcNativeResponse(
+            channel,
+            response,
+            release,
+            self.output,
+            method.response,
+            fields,
+            retain,
+            prefetch,
+        )
+
+    def request_many(
+        self,
+        calls: Iterable[BatchCall],
+        concurrency: int = 8,
+        ordered: bool = True,
+        window: Optional[int] = None,
+        **kwargs,
+    ) -> RpcBatch:
+        """Calls many gRPC methods concurrently using the Web protocol.
 
+        The calls share the pooled connections of the session. The error of a call,
+        e.g. an :class:`RpcTrailer`, is kept in its result, and does not stop the batch.
+
+        Arguments:
+            calls (Iterable[Tuple[str|RpcUri, RequestData]]): The URI and the request
+                message of each call. It is read as the calls are submitted.
+            concurrency (int): Number of calls that run at a time. Default = 8
+            ordered (bool): Yield the results in the order of the calls. If False, they are
+                yielded as soon as they complete. Default = True
+            window (Optional[int]): Maximum number of calls that are submitted and not yielded
+                yet. If None, twice the `concurrency`. Default = None
+
+        Keyword Arguments:
+            The keyword arguments of :meth:`request`, which are used for every call.
+
+        Returns:
+            An :class:`RpcBatch` that yields an :class:`RpcBatchResult` for each call,
+            and exposes the progress of the batch in `stats`.
+        """
+        return RpcBatch(
+            lambda uri, data: self.request(uri, data, **kwargs),
+            calls,
+            concurrency=concurrency,
+            ordered=ordered,
+            window=window,
+        )
+
+    def call_many(
+        self,
+        calls: Iterable[BatchCall],
+        concurrency: int = 8,
+        ordered: bool = True,
+        window: Optional[int] = None,
+        **kwargs,
+    ) -> RpcBatch:
+        """Calls many gRPC methods concurrently using native gRPC protocol.
+
+        The calls share the pooled channels of the session. The error of a call,
+        e.g. a :class:`grpc.RpcError`, is kept in its result, and does not stop the batch.
+
+        Arguments:
+            calls (Iterable[Tuple[str|RpcUri, RequestData]]): The URI and the request
+                message of each call. It is read as the calls are submitted.
+            concurrency (int): Number of calls that run at a time. Default = 8
+            ordered (bool): Yield the results in the order of the calls. If False, they are
+                yielded as soon as they complete. Default = True
+            window (Optional[int]): Maximum number of calls that are submitted and not yielded
+                yet. If None, twice the `concurrency`. Default = None
+
+        Keyword Arguments:
+            The keyword arguments of :meth:`call`, which are used for every call.
+
+        Returns:
+            An :class:`RpcBatch` that yields an :class:`RpcBatchResult` for each call,
+            and exposes the progress of the batch in `stats`.
+        """
+        return RpcBatch(
+            lambda uri, data: self.call(uri, data, **kwargs),
+            calls,
+            concurrency=concurrency,
+            ordered=ordered,
+            window=window,
+        )
+
+    def stub(
+        self,
+        service: str,
+        base_url: Optional[str] = None,
+        native: bool = False,
+        headers: Optional[dict] = None,
+        text_mode: Optional[bool] = None,
+        credentials: Optional[grpc.ChannelCredentials] = None,
+        options: Optional[ChannelOptions] = None,
+    ) -> RpcStub:
+        """Makes a stub with the methods of a service bound to a server.
+
+        The method, the URL, the request headers and the native multicallable are
+        prepared once, so the calls of the stub skip the per-call setup of
+        :meth:`request` and :meth:`call`. The compression settings of the session
+        are applied as they are when the stub is made.
+
+        Arguments:
+            service (str): Full name of the service. e.g. pyease.sample.v1.Greeter
+            base_url (Optional[str]): The base address of the server. e.g. http://localhost:8080
+                If None, the `base_url` of the session is used.
+            native (bool): Call the methods using native gRPC protocol instead of gRPC-Web.
+                A native stub holds a pooled channel until it is closed, and all its calls
+                use that one channel, instead of being spread over the `subchannels` of
+                the pool like the calls of :meth:`call`. Each stub takes the next channel
+                of the pool, so several stubs spread their calls. Default = False
+            headers (dict): Additional request headers of the gRPC-Web calls.
+            text_mode (bool): Use the ``application/grpc-web-text`` format.
+                If None, the session default is used.
+            credentials (grpc.ChannelCredentials): Credentials of the native channel.
+            options (List[Tuple[str, Any]]): Arguments of the native channel.
+
+        Returns:
+            An :class:`RpcStub` with a callable for each method of the service. A gRPC-Web
+            method accepts the keyword arguments of :meth:`request`, and a native method
+            accepts a `timeout`, the `fields`, `retain` and `prefetch`.
+        """
+        methods = self._proto.get_service(service)
+        if not methods:
+            raise ValueError("No such service: " + service)
+        if base_url is None:
+            base_url = self.base_url
+        if base_url is None:
+            raise ValueError("A base URL is required to make a stub of " + service)
+
+        if native:
+            channel = self._channels.acquire(base_url, credentials, options)
+            bound = {
+                method.method: _NativeMethod(
+                    method,
+                    RpcUri(base_url, method.package, method.service, method.method).path,
+                    channel,
+                    self.compression,
+                    self.output,
+                    self.retain,
+                )
+                for method in methods.values()
+            }
+            return RpcStub(service, bound, close=lambda: self._channels.release(channel))
+
+        if text_mode is None:
+            text_mode = self.text_mode
+        bound = {
+            method.method: _WebMethod(
+                self,
+                method,
+                RpcUri(base_url, method.package, method.service, method.method).build(),
+                headers,
+                text_mode,
+            )
+            for method in methods.values()
+        }
+        return RpcStub(service, bound)
+
+
+class _WebMethod(RpcBoundMethod):
+    def __init__(
+        self,
+        session: RpcSession,
+        method: RpcMethod,
+        url: str,
+        headers: Optional[dict],
+        text_mode: bool,
+    ) -> None:
+        super().__init__(method)
+        self.url = url
+        self.headers: Dict[str, str] = dict(headers or {})
+        self.text_mode = text_mode
+        self.compression = session.compression
+        self.compression_threshold = session.compression_threshold
+        self.output = session.output
+        self.retain = session.retain
+        self._session = session
+        self._request_headers = _web_request_headers(self.headers, None, text_mode, self.compression)
+
+    def __call__(
+        self,
+        data: RequestData,
+        headers: Optional[dict] = None,
+        timeout: Optional[float] = None,
+        retain: Optional[bool] = None,
+        **kwargs,
+    ) -> RpcWebResponse:
+        request_headers = self._request_headers
+        if headers or timeout is not None:
+            request_headers = _web_request_headers(
+                dict(self.headers, **(headers or {})),
+                timeout,
+                self.text_mode,
+                self.compression,
+            )
+        message = _web_request_body(self.method, data, self.text_mode, self.compression, self.compression_threshold)
+        return self._session._post(
+            self.method,
+            self.url,
+            message,
+            request_headers,
+            self.output,
+            timeout=timeout,
+            retain=self.retain if retain is None else retain,
+            **kwargs,
+        )
+
+
+class _NativeMethod(RpcBoundMethod):
+    def __init__(
+        self,
+        method: RpcMethod,
+        path: str,
+        channel: grpc.Channel,
+        compression: Optional[str],
+        output: str = "dict",
+        retain: bool = True,
+    ) -> None:
+        super().__init__(method)
+        self.path = path
+        self.channel = channel
+        self.output = output
+        self.retain = retain
         caller = getattr(channel, str(method.type), False)
         if not caller:
-            raise ValueError("Invalid method type: " + method.type)
-
-        stub = caller(
-            uri.path,
-            request_serializer=method.request.SerializeToString,
-            response_deserializer=method.response.FromString,
+            raise ValueError("Invalid method type: " + str(method.type))
+        self._multicallable = caller(
+            path,
+            request_serializer=method.serialize_request,
+            # The raw output keeps the serialized messages as they are received
+            response_deserializer=None if output == "raw" else method.response.FromString,
         )
+        self._compression = _NATIVE_COMPRESSION.get(compression)
+        self._client_streams = method.type in (MethodType.stream_unary, MethodType.stream_stream)
+        self._server_streams = method.type in (MethodType.unary_stream, MethodType.stream_stream)
 
-        client_streams = method.type in (MethodType.stream_unary, MethodType.stream_stream)
-        server_streams = method.type in (MethodType.unary_stream, MethodType.stream_stream)
+    def __call__(
+        self,
+        data: Union[RequestData, Iterable[RequestData]],
+        timeout: Optional[float] = None,
+        fields: Optional[Sequence[str]] = None,
+        retain: Optional[bool] = None,
+        prefetch: int = 0,
+    ) -> RpcNativeResponse:
+        fields = _check_fields(fields, self.output, self.method.response)
+        if retain is None:
+            retain = self.retain
+        response = self.invoke(data, timeout)
+        return RpcNativeResponse(
+            self.channel,
+            response,
+            _keep_channel,
+            self.output,
+            self.method.response,
+            fields,
+            retain,
+            prefetch,
+        )
 
-        if client_streams:
-            request = map(method.parse_request, data)
+    def invoke(self, data: Union[RequestData, Iterable[RequestData]], timeout: Optional[float] = None) -> Iterator:
+        if self._client_streams:
+            request = map(self.method.prepare_request, data)
         else:
-            request = method.parse_request(data)
+            request = self.method.prepare_request(data)
 
-        response = stub(request, timeout=timeout)
+        response = self._multicallable(request, timeout=timeout, compression=self._compression)
 
-        if not server_streams:
+        if not self._server_streams:
             response = iter([response])
 
-        return RpcNativeResponse(channel, response)
+        return response
+
+
+def _keep_channel(channel: grpc.Channel) -> None:
+    pass
+
+
+def _resolve_uri(proto: Protobuf, base_url: Optional[str], uri: Union[str, RpcUri]) -> Tuple[RpcMethod, RpcUri]:
+    if not isinstance(uri, str):
+        return _resolve_method(proto, uri), uri
+    if not uri.startswith("/"):
+        uri = RpcUri.parse(uri)
+        return _resolve_method(proto, uri), uri
+    # A gRPC path is resolved by a single lookup, and called at the base URL of the session
+    method = proto.methods.get(uri)
+    if method is None:
+        raise ValueError("No such method: " + uri)
+    if base_url is None:
+        raise ValueError("A base URL is required to call a path: " + uri)
+    return method, RpcUri(base_url, method.package, method.service, method.method)
+
+
+def _resolve_method(proto: Protobuf, uri: RpcUri) -> RpcMethod:
+    method = proto.methods.get(uri.path)
+    if method is not None:
+        return method
+    if uri.service not in proto.services:
+        raise ValueError("No such service: " + uri.service)
+    service = proto.services[uri.service]
+    if uri.method not in service:
+        raise ValueError("No such method: " + uri.method)
+    method = service[uri.method]
+    if uri.package != method.package:
+        raise ValueError("Invalid package name: " + uri.package)
+    return method
+
+
+def _web_request_headers(
+    headers: Optional[dict],
+    timeout: Optional[float],
+    text_mode: bool,
+    compression: Optional[str],
+) -> dict:
+    headers = CaseInsensitiveDict(headers or {})
+    headers["x-grpc-web"] = "1"
+    if text_mode:
+        headers["content-type"] = "application/grpc-web-text"
+        headers["accept"] = "application/grpc-web-text"
+    else:
+        headers["content-type"] = "application/grpc-web+proto"
+    headers["grpc-accept-encoding"] = ",".join(available_codecs())
+    if compression:
+        headers["grpc-encoding"] = compression
+    if timeout is not None:
+        grpc_timeout = _protocol.serialize_timeout(timeout)
+        headers["grpc-timeout"] = grpc_timeout
+    return dict(headers)
+
+
+def _web_request_body(
+    method: RpcMethod,
+    data: RequestData,
+    text_mode: bool,
+    compression: Optional[str],
+    compression_threshold: int,
+) -> bytes:
+    message = method.serialize_request(data)
+    # The identity codec sends the messages as they are, without the compressed flag
+    codec = get_codec(compression) if compression else None
+    compressed = codec is not None and codec.name != "identity" and len(message) >= compression_threshold
+    if compressed:
+        message = codec.compress(message)
+    message = _protocol.wrap_message(message, compressed=compressed)
+    if text_mode:
+        message = _protocol.encode_text(message)
+    return message
+
+
+def _check_header_trailer(headers) -> None:
+    # A response without messages may carry the trailer in its headers
+    if "grpc-status" in headers:
+        trailer = RpcTrailer(headers)
+        if not trailer.is_ok():
+            raise trailer
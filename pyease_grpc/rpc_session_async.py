@@ -0,0 +1,243 @@
+import logging
+from typing import AsyncIterable, Dict, Iterable, List, Optional, Tuple, Union
+
+from grpc import aio
+
+from .protobuf import Protobuf
+from .rpc_codec import get_codec
+from .rpc_method import RequestData, RpcMethod
+from .rpc_method_type import MethodType
+from .rpc_response_native_async import AsyncRpcNativeResponse
+from .rpc_response_web_async import AsyncRpcWebResponse
+from .rpc_session import (
+    _NATIVE_COMPRESSION,
+    _check_header_trailer,
+    _resolve_method,
+    _resolve_uri,
+    _web_request_body,
+    _web_request_headers,
+)
+from .rpc_transport import AsyncHttpTransport, AsyncioHttpTransport
+from .rpc_uri import RpcUri
+
+log = logging.getLogger(__name__)
+
+
+class AsyncRpcSession(object):
+    @classmethod
+    def from_file(
+        cls,
+        proto_file: str,
+        include_paths: Optional[List[str]] = None,
+        work_dir: Optional[str] = None,
+        **kwargs,
+    ):
+        """Make an :class:`AsyncRpcSession` from a proto file.
+
+        Arguments:
+            proto_file (str) A *.proto file containing protobuf definitions.
+            include_paths (List[str]) Additional paths to include when parsing. Default = []
+            work_dir (Optional[str]): Main working folder. Default = None
+            kwargs: Passed to the :class:`AsyncRpcSession` constructor.
+        """
+        return cls(
+            Protobuf.from_file(
+                proto_file=proto_file,
+                include_paths=include_paths,
+                work_dir=work_dir,
+            ),
+            **kwargs,
+        )
+
+    @classmethod
+    def from_descriptor(cls, descriptor_json: dict, **kwargs):
+        """Make an :class:`AsyncRpcSession` from a file description set message.
+
+        Arguments:
+            descriptor_json (dict): File descriptor set message content.
+            kwargs: Passed to the :class:`AsyncRpcSession` constructor.
+        """
+        return cls(Protobuf.restore(descriptor_json), **kwargs)
+
+    def __init__(
+        self,
+        proto: Protobuf,
+        transport: Optional[AsyncHttpTransport] = None,
+        compression: Optional[str] = None,
+        compression_threshold: int = 1024,
+        max_decompressed_size: Optional[int] = None,
+        text_mode: bool = False,
+        base_url: Optional[str] = None,
+    ) -> None:
+        """Initializes a new AsyncRpcSession.
+
+        Arguments:
+            proto (Protobuf): The protobuf definition.
+            transport (Optional[AsyncHttpTransport]): The HTTP layer for the gRPC-Web requests.
+                If None, an :class:`AsyncioHttpTransport` is used. Default = None
+            compression (Optional[str]): Name of a registered codec to compress the request
+                messages with, e.g. "gzip" or "deflate". Default = None
+            compression_threshold (int): Request messages smaller than this many bytes
+                are sent uncompressed. Default = 1024
+            max_decompressed_size (Optional[int]): Maximum size of a decompressed response
+                message. If None, the size is not limited. Default = None
+            text_mode (bool): Use the base64 encoded ``application/grpc-web-text`` format
+                for the gRPC-Web requests. Default = False
+            base_url (Optional[str]): The address of the server that the gRPC paths are called at,
+                e.g. http://localhost:8080. Default = None
+        """
+        if compression is not None and get_codec(compression) is None:
+            raise ValueError("No such codec: " + compression)
+        self._proto = proto
+        self._transport = transport or AsyncioHttpTransport()
+        self._channels: Dict[str, aio.Channel] = {}
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self.max_decompressed_size = max_decompressed_size
+        self.text_mode = text_mode
+        self.base_url = base_url
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exception_type, exception_value, traceback):
+        await self.close()
+
+    @property
+    def transport(self) -> AsyncHttpTransport:
+        """The HTTP layer used for the gRPC-Web requests"""
+        return self._transport
+
+    def _resolve_method(self, uri: RpcUri) -> RpcMethod:
+        return _resolve_method(self._proto, uri)
+
+    def _resolve(self, uri: Union[str, RpcUri]) -> Tuple[RpcMethod, RpcUri]:
+        return _resolve_uri(self._proto, self.base_url, uri)
+
+    async def request(
+        self,
+        uri: Union[str, RpcUri],
+        data: RequestData,
+        headers: Optional[dict] = None,
+        timeout: Optional[float] = None,
+        text_mode: Optional[bool] = None,
+    ) -> AsyncRpcWebResponse:
+        """Calls a gRPC method using the Web protocol.
+
+        The call can be cancelled by cancelling the awaiting task, which also closes
+        the underlying connection.
+
+        Arguments:
+            uri (str|RpcUri): Full URL of an RPC method, an :class:`RpcUri` instance, or the
+                gRPC path of the method, which is called at the `base_url` of the session.
+            data (dict|Message|bytes): Request message as JSON, a message of the request
+                type, or the serialized message.
+            headers (dict): Additional request headers.
+            timeout (float): Timeout in seconds. If None, no timeout will be enforced.
+            text_mode (bool): Use the ``application/grpc-web-text`` format.
+                If None, the session default is used.
+
+        Returns:
+            An :class:`AsyncRpcWebResponse` with one or more payloads.
+        """
+        method, uri = self._resolve(uri)
+
+        if text_mode is None:
+            text_mode = self.text_mode
+
+        headers = _web_request_headers(headers, timeout, text_mode, self.compression)
+        message = _web_request_body(method, data, text_mode, self.compression, self.compression_threshold)
+
+        response = await self._transport.post(
+            url=uri.build(),
+            data=message,
+            headers=headers,
+            timeout=timeout,
+        )
+        try:
+            response.raise_for_status()
+            _check_header_trailer(response.headers)
+        except BaseException:
+            await response.aclose()
+            raise
+
+        return AsyncRpcWebResponse(
+            method,
+            response,
+            max_decompressed_size=self.max_decompressed_size,
+        )
+
+    def _get_channel(self, target: str) -> aio.Channel:
+        channel = self._channels.get(target)
+        if channel is None:
+            channel = aio.insecure_channel(target)
+            self._channels[target] = channel
+        return channel
+
+    async def call(
+        self,
+        uri: Union[str, RpcUri],
+        data: Union[RequestData, Iterable[RequestData], AsyncIterable[RequestData]],
+        channel: Optional[aio.Channel] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncRpcNativeResponse:
+        """Calls the gRPC method using native gRPC protocol with :mod:`grpc.aio`.
+
+        The call can be cancelled by cancelling the awaiting task, or by closing the response.
+
+        Arguments:
+            uri (str|RpcUri): Full URL of an RPC method, an :class:`RpcUri` instance, or the
+                gRPC path of the method, which is called at the `base_url` of the session.
+            data (dict|Message|bytes|Iterable|AsyncIterable): Request message data,
+                or an iterable or async iterable of request data for streams.
+                Each message can be given as JSON, a message of the request type, or serialized bytes.
+            channel (grpc.aio.Channel): The Channel to use. If not provided, an insecure
+                channel to the target is created once and reused by the session.
+            timeout (float): Timeout in seconds. If None, no timeout will be enforced.
+
+        Returns:
+            An :class:`AsyncRpcNativeResponse` with one or more payloads.
+        """
+        method, uri = self._resolve(uri)
+
+        if not channel:
+            channel = self._get_channel(uri.base_url)
+
+        caller = getattr(channel, str(method.type), False)
+        if not caller:
+            raise ValueError("Invalid method type: " + str(method.type))
+
+        stub = caller(
+            uri.path,
+            request_serializer=method.serialize_request,
+            response_deserializer=method.response.FromString,
+        )
+
+        client_streams = method.type in (MethodType.stream_unary, MethodType.stream_stream)
+        server_streams = method.type in (MethodType.unary_stream, MethodType.stream_stream)
+
+        if not client_streams:
+            request = method.prepare_request(data)
+        elif hasattr(data, "__aiter__"):
+            request = _parse_requests(method, data)
+        else:
+            request = map(method.prepare_request, data)
+
+        call = stub(
+            request,
+            timeout=timeout,
+            compression=_NATIVE_COMPRESSION.get(self.compression),
+        )
+        return AsyncRpcNativeResponse(call, server_streams)
+
+    async def close(self) -> None:
+        """Closes the transport, the channels and all connections held by them."""
+        channels, self._channels = self._channels, {}
+        for channel in channels.values():
+            await channel.close()
+        await self._transport.aclose()
+
+
+async def _parse_requests(method: RpcMethod, data: AsyncIterable[RequestData]):
+    async for item in data:
+        yield method.prepare_request(item)
@@ -0,0 +1,65 @@
+from typing import Callable, Dict, Iterator, Optional
+
+from .rpc_method import RpcMethod
+from .rpc_response import RpcResponse
+
+
+class RpcBoundMethod(object):
+    """Base class of the callables of an :class:`RpcStub`.
+
+    A bound method calls one gRPC method of one server. Everything that does not depend
+    on the request message, e.g. the URL, the request headers or the native
+    multicallable, is prepared once when the stub is made.
+    """
+
+    def __init__(self, method: RpcMethod) -> None:
+        self.method = method
+
+    def __call__(self, data, **kwargs) -> RpcResponse:
+        raise NotImplementedError()
+
+
+class RpcStub(object):
+    def __init__(
+        self,
+        service: str,
+        methods: Dict[str, RpcBoundMethod],
+        close: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Bound methods of a service. Made by :meth:`RpcSession.stub`.
+
+        The methods are available as attributes, e.g. ``stub.SayHello(data)``,
+        or by name, e.g. ``stub["SayHello"](data)``.
+
+        Arguments:
+            service (str): Full name of the service. e.g. pyease.sample.v1.Greeter
+            methods (Dict[str, RpcBoundMethod]): The bound methods by method name.
+            close (Optional[Callable]): Releases the resources held by the stub.
+        """
+        self.service = service
+        self._methods = methods
+        self._close = close
+        for name, bound in methods.items():
+            if not hasattr(type(self), name):
+                setattr(self, name, bound)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __getitem__(self, name: str) -> RpcBoundMethod:
+        return self._methods[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._methods)
+
+    def __len__(self) -> int:
+        return len(self._methods)
+
+    def close(self) -> None:
+        """Releases the channel held by a native stub."""
+        close, self._close = self._close, None
+        if close is not None:
+            close()
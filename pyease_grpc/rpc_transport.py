@@ -0,0 +1,275 @@
+import asyncio
+import ssl
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from requests.exceptions import ChunkedEncodingError, ConnectionError, HTTPError
+from requests.structures import CaseInsensitiveDict
+
+_MAX_LINE_SIZE = 1 << 16
+_INVALID_HEADER_CHARS = ("\r", "\n", "\0")
+
+_Origin = Tuple[str, str, int]
+_Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+def _check_header(text: str, kind: str) -> str:
+    """Validates the name or the value of a request header. Returns the text."""
+    if any(c in text for c in _INVALID_HEADER_CHARS):
+        raise ValueError(f"Invalid header {kind}: {text!r}")
+    return text
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Tuple[int, str, CaseInsensitiveDict]:
+    """Reads the status line and the headers of a response"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed before the response")
+    try:
+        _, status, *reason = status_line.decode("latin-1").split(None, 2)
+        status_code = int(status)
+    except ValueError as e:
+        raise ConnectionError(f"Invalid status line: {status_line!r}") from e
+
+    headers = CaseInsensitiveDict()
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        key, _, value = line.partition(":")
+        headers[key.strip()] = value.strip()
+    return status_code, reason[0].strip() if reason else "", headers
+
+
+class AsyncHttpResponse(object):
+    """Base class of the streamed HTTP responses returned by an :class:`AsyncHttpTransport`"""
+
+    def __init__(self, status_code: int, reason: str, headers: CaseInsensitiveDict) -> None:
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        await self.aclose()
+
+    async def read(self, size: int = -1) -> bytes:
+        """Reads up to `size` bytes of the body. Returns an empty bytes at the end of the body."""
+        raise NotImplementedError()
+
+    async def aclose(self) -> None:
+        """Releases the connection. Any unread content of the body is discarded."""
+        raise NotImplementedError()
+
+    def raise_for_status(self) -> None:
+        """Raises :class:`HTTPError`, if the response has an error status code"""
+        if 400 <= self.status_code < 600:
+            kind = "Client" if self.status_code < 500 else "Server"
+            raise HTTPError(f"{self.status_code} {kind} Error: {self.reason}")
+
+
+class AsyncHttpTransport(object):
+    """Base class of the HTTP layer used by :class:`AsyncRpcSession`"""
+
+    async def post(
+        self,
+        url: str,
+        data: bytes,
+        headers: Dict[str, str],
+        timeout: Optional[float] = None,
+    ) -> AsyncHttpResponse:
+        """Sends a POST request and returns as soon as the response headers are received.
+
+        Arguments:
+            url (str): The request URL.
+            data (bytes): The request body.
+            headers (dict): The request headers.
+            timeout (Optional[float]): Timeout in seconds to receive the response headers.
+        """
+        raise NotImplementedError()
+
+    async def aclose(self) -> None:
+        """Closes all connections held by the transport."""
+
+
+class AsyncioHttpResponse(AsyncHttpResponse):
+    def __init__(
+        self,
+        transport: "AsyncioHttpTransport",
+        origin: _Origin,
+        connection: _Connection,
+        status_code: int,
+        reason: str,
+        headers: CaseInsensitiveDict,
+    ) -> None:
+        super().__init__(status_code, reason, headers)
+        self._transport = transport
+        self._origin = origin
+        self._connection: Optional[_Connection] = connection
+        self._chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        self._keep_alive = headers.get("connection", "").lower() != "close"
+        self._chunk_left = 0
+        self._content_left: Optional[int] = None
+        if not self._chunked and "content-length" in headers:
+            self._content_left = int(headers["content-length"])
+        elif not self._chunked:
+            self._keep_alive = False  # the body ends when the connection is closed
+
+    async def read(self, size: int = -1) -> bytes:
+        if self._connection is None:
+            return b""
+        reader = self._connection[0]
+        if self._chunked:
+            if not self._chunk_left:
+                line = await reader.readline()
+                try:
+                    self._chunk_left = int(line.split(b";", 1)[0], 16)
+                except ValueError as e:
+                    raise ChunkedEncodingError(f"Invalid chunk size: {line!r}") from e
+                if not self._chunk_left:
+                    while (await reader.readline()).strip():
+                        pass  # skip the HTTP trailers
+                    self._release()
+                    return b""
+            limit = self._chunk_left if size < 0 else min(size, self._chunk_left)
+            data = await reader.read(limit)
+            if not data:
+                raise ChunkedEncodingError("Connection closed in the middle of a chunk")
+            self._chunk_left -= len(data)
+            if not self._chunk_left:
+                await reader.readexactly(2)
+            return data
+        if self._content_left is not None:
+            if not self._content_left:
+                self._release()
+                return b""
+            limit = self._content_left if size < 0 else min(size, self._content_left)
+            data = await reader.read(limit)
+            if not data:
+                raise ConnectionError(f"Connection closed with {self._content_left} bytes left")
+            self._content_left -= len(data)
+            if not self._content_left:
+                self._release()
+            return data
+        data = await reader.read(size)
+        if not data:
+            await self.aclose()
+        return data
+
+    def _release(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            if self._keep_alive:
+                self._transport._release(self._origin, connection)
+            else:
+                connection[1].close()
+
+    async def aclose(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            connection[1].close()
+
+
+class AsyncioHttpTransport(AsyncHttpTransport):
+    def __init__(
+        self,
+        ssl_context: Optional[Union[ssl.SSLContext, bool]] = None,
+        pool_maxsize: int = 10,
+    ) -> None:
+        """A HTTP/1.1 transport using only :mod:`asyncio` streams.
+
+        Idle keep-alive connections are reused for the requests to the same origin.
+
+        Arguments:
+            ssl_context (ssl.SSLContext|bool): The context for https URLs. If False,
+                the server certificate is not verified. Default = None
+            pool_maxsize (int): Maximum number of idle connections kept per origin. Default = 10
+        """
+        if ssl_context is False:
+            ssl_context = ssl.create_default_context()
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+        elif ssl_context in (None, True):
+            ssl_context = None
+        self._ssl_context = ssl_context
+        self._pool_maxsize = pool_maxsize
+        self._idle: Dict[_Origin, List[_Connection]] = {}
+
+    async def post(
+        self,
+        url: str,
+        data: bytes,
+        headers: Dict[str, str],
+        timeout: Optional[float] = None,
+    ) -> AsyncHttpResponse:
+        return await asyncio.wait_for(self._post(url, data, headers), timeout)
+
+    async def _post(self, url: str, data: bytes, headers: Dict[str, str]) -> AsyncHttpResponse:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError("Unsupported URL scheme: " + url)
+        origin = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+
+        lines = [f"POST {path} HTTP/1.1", f"Host: {parts.netloc}", f"Content-Length: {len(data)}"]
+        for key, value in headers.items():
+            if key.lower() not in ("host", "content-length"):
+                lines.append(f"{_check_header(key, 'name')}: {_check_header(value, 'value')}")
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + bytes(data)
+
+        while True:
+            connection, reused = self._acquire(origin), True
+            if connection is None:
+                connection, reused = await self._connect(origin), False
+            try:
+                return await self._send(origin, connection, request)
+            except (OSError, asyncio.IncompleteReadError):
+                connection[1].close()
+                if not reused:
+                    raise
+                # An idle connection may have been closed by the server; retry.
+            except BaseException:
+                connection[1].close()
+                raise
+
+    async def _connect(self, origin: _Origin) -> _Connection:
+        scheme, host, port = origin
+        context = None
+        if scheme == "https":
+            context = self._ssl_context or ssl.create_default_context()
+        return await asyncio.open_connection(host, port, ssl=context, limit=_MAX_LINE_SIZE)
+
+    async def _send(self, origin: _Origin, connection: _Connection, request: bytes) -> AsyncHttpResponse:
+        reader, writer = connection
+        writer.write(request)
+        await writer.drain()
+
+        status_code, reason, headers = await _read_head(reader)
+        # Interim responses, e.g. 100 Continue, come before the final response
+        while 100 <= status_code < 200 and status_code != 101:
+            status_code, reason, headers = await _read_head(reader)
+        return AsyncioHttpResponse(self, origin, connection, status_code, reason, headers)
+
+    def _acquire(self, origin: _Origin) -> Optional[_Connection]:
+        idle = self._idle.get(origin)
+        while idle:
+            connection = idle.pop()
+            if not connection[0].at_eof() and not connection[1].is_closing():
+                return connection
+            connection[1].close()
+        return None
+
+    def _release(self, origin: _Origin, connection: _Connection) -> None:
+        idle = self._idle.setdefault(origin, [])
+        if len(idle) < self._pool_maxsize:
+            idle.append(connection)
+        else:
+            connection[1].close()
+
+    async def aclose(self) -> None:
+        idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for _, writer in connections:
+                writer.close()
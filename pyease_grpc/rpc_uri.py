@@ -45,6 +45,8 @@ class RpcUri(object):
     @property
     def path(self) -> str:
         """Returns the path of the gRPC method."""
+        if not self.package:
+            return f"/{self.service}/{self.method}"
         return f"/{self.package}.{self.service}/{self.method}"
 
     def build(self) -> str:
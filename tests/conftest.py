@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from google.protobuf.descriptor_pb2 import (
     DescriptorProto,
     FieldDescriptorProto,
@@ -6,6 +8,8 @@ from google.protobuf.descriptor_pb2 import (
     MethodDescriptorProto,
     ServiceDescriptorProto,
 )
+import grpc
+import pytest
 
 
 def make_file_descriptor(
@@ -57,3 +61,91 @@ def make_fds(file_name: str, package: str = "test.v1", **kwargs) -> FileDescript
     fds = FileDescriptorSet()
     fds.file.append(make_file_descriptor(file_name=file_name, package=package, **kwargs))
     return fds
+
+
+def make_all_types_fds(file_name: str, package: str = "test.v1") -> FileDescriptorSet:
+    """A ``TestService`` with one method of each type: Unary, ServerStream, ClientStream and BidiStream"""
+    proto = make_file_descriptor(file_name=file_name, package=package, method_name="Unary")
+    service = proto.service[0]
+    for name, client_streaming, server_streaming in [
+        ("ServerStream", False, True),
+        ("ClientStream", True, False),
+        ("BidiStream", True, True),
+    ]:
+        service.method.add(
+            name=name,
+            input_type=f".{package}.Request",
+            output_type=f".{package}.Response",
+            client_streaming=client_streaming,
+            server_streaming=server_streaming,
+        )
+    fds = FileDescriptorSet()
+    fds.file.append(proto)
+    return fds
+
+
+class _TestServicer(object):
+    """Implements the methods of :func:`make_all_types_fds`. The value "error" aborts the call."""
+
+    def __init__(self, response_type) -> None:
+        self.response = response_type
+
+    def _check(self, request, context):
+        if request.value == "error":
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Value `error` is not supported")
+
+    def Unary(self, request, context):
+        self._check(request, context)
+        return self.response(result=f"Hello, {request.value}!")
+
+    def ServerStream(self, request, context):
+        self._check(request, context)
+        for i in range(3):
+            yield self.response(result=f"{request.value} {i}")
+
+    def ClientStream(self, request_iterator, context):
+        values = []
+        for request in request_iterator:
+            self._check(request, context)
+            values.append(request.value)
+        return self.response(result=", ".join(values))
+
+    def BidiStream(self, request_iterator, context):
+        for request in request_iterator:
+            self._check(request, context)
+            yield self.response(result=f"Hello, {request.value}!")
+
+
+@pytest.fixture(scope="session")
+def native_server():
+    """Serves the methods of :func:`make_all_types_fds` with the package "native.test.v1".
+
+    Yields the loaded :class:`Protobuf` and the target address of the server.
+    """
+    from pyease_grpc.protobuf import Protobuf
+
+    proto = Protobuf(make_all_types_fds("native_server_test.proto", package="native.test.v1"))
+    request = proto.messages["native.test.v1.Request"]
+    response = proto.messages["native.test.v1.Response"]
+    servicer = _TestServicer(response)
+    handlers = {}
+    for name, factory in [
+        ("Unary", grpc.unary_unary_rpc_method_handler),
+        ("ServerStream", grpc.unary_stream_rpc_method_handler),
+        ("ClientStream", grpc.stream_unary_rpc_method_handler),
+        ("BidiStream", grpc.stream_stream_rpc_method_handler),
+    ]:
+        handlers[name] = factory(
+            getattr(servicer, name),
+            request_deserializer=request.FromString,
+            response_serializer=response.SerializeToString,
+        )
+
+    server = grpc.server(ThreadPoolExecutor(max_workers=16))
+    server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler("native.test.v1.TestService", handlers),))
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    try:
+        yield proto, f"127.0.0.1:{port}"
+    finally:
+        server.stop(None)
@@ -0,0 +1,656 @@
+"""Differential tests for pyease_grpc/_json_format.py against google.protobuf.json_format."""
+
+import json
+import math
+import random
+import re
+
+from google.protobuf import json_format
+import pytest
+
+from pyease_grpc import _json_format
+from pyease_grpc.protobuf import Protobuf
+
+_RICH_PROTO = """
+syntax = "proto3";
+
+package jf.test.v1;
+
+import "google/protobuf/any.proto";
+import "google/protobuf/duration.proto";
+import "google/protobuf/struct.proto";
+import "google/protobuf/timestamp.proto";
+import "google/protobuf/wrappers.proto";
+
+enum Color {
+  COLOR_UNSPECIFIED = 0;
+  RED = 1;
+  GREEN = 2;
+}
+
+message Node {
+  string name = 1;
+  repeated Node children = 2;
+  map<string, Node> named = 3;
+}
+
+message Rich {
+  int32 i32 = 1;
+  int64 i64 = 2;
+  uint32 u32 = 3;
+  uint64 u64 = 4;
+  sint32 s32 = 5;
+  fixed64 f64 = 6;
+  float f = 7;
+  double d = 8;
+  bool b = 9;
+  string s = 10;
+  bytes raw = 11;
+  Color color = 12;
+  optional int32 opt = 13;
+  Node node = 14;
+  repeated Node nodes = 15;
+  repeated int64 ids = 16;
+  repeated string tags = 17;
+  repeated Color colors = 18;
+  map<string, int32> counts = 19;
+  map<int64, string> names_by_id = 20;
+  map<bool, string> flags = 21;
+  map<string, Node> nodes_by_name = 22;
+  google.protobuf.Timestamp created_at = 23;
+  google.protobuf.Duration ttl = 24;
+  google.protobuf.Struct meta = 25;
+  google.protobuf.Value value = 26;
+  google.protobuf.Int32Value wrapped = 27;
+  repeated google.protobuf.Timestamp times = 28;
+  map<string, google.protobuf.Value> values = 29;
+  google.protobuf.Any any = 30;
+  oneof choice {
+    string text = 31;
+    int32 number = 32;
+    Node child = 33;
+  }
+  int32 snake_case_field = 34;
+}
+"""
+
+_PROTO2 = """
+syntax = "proto2";
+
+package jf.test.v2;
+
+enum Level {
+  LOW = 1;
+  HIGH = 2;
+}
+
+message Closed {
+  optional Level level = 1;
+  repeated Level levels = 2;
+  optional int32 count = 3 [default = 7];
+  required string id = 4;
+  extensions 100 to 199;
+}
+
+extend Closed {
+  optional string note = 100;
+}
+"""
+
+
+@pytest.fixture(scope="module")
+def rich():
+    return Protobuf.from_proto(_RICH_PROTO, "json_format_rich").messages["jf.test.v1.Rich"]
+
+
+@pytest.fixture(scope="module")
+def closed():
+    return Protobuf.from_proto(_PROTO2, "json_format_closed").messages["jf.test.v2.Closed"]
+
+
+def _parse_both(message_type, data, ignore_unknown=True):
+    """Returns the results of json_format and the compiled encoder: a message or an exception"""
+    results = []
+    for parse in [
+        lambda: json_format.ParseDict(
+            data,
+            message_type(),
+            ignore_unknown_fields=ignore_unknown,
+            descriptor_pool=message_type.DESCRIPTOR.file.pool,
+        ),
+        lambda: _json_format.parse_dict(message_type, data, ignore_unknown),
+    ]:
+        try:
+            results.append(parse())
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _assert_same(message_type, data, ignore_unknown=True):
+    expected, actual = _parse_both(message_type, data, ignore_unknown)
+    if isinstance(expected, Exception):
+        assert type(actual) is type(expected)
+        assert str(actual) == str(expected)
+    else:
+        assert actual == expected
+        assert actual.SerializePartialToString(deterministic=True) == expected.SerializePartialToString(
+            deterministic=True
+        )
+        assert [f.name for f, _ in actual.ListFields()] == [f.name for f, _ in expected.ListFields()]
+    return actual
+
+
+# ---------------------------------------------------------------------------
+# Valid input
+# ---------------------------------------------------------------------------
+
+_VALID = [
+    {},
+    {"i32": 1, "i64": "9007199254740993", "u32": 4000000000, "u64": "18446744073709551615"},
+    {"s32": -5, "f64": "12", "f": 1.5, "d": -2.25, "b": True, "s": "text"},
+    {"raw": "aGVsbG8=", "color": "RED"},
+    {"raw": "aGVsbG8", "color": 2},
+    {"raw": "-_-_"},
+    {"opt": 0},
+    {"node": {}},
+    {"node": {"name": "root", "children": [{"name": "a"}, {"children": [{}]}]}},
+    {"nodes": [{"name": "x", "named": {"k": {"name": "v"}}}]},
+    {"ids": ["1", 2, 3.0], "tags": ["a", "b"], "colors": ["GREEN", 1]},
+    {"counts": {"a": 1, "b": "2"}, "namesById": {"10": "ten", "-1": "minus"}},
+    {"nodesByName": {"x": {"name": "x"}, "y": {}}},
+    {"createdAt": "2024-01-02T03:04:05.678Z", "ttl": "1.5s"},
+    {"meta": {"a": [1, "b", None, {"c": True}]}, "value": {"x": 1}},
+    {"value": "text", "wrapped": 5},
+    {"times": ["1970-01-01T00:00:00Z"], "values": {"a": None, "b": [1]}},
+    {"any": {"@type": "type.googleapis.com/google.protobuf.Duration", "value": "2s"}},
+    {"text": "only"},
+    {"number": 5},
+    {"child": {"name": "c"}},
+    {"snakeCaseField": 1},
+    {"snake_case_field": 2},
+    {"i32": 1.0, "i64": 2.0},
+    {"i32": "1e3"},
+    {"tags": ()},
+    {"unknownField": 1, "node": {"unknown": {"deep": 1}}},
+]
+
+
+@pytest.mark.parametrize("data", _VALID)
+def test_valid_input(rich, data):
+    _assert_same(rich, data)
+
+
+def test_valid_input_uses_compiled_encoder(rich, monkeypatch):
+    calls = []
+    monkeypatch.setattr(_json_format.json_format, "ParseDict", lambda *a, **k: calls.append(a))
+    message = _json_format.parse_dict(rich, {"i32": 5, "node": {"children": [{"name": "a"}]}, "ids": ["1"]})
+    assert not calls
+    assert message.i32 == 5
+    assert message.node.children[0].name == "a"
+    assert message.ids == [1]
+
+
+# ---------------------------------------------------------------------------
+# Unusual and invalid input
+# ---------------------------------------------------------------------------
+
+_INVALID = [
+    [],
+    "text",
+    None,
+    {"i32": "1 "},
+    {"i32": "abc"},
+    {"i32": 1.5},
+    {"i32": True},
+    {"i32": 2**40},
+    {"u32": -1},
+    {"f": 1e39},
+    {"f": float("nan")},
+    {"d": float("inf")},
+    {"d": "NaN"},
+    {"d": "Infinity"},
+    {"d": "1.5"},
+    {"d": True},
+    {"f": 10**40},
+    {"b": "true"},
+    {"b": 1},
+    {"s": 5},
+    {"s": "\ud800"},
+    {"raw": 5},
+    {"raw": "!!"},
+    {"raw": b"aGk="},
+    {"color": "BLUE"},
+    {"color": 7},
+    {"color": "1"},
+    {"color": True},
+    {"colors": ["BLUE", "RED"]},
+    {"node": []},
+    {"node": None},
+    {"node": {"children": {}}},
+    {"nodes": [None]},
+    {"ids": [None]},
+    {"ids": "1"},
+    {"counts": []},
+    {"counts": {"a": None}},
+    {"namesById": {"x": "bad"}},
+    {"flags": {"true": "yes", "false": "no"}},
+    {"flags": {"yes": "bad"}},
+    {"i32": None, "s": None, "nodes": None, "value": None},
+    {"text": "a", "number": 1},
+    {"text": None, "number": 1},
+    {"snakeCaseField": 1, "snake_case_field": 2},
+    {"[jf.ext]": 1},
+    {"[unknown": 1},
+    {"createdAt": "yesterday"},
+    {"meta": 5},
+    {"times": [None]},
+    {"any": {"value": 1}},
+]
+
+
+@pytest.mark.parametrize("data", _INVALID)
+@pytest.mark.parametrize("ignore_unknown", [True, False])
+def test_invalid_input(rich, data, ignore_unknown):
+    _assert_same(rich, data, ignore_unknown)
+
+
+def test_unknown_fields_raise_unless_ignored(rich):
+    _assert_same(rich, {"nope": 1}, ignore_unknown=True)
+    error = _assert_same(rich, {"nope": 1}, ignore_unknown=False)
+    assert isinstance(error, json_format.ParseError)
+
+
+def test_recursion_depth_limit(rich):
+    for depth in [97, 98, 99, 100, 101]:
+        node = {}
+        for _ in range(depth):
+            node = {"children": [node]}
+        _assert_same(rich, {"node": node})
+        _assert_same(rich, {"node": {"named": {"x": node}}})
+
+
+def test_recursion_depth_limit_with_well_known_types(rich):
+    for depth in [97, 98, 99, 100]:
+        node = {"nodes": [{"createdAt": "1970-01-01T00:00:00Z"}]}
+        meta = {"meta": {"a": {"b": 1}}}
+        for _ in range(depth):
+            node = {"node": {"children": [{}]}, **node}
+            meta = {"node": {"name": "x"}, **meta}
+        _assert_same(rich, node)
+        _assert_same(rich, meta)
+
+
+def test_closed_enums(closed):
+    for data in [
+        {"level": "HIGH", "levels": ["LOW", 2]},
+        {"level": 3},
+        {"levels": [1, 5]},
+        {"level": "UNKNOWN"},
+        {"count": 7},
+        {"id": "x"},
+        {},
+    ]:
+        _assert_same(closed, data, True)
+        _assert_same(closed, data, False)
+
+
+def test_well_known_top_level_message():
+    from google.protobuf.struct_pb2 import ListValue, Struct, Value
+
+    _assert_same(Value, "text")
+    _assert_same(Value, None)
+    _assert_same(ListValue, [1, "a"])
+    _assert_same(Struct, {"a": {"b": [1]}})
+    _assert_same(Struct, [1])
+
+
+# ---------------------------------------------------------------------------
+# Random input
+# ---------------------------------------------------------------------------
+
+_JUNK = [None, True, False, 0, -1, 1.5, 2**63, "", "1", "RED", "aGk=", [], [1], {}, {"name": "x"}, float("nan")]
+
+
+def _random_value(rng, depth=0):
+    kind = rng.random()
+    if depth < 3 and kind < 0.15:
+        return {key: _random_value(rng, depth + 1) for key in rng.sample(_KEYS, rng.randint(0, 4))}
+    if depth < 3 and kind < 0.25:
+        return [_random_value(rng, depth + 1) for _ in range(rng.randint(0, 3))]
+    return rng.choice(_JUNK)
+
+
+_KEYS = ["name", "children", "named", "i32", "i64", "f", "d", "b", "s", "raw", "color", "opt", "node", "nodes", "ids"]
+_KEYS += ["tags", "colors", "counts", "namesById", "nodesByName", "createdAt", "meta", "value", "wrapped", "text"]
+_KEYS += ["number", "child", "snakeCaseField", "unknown"]
+
+
+def test_random_input(rich):
+    rng = random.Random(1234)
+    for _ in range(3000):
+        data = {key: _random_value(rng) for key in rng.sample(_KEYS, rng.randint(1, 5))}
+        _assert_same(rich, data, rng.random() < 0.7)
+
+
+def test_random_valid_input(rich):
+    rng = random.Random(5678)
+    for _ in range(500):
+        message = rich(
+            i32=rng.randint(-(2**31), 2**31 - 1),
+            i64=rng.randint(-(2**63), 2**63 - 1),
+            d=rng.uniform(-1e300, 1e300),
+            f=rng.uniform(-1e30, 1e30),
+            s=str(rng.random()),
+            raw=bytes(rng.getrandbits(8) for _ in range(rng.randint(0, 20))),
+            color=rng.choice([0, 1, 2]),
+            ids=[rng.randint(-(2**63), 2**63 - 1) for _ in range(rng.randint(0, 5))],
+            counts={str(i): i for i in range(rng.randint(0, 5))},
+        )
+        message.node.children.add(name="child").named["k"].name = "v"
+        data = json_format.MessageToDict(message, preserving_proto_field_name=rng.random() < 0.5)
+        assert _assert_same(rich, data) == message
+
+
+# ---------------------------------------------------------------------------
+# message -> dict
+# ---------------------------------------------------------------------------
+
+
+def _assert_same_dict(message, including_defaults=True):
+    try:
+        expected = json_format.MessageToDict(
+            message,
+            descriptor_pool=message.DESCRIPTOR.file.pool,
+            **{_json_format._PRINT_DEFAULTS: including_defaults},
+        )
+    except json_format.SerializeToJsonError as e:
+        with pytest.raises(type(e), match=re.escape(str(e))):
+            _json_format.message_to_dict(message, including_defaults)
+        return None
+    actual = _json_format.message_to_dict(message, including_defaults)
+    assert actual == expected
+    # The keys are in the same order too
+    assert json.dumps(actual) == json.dumps(expected)
+    assert _json_format.message_decoder(type(message), including_defaults)(message) == expected
+    return actual
+
+
+@pytest.mark.parametrize("data", _VALID)
+@pytest.mark.parametrize("including_defaults", [True, False])
+def test_message_to_dict(rich, data, including_defaults):
+    _assert_same_dict(_json_format.parse_dict(rich, data), including_defaults)
+
+
+def test_message_to_dict_uses_compiled_decoder(rich, monkeypatch):
+    calls = []
+    monkeypatch.setattr(_json_format.json_format, "MessageToDict", lambda *a, **k: calls.append(a))
+    message = rich(i64=5, f=0.1, raw=b"hi", color=1, node={"children": [{"name": "a"}]}, flags={True: "t"})
+    data = _json_format.message_to_dict(message)
+    assert not calls
+    assert data["i64"] == "5"
+    assert data["f"] == 0.1
+    assert data["raw"] == "aGk="
+    assert data["color"] == "RED"
+    assert data["node"] == {"name": "", "children": [{"name": "a", "children": [], "named": {}}], "named": {}}
+    assert data["flags"] == {"true": "t"}
+    assert "opt" not in data
+
+
+def test_message_to_dict_special_values(rich):
+    for value in [math.inf, -math.inf, math.nan, 1e-45, 3.4e38]:
+        _assert_same_dict(rich(f=value, d=value))
+    _assert_same_dict(rich(color=7, colors=[1, 9]))
+    _assert_same_dict(rich(flags={False: "f", True: "t"}, names_by_id={-1: "a", 2**62: "b"}))
+    _assert_same_dict(rich(value={"null_value": 0}))
+
+
+def test_message_to_dict_integers_for_enums(rich):
+    message = rich(color=2, colors=[1])
+    data = _json_format.message_to_dict(message, use_integers_for_enums=True)
+    assert data["color"] == 2
+    assert data["colors"] == [1]
+
+
+def test_message_to_dict_proto2(closed):
+    _assert_same_dict(closed(id="x"))
+    _assert_same_dict(closed(level=2, levels=[1, 2], count=7))
+    _assert_same_dict(closed(), False)
+
+    message = closed(id="x")
+    message.Extensions[closed.DESCRIPTOR.file.extensions_by_name["note"]] = "ext"
+    assert _assert_same_dict(message)["[jf.test.v2.note]"] == "ext"
+
+
+def test_message_to_dict_well_known_types():
+    from google.protobuf.duration_pb2 import Duration
+    from google.protobuf.struct_pb2 import Struct, Value
+
+    _assert_same_dict(Duration(seconds=1))
+    _assert_same_dict(Value(string_value="a"))
+    _assert_same_dict(Struct(fields={"a": Value(number_value=1)}))
+
+
+def test_random_message_to_dict(rich):
+    rng = random.Random(4321)
+    for _ in range(500):
+        data = {key: _random_value(rng) for key in rng.sample(_KEYS, rng.randint(1, 5))}
+        try:
+            message = json_format.ParseDict(
+                data, rich(), ignore_unknown_fields=True, descriptor_pool=rich.DESCRIPTOR.file.pool
+            )
+        except json_format.ParseError:
+            continue
+        _assert_same_dict(message, rng.random() < 0.7)
+
+
+# ---------------------------------------------------------------------------
+# message -> lazy dict
+# ---------------------------------------------------------------------------
+
+
+def _assert_same_view(message, including_defaults=True):
+    expected = json_format.MessageToDict(
+        message,
+        descriptor_pool=message.DESCRIPTOR.file.pool,
+        **{_json_format._PRINT_DEFAULTS: including_defaults},
+    )
+    view = _json_format.MessageView(message, including_defaults)
+    assert isinstance(view, dict)
+    assert view == expected
+    assert expected == view
+    assert not view != expected
+    assert json.dumps(view) == json.dumps(expected)
+    assert list(view) == list(expected)
+    assert dict(view) == expected
+    assert {**view} == expected
+    return view
+
+
+def _pending(view):
+    return [key for key in view if type(dict.__getitem__(view, key)) is _json_format._Pending]
+
+
+@pytest.mark.parametrize("data", _VALID)
+@pytest.mark.parametrize("including_defaults", [True, False])
+def test_message_view(rich, data, including_defaults):
+    _assert_same_view(_json_format.parse_dict(rich, data), including_defaults)
+
+
+def test_random_message_view(rich):
+    rng = random.Random(8765)
+    for _ in range(300):
+        data = {key: _random_value(rng) for key in rng.sample(_KEYS, rng.randint(1, 5))}
+        try:
+            message = json_format.ParseDict(
+                data, rich(), ignore_unknown_fields=True, descriptor_pool=rich.DESCRIPTOR.file.pool
+            )
+            json_format.MessageToDict(message)
+        except json_format.Error:
+            continue
+        _assert_same_view(message, rng.random() < 0.7)
+
+
+def test_message_view_converts_fields_when_read(rich):
+    message = rich(i64=5, raw=b"hi", node={"name": "a", "children": [{"name": "b"}]}, counts={"x": 1})
+    view = _json_format.MessageView(message)
+    assert sorted(_pending(view)) == ["counts", "i64", "node", "raw"]
+    assert view["i64"] == "5"
+    assert view.get("raw") == "aGk="
+    assert view["counts"] == {"x": 1}
+    assert _pending(view) == ["node"]
+
+    node = view["node"]
+    assert isinstance(node, _json_format.MessageView)
+    assert node.message is message.node
+    assert _pending(node) == ["children"]
+    assert isinstance(node["children"][0], _json_format.MessageView)
+    assert view["node"] is node
+    assert view.get("missing", 1) == 1
+
+
+def test_message_view_is_read_only(rich):
+    view = _json_format.MessageView(rich(i32=1))
+    for modify in [
+        lambda: view.__setitem__("i32", 2),
+        lambda: view.__delitem__("i32"),
+        lambda: view.update({"i32": 2}),
+        lambda: view.pop("i32"),
+        lambda: view.popitem(),
+        lambda: view.setdefault("x", 1),
+        lambda: view.clear(),
+    ]:
+        with pytest.raises(TypeError, match="read-only"):
+            modify()
+    assert view["i32"] == 1
+
+
+def test_message_view_copies(rich):
+    import copy
+    import pickle
+
+    message = rich(i64=5, node={"name": "a"})
+    view = _json_format.MessageView(message)
+    expected = _json_format.message_to_dict(message)
+    assert view.to_dict() == expected
+    assert type(view.to_dict()["node"]) is dict
+    assert view.copy() == expected
+    assert view | {"i64": "6"} == {**expected, "i64": "6"}
+    assert {"extra": 1} | view == {"extra": 1, **expected}
+    assert pickle.loads(pickle.dumps(view)) == expected
+    assert type(copy.deepcopy(view)) is dict
+    assert copy.deepcopy(view) == expected
+    assert repr(view) == repr(expected)
+
+
+def test_message_view_proto2(closed):
+    message = closed(id="x", level=2)
+    message.Extensions[closed.DESCRIPTOR.file.extensions_by_name["note"]] = "ext"
+    assert _assert_same_view(message)["[jf.test.v2.note]"] == "ext"
+    _assert_same_view(closed(levels=[1, 2]), False)
+
+
+def test_message_to_view_well_known_types():
+    from google.protobuf.struct_pb2 import Struct, Value
+
+    assert _json_format.message_to_view(Value(string_value="a")) == "a"
+    assert _json_format.message_to_view(Struct(fields={"a": Value(number_value=1)})) == {"a": 1}
+    with pytest.raises(TypeError, match="google.protobuf.Value"):
+        _json_format.MessageView(Value(string_value="a"))
+
+
+# ---------------------------------------------------------------------------
+# message -> dict of selected fields
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("data", _VALID)
+@pytest.mark.parametrize("including_defaults", [True, False])
+def test_projection_of_top_level_fields(rich, data, including_defaults):
+    message = _json_format.parse_dict(rich, data)
+    expected = _json_format.message_to_dict(message, including_defaults)
+    for fields in [["i32"], ["i64", "node", "counts"], ["createdAt", "value", "any", "text", "child"], ["ids", "raw"]]:
+        project = _json_format.message_projector(rich, fields, including_defaults)
+        selected = project(message)
+        assert selected == {key: value for key, value in expected.items() if key in fields}
+        assert list(selected) == [key for key in expected if key in fields]
+
+
+def test_projection_of_nested_fields(rich):
+    message = _json_format.parse_dict(
+        rich,
+        {
+            "i32": 1,
+            "node": {"name": "a", "children": [{"name": "b", "named": {"x": {"name": "c"}}}]},
+            "nodes": [{"name": "d"}, {"children": [{}]}],
+            "nodesByName": {"k": {"name": "e", "children": [{"name": "f"}]}},
+        },
+    )
+    project = _json_format.message_projector(rich, ["node.children.name", "nodes.name", "nodesByName.children.name"])
+    assert project(message) == {
+        "node": {"children": [{"name": "b"}]},
+        "nodes": [{"name": "d"}, {"name": ""}],
+        "nodesByName": {"k": {"children": [{"name": "f"}]}},
+    }
+    project = _json_format.message_projector(rich, ["node.children.named.name", "child.name", "nodes"], False)
+    assert project(message) == {
+        "node": {"children": [{"named": {"x": {"name": "c"}}}]},
+        "nodes": [{"name": "d"}, {"children": [{}]}],
+    }
+
+
+def test_projection_field_names(rich):
+    message = rich(snake_case_field=3, node={"name": "a"})
+    assert _json_format.message_projector(rich, ["snake_case_field"])(message) == {"snakeCaseField": 3}
+    assert _json_format.message_projector(rich, "snakeCaseField")(message) == {"snakeCaseField": 3}
+    # A whole field takes precedence over its nested fields
+    expected = {"node": _json_format.message_to_dict(message.node)}
+    assert _json_format.message_projector(rich, ["node.name", "node"])(message) == expected
+    assert _json_format.message_projector(rich, ["node", "node.name"])(message) == expected
+
+
+def test_projection_is_cached(rich):
+    assert _json_format.message_projector(rich, ["i32", "node.name"]) is _json_format.message_projector(
+        rich, ("i32", "node.name")
+    )
+
+
+@pytest.mark.parametrize(
+    "fields, error",
+    [
+        (["missing"], "No such field: missing in jf.test.v1.Rich"),
+        (["node.missing"], "No such field: node.missing"),
+        ([""], "No such field"),
+        (["node."], "No such field"),
+        (["i32.value"], "Can not select fields of i32"),
+        (["createdAt.seconds"], "Can not select fields of createdAt"),
+        (["counts.value"], "Can not select fields of counts"),
+    ],
+)
+def test_projection_invalid_fields(rich, fields, error):
+    with pytest.raises(ValueError, match=re.escape(error)):
+        _json_format.message_projector(rich, fields)
+
+
+def test_projection_skips_other_fields(rich, monkeypatch):
+    message = rich(i32=1, created_at={"seconds": 1}, node={"name": "a"})
+    calls = []
+    monkeypatch.setattr(_json_format, "_print_message", lambda *a: calls.append(a))
+    assert _json_format.message_projector(rich, ["i32", "node.name"])(message) == {"i32": 1, "node": {"name": "a"}}
+    assert not calls
+
+
+def test_projection_proto2(closed):
+    message = closed(id="x", levels=[1])
+    message.Extensions[closed.DESCRIPTOR.file.extensions_by_name["note"]] = "ext"
+    assert _json_format.message_projector(closed, ["levels", "count"])(message) == {"levels": ["LOW"]}
+    assert _json_format.message_projector(closed, ["count"])(closed(count=7)) == {"count": 7}
+
+
+def test_projection_of_converted_dict(rich):
+    # The dicts of json_format are selected the same way when a message can not be compiled
+    message = rich(i32=1, node={"name": "a", "children": [{"name": "b"}]}, nodes_by_name={"k": {"name": "c"}})
+    fields = ("i32", "node.children.name", "nodesByName.name")
+    tree = _json_format._field_tree(rich.DESCRIPTOR, fields)
+    selected = _json_format._select(_json_format.message_to_dict(message), tree)
+    assert selected == _json_format.message_projector(rich, fields)(message)
@@ -73,6 +73,107 @@ def test_messages_are_constructible(proto):
     assert isinstance(cls(), Message)
 
 
+def test_messages_are_made_on_lookup():
+    fds = make_fds("protobuf_lazy.proto", package="protobuf.lazy.v1", service_name="LazySvc", method_name="Run")
+    pb = Protobuf(fds)
+    assert pb.messages.built == 0
+    assert list(pb.messages) == ["protobuf.lazy.v1.Request", "protobuf.lazy.v1.Response"]
+    assert len(pb.messages) == 2
+    assert "LazySvc" in pb.services and pb.messages.built == 0
+
+    method = pb.services["LazySvc"]["Run"]
+    assert pb.messages.built == 2
+    assert method.request is pb.messages["protobuf.lazy.v1.Request"]
+    assert pb.services["LazySvc"]["Run"] is method
+    assert dict(pb.messages) == {name: pb.messages[name] for name in pb.messages}
+    with pytest.raises(KeyError):
+        pb.messages["protobuf.lazy.v1.Nope"]
+
+
+def test_services_of_same_name_are_merged():
+    from google.protobuf.descriptor_pb2 import FileDescriptorSet
+
+    from .conftest import make_file_descriptor
+
+    fds = FileDescriptorSet()
+    fds.file.append(
+        make_file_descriptor("protobuf_merge_a.proto", "protobuf.merge.a", service_name="Svc", method_name="A")
+    )
+    fds.file.append(
+        make_file_descriptor("protobuf_merge_b.proto", "protobuf.merge.b", service_name="Svc", method_name="B")
+    )
+    pb = Protobuf(fds)
+    assert list(pb.services) == ["Svc"]
+    assert {name: method.package for name, method in pb.services["Svc"].items()} == {
+        "A": "protobuf.merge.a",
+        "B": "protobuf.merge.b",
+    }
+
+
+# ---------------------------------------------------------------------------
+# Method and type index
+# ---------------------------------------------------------------------------
+
+
+def test_methods_of_same_service_in_different_packages():
+    from google.protobuf.descriptor_pb2 import FileDescriptorSet
+
+    from .conftest import make_file_descriptor
+
+    fds = FileDescriptorSet()
+    fds.file.append(make_file_descriptor("protobuf_index_a.proto", "protobuf.index.a", service_name="Greeter"))
+    fds.file.append(make_file_descriptor("protobuf_index_b.proto", "protobuf.index.b", service_name="Greeter"))
+    pb = Protobuf(fds)
+    assert list(pb.methods) == ["/protobuf.index.a.Greeter/DoIt", "/protobuf.index.b.Greeter/DoIt"]
+    for package in ["protobuf.index.a", "protobuf.index.b"]:
+        method = pb.find_method(f"/{package}.Greeter/DoIt")
+        assert method.package == package
+        assert method.request is pb.messages[package + ".Request"]
+        assert pb.get_method(RpcUri("", package, "Greeter", "DoIt")) is method
+        assert dict(pb.get_service(package + ".Greeter")) == {"DoIt": method}
+    assert pb.find_method("/protobuf.index.c.Greeter/DoIt") is None
+    assert pb.get_service("Greeter") is None
+
+
+def test_nested_types_are_indexed():
+    from google.protobuf.descriptor_pb2 import FieldDescriptorProto, FileDescriptorSet
+
+    from .conftest import make_file_descriptor
+
+    proto = make_file_descriptor("protobuf_nested.proto", "protobuf.nested.v1")
+    proto.service[0].method[0].input_type = ".protobuf.nested.v1.Request.Inner"
+    inner = proto.message_type[0].nested_type.add(name="Inner")
+    inner.field.add(
+        name="id",
+        number=1,
+        type=FieldDescriptorProto.TYPE_STRING,
+        label=FieldDescriptorProto.LABEL_OPTIONAL,
+    )
+    inner.enum_type.add(name="Kind").value.add(name="KIND_UNSPECIFIED", number=0)
+    proto.enum_type.add(name="Level").value.add(name="LEVEL_LOW", number=0)
+    pb = Protobuf(FileDescriptorSet(file=[proto]))
+
+    assert sorted(pb.types) == [
+        "protobuf.nested.v1.Level",
+        "protobuf.nested.v1.Request",
+        "protobuf.nested.v1.Request.Inner",
+        "protobuf.nested.v1.Request.Inner.Kind",
+        "protobuf.nested.v1.Response",
+    ]
+    assert "protobuf.nested.v1.Level" not in pb.messages
+    method = pb.find_method("/protobuf.nested.v1.TestService/DoIt")
+    assert method.request is pb.types["protobuf.nested.v1.Request.Inner"]
+    assert method.request(id="x").id == "x"
+    assert pb.types["protobuf.nested.v1.Request.Inner.Kind"].Name(0) == "KIND_UNSPECIFIED"
+    assert pb.types["protobuf.nested.v1.Level"].Value("LEVEL_LOW") == 0
+
+
+def test_methods_without_package():
+    pb = Protobuf(make_fds("protobuf_no_package.proto", package="", service_name="Bare"))
+    assert list(pb.methods) == ["/Bare/DoIt"]
+    assert pb.get_method(RpcUri("", "", "Bare", "DoIt")) is pb.methods["/Bare/DoIt"]
+
+
 # ---------------------------------------------------------------------------
 # Service / method discovery
 # ---------------------------------------------------------------------------
@@ -208,3 +309,259 @@ def test_restore_file(proto, tmp_path):
     proto.save_file(str(path))
     restored = Protobuf.restore_file(str(path))
     assert "GreeterService" in restored.services
+
+
+# ---------------------------------------------------------------------------
+# Binary format
+# ---------------------------------------------------------------------------
+
+
+def test_save_restore_binary_roundtrip(proto):
+    data = proto.save_binary()
+    assert data == proto.descriptor.SerializeToString()
+    restored = Protobuf.restore_binary(data)
+    assert restored.descriptor == proto.descriptor
+    assert "GreeterService" in restored.services
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_restore_binary_file(proto, tmp_path, use_mmap):
+    path = str(tmp_path / "descriptor.bin")
+    proto.save_binary_file(path)
+    assert Protobuf.restore_binary_file(path, use_mmap=use_mmap).descriptor == proto.descriptor
+    assert Protobuf.restore_file(path, use_mmap=use_mmap).descriptor == proto.descriptor
+
+
+def test_restore_file_detects_format(proto, tmp_path):
+    import json
+
+    binary = tmp_path / "descriptor.bin"
+    proto.save_binary_file(str(binary))
+    assert Protobuf.restore_file(str(binary)).descriptor == proto.descriptor
+
+    # A JSON file starting with a newline is not mistaken for a binary file
+    pretty = tmp_path / "descriptor.json"
+    pretty.write_text("\n" + json.dumps(proto.save(), indent=2))
+    assert Protobuf.restore_file(str(pretty)).descriptor == proto.descriptor
+
+    # Whitespace other than a newline before the JSON object
+    indented = tmp_path / "indented.json"
+    indented.write_text(" \t" + json.dumps(proto.save()))
+    assert Protobuf.restore_file(str(indented)).descriptor == proto.descriptor
+
+    for name, content in [("empty.bin", b""), ("blank.json", b" \n\t\n")]:
+        (tmp_path / name).write_bytes(content)
+        with pytest.raises(ValueError, match="Empty descriptor file"):
+            Protobuf.restore_file(str(tmp_path / name), use_mmap=True)
+
+
+def test_restore_file_binary_starting_like_json(tmp_path):
+    from google.protobuf.descriptor_pb2 import FileDescriptorProto, FileDescriptorSet
+
+    # The size of the first file is 123, the code of "{"
+    fds = FileDescriptorSet(file=[FileDescriptorProto(name="a" * 115 + ".proto")])
+    path = tmp_path / "descriptor.bin"
+    path.write_bytes(fds.SerializeToString())
+    assert path.read_bytes()[:2] == b"\n{"
+    assert Protobuf.restore_file(str(path)).descriptor == fds
+
+
+def test_generator_binary_format(tmp_path, monkeypatch, capsysbinary):
+    from pyease_grpc.generator import main
+
+    (tmp_path / "gen.proto").write_text('syntax = "proto3";\npackage gen.test.v1;\nmessage Thing { int32 id = 1; }\n')
+    command = ["pyease-grpc", "-I", str(tmp_path), str(tmp_path / "gen.proto")]
+    monkeypatch.setattr("sys.argv", command + ["--format", "binary", "-o", str(tmp_path / "out.bin")])
+    main()
+    monkeypatch.setattr("sys.argv", command + ["-o", str(tmp_path / "out.json")])
+    main()
+    binary = Protobuf.restore_file(str(tmp_path / "out.bin"))
+    assert "gen.test.v1.Thing" in binary.messages
+    assert (tmp_path / "out.json").read_bytes().startswith(b"{")
+    assert Protobuf.restore_file(str(tmp_path / "out.json")).descriptor == binary.descriptor
+
+    capsysbinary.readouterr()
+    monkeypatch.setattr("sys.argv", command + ["-f", "binary"])
+    with pytest.raises(SystemExit):
+        main()
+    assert capsysbinary.readouterr().out == binary.save_binary()
+
+
+# ---------------------------------------------------------------------------
+# Descriptor cache
+# ---------------------------------------------------------------------------
+
+
+def _write_protos(path, package):
+    """Writes a proto file that imports another one. The file names are unique per package."""
+    prefix = package.replace(".", "_")
+    (path / f"{prefix}_common.proto").write_text(
+        f'syntax = "proto3";\npackage {package};\nmessage Common {{ string id = 1; }}\n'
+    )
+    (path / f"{prefix}_main.proto").write_text(
+        f'syntax = "proto3";\npackage {package};\nimport "{prefix}_common.proto";\n'
+        "message Main { Common common = 1; }\n"
+        "service MainService { rpc Get (Main) returns (Common); }\n"
+    )
+    return str(path / f"{prefix}_main.proto")
+
+
+def test_from_file_uses_descriptor_cache(tmp_path):
+    from unittest.mock import patch
+
+    from pyease_grpc import _protocol
+
+    proto_file = _write_protos(tmp_path, "cache.file.v1")
+    cache_dir = str(tmp_path / "cache")
+    with patch.object(_protocol, "generate_descriptor", wraps=_protocol.generate_descriptor) as generate:
+        first = Protobuf.from_file(proto_file, cache_dir=cache_dir)
+        second = Protobuf.from_file(proto_file, cache_dir=cache_dir)
+    assert generate.call_count == 1
+    assert second.descriptor == first.descriptor
+    assert "MainService" in second.services
+    assert [p.suffix for p in (tmp_path / "cache").iterdir()] == [".bin"]
+
+
+def test_from_proto_uses_descriptor_cache(tmp_path):
+    from unittest.mock import patch
+
+    from pyease_grpc import _protocol
+
+    source = 'syntax = "proto3";\npackage cache.proto.v1;\nmessage Item { string name = 1; }\n'
+    with patch.object(_protocol, "generate_descriptor", wraps=_protocol.generate_descriptor) as generate:
+        first = Protobuf.from_proto(source, "cache_proto", cache_dir=str(tmp_path))
+        second = Protobuf.from_proto(source, "cache_proto", cache_dir=str(tmp_path))
+    assert generate.call_count == 1
+    assert second.descriptor == first.descriptor
+    assert "cache.proto.v1.Item" in second.messages
+
+
+def test_descriptor_cache_key_tracks_imports(tmp_path):
+    from pyease_grpc import _descriptor_cache
+
+    proto_file = _write_protos(tmp_path, "cache.key.v1")
+    content = open(proto_file, "rb").read()
+    key = _descriptor_cache.cache_key(proto_file, content, [str(tmp_path)])
+    assert _descriptor_cache.cache_key(proto_file, content, [str(tmp_path)]) == key
+    assert _descriptor_cache.cache_key(proto_file, content, [str(tmp_path), "/other"]) != key
+    assert _descriptor_cache.cache_key(proto_file, content + b"\n", [str(tmp_path)]) != key
+
+    common = tmp_path / "cache_key_v1_common.proto"
+    common.write_text(common.read_text() + "message Extra {}\n")
+    assert _descriptor_cache.cache_key(proto_file, content, [str(tmp_path)]) != key
+
+
+def test_descriptor_cache_ignores_corrupt_files(tmp_path):
+    from pyease_grpc import _descriptor_cache
+
+    (tmp_path / "abc.bin").write_bytes(b"\xff\xff\xff")
+    assert _descriptor_cache.load(str(tmp_path), "abc") is None
+    assert _descriptor_cache.load(str(tmp_path), "missing") is None
+
+
+def test_descriptor_cache_concurrent_writes(tmp_path, proto):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from pyease_grpc import _descriptor_cache
+
+    data = proto.descriptor.SerializeToString()
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda _: _descriptor_cache.store(str(tmp_path), "abc", data), range(32)))
+    assert [p.name for p in tmp_path.iterdir()] == ["abc.bin"]
+    assert _descriptor_cache.load(str(tmp_path), "abc") == proto.descriptor
+
+
+def test_descriptor_cache_hit_skips_grpc_tools(tmp_path):
+    import subprocess
+    import sys
+
+    proto_file = _write_protos(tmp_path, "cache.cold.v1")
+    cache_dir = str(tmp_path / "cache")
+    Protobuf.from_file(proto_file, cache_dir=cache_dir)
+    script = (
+        "import sys\n"
+        "from pyease_grpc.protobuf import Protobuf\n"
+        f"proto = Protobuf.from_file({proto_file!r}, cache_dir={cache_dir!r})\n"
+        "assert 'MainService' in proto.services\n"
+        "assert 'grpc_tools.protoc' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True)
+
+
+# ---------------------------------------------------------------------------
+# Descriptor pools
+# ---------------------------------------------------------------------------
+
+
+def test_versions_of_same_file_coexist():
+    from google.protobuf.descriptor_pb2 import FieldDescriptorProto
+
+    first = make_fds("protobuf_pool_version.proto", package="protobuf.pool.v1")
+    second = make_fds("protobuf_pool_version.proto", package="protobuf.pool.v1")
+    second.file[0].message_type[0].field.add(
+        name="extra",
+        number=2,
+        type=FieldDescriptorProto.TYPE_STRING,
+        label=FieldDescriptorProto.LABEL_OPTIONAL,
+    )
+    old, new = Protobuf(first), Protobuf(second)
+    assert old.pool is not new.pool
+    assert "extra" not in old.messages["protobuf.pool.v1.Request"].DESCRIPTOR.fields_by_name
+    assert new.messages["protobuf.pool.v1.Request"](value="a", extra="b").extra == "b"
+
+
+def test_private_pool_is_freed():
+    import gc
+    import weakref
+
+    from pyease_grpc import _json_format, _protocol
+
+    pb = Protobuf(make_fds("protobuf_pool_freed.proto", package="protobuf.pool.freed"))
+    request = pb.messages["protobuf.pool.freed.Request"]
+    assert _protocol.message_to_dict(_protocol.parse_message(request, {"value": "a"})) == {"value": "a"}
+    _json_format.message_projector(request, ["value"])
+    assert request.DESCRIPTOR in _json_format._encoders
+
+    ref = weakref.ref(request)
+    del pb, request
+    gc.collect()
+    assert ref() is None
+    assert not [d for d in _json_format._encoders if d.full_name.startswith("protobuf.pool.freed.")]
+    assert not [d for d, _ in _json_format._decoders if d.full_name.startswith("protobuf.pool.freed.")]
+    assert not [d for d, _, _ in _json_format._projectors if d.full_name.startswith("protobuf.pool.freed.")]
+
+
+def test_forget_pool_keeps_other_projectors():
+    from pyease_grpc import _json_format
+
+    kept = Protobuf(make_fds("protobuf_pool_kept.proto", package="protobuf.pool.kept"))
+    dropped = Protobuf(make_fds("protobuf_pool_dropped.proto", package="protobuf.pool.dropped"))
+    project = _json_format.message_projector(kept.messages["protobuf.pool.kept.Request"], ["value"])
+    _json_format.message_projector(dropped.messages["protobuf.pool.dropped.Request"], ["value"])
+    _json_format.forget_pool(dropped.pool)
+    assert not [d for d, _, _ in _json_format._projectors if d.file.pool is dropped.pool]
+    assert _json_format.message_projector(kept.messages["protobuf.pool.kept.Request"], ["value"]) is project
+
+
+def test_shared_pool():
+    from google.protobuf import symbol_database
+
+    fds = make_fds("protobuf_pool_shared.proto", package="protobuf.pool.shared")
+    first = Protobuf(fds, shared=True)
+    second = Protobuf.restore_binary(fds.SerializeToString(), shared=True)
+    assert first.pool is second.pool is symbol_database.Default().pool
+    assert first.messages["protobuf.pool.shared.Request"] is second.messages["protobuf.pool.shared.Request"]
+    assert Protobuf.restore(first.save(), shared=True).shared
+
+
+def test_save_prints_custom_options():
+    proto = """
+syntax = "proto3";
+package protobuf.pool.options;
+import "google/protobuf/descriptor.proto";
+extend google.protobuf.MessageOptions { string label = 50001; }
+message Labeled { option (label) = "hello"; }
+"""
+    pb = Protobuf.from_proto(proto, "protobuf_pool_options")
+    (labeled,) = [m for f in pb.save()["file"] for m in f.get("messageType", []) if m["name"] == "Labeled"]
+    assert labeled["options"]["protobuf.pool.options.label"] == "hello"
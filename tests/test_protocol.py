@@ -1,6 +1,8 @@
 """Tests for pyease_grpc/_protocol.py — framing, serialization, descriptor helpers."""
 
+import io
 import struct
+import time
 from unittest.mock import MagicMock
 
 import pytest
@@ -9,10 +11,13 @@ from requests.exceptions import ContentDecodingError, InvalidHeader
 from pyease_grpc._protocol import (
     _HEADER_FORMAT,
     _HEADER_LENGTH,
-    _ensure_fds_in_pool,
+    Base64Decoder,
+    MessageDecoder,
     _strip_extension_brackets,
     deserialize_trailer,
+    encode_text,
     load_messages,
+    read_message_stream,
     serialize_timeout,
     unwrap_message,
     unwrap_message_stream,
@@ -73,12 +78,33 @@ def _build_stream(*payloads: bytes, trailer_data: bytes = b"grpc-status:0\r\n")
     return stream
 
 
-def _mock_response(data: bytes, chunk_size: int = 0) -> MagicMock:
+class _ChunkedRaw(io.RawIOBase):
+    """A raw stream which returns at most `chunk_size` bytes per read."""
+
+    def __init__(self, data: bytes, chunk_size: int = 0) -> None:
+        self._data = io.BytesIO(data)
+        self._chunk_size = chunk_size
+        self.read_sizes = []
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        self.read_sizes.append(len(b))
+        view = memoryview(b)
+        if self._chunk_size:
+            view = view[: self._chunk_size]
+        return self._data.readinto(view)
+
+
+def _mock_response(data: bytes, chunk_size: int = 0, headers=None) -> MagicMock:
     mock = MagicMock()
     if chunk_size:
         chunks = [data[i : i + chunk_size] for i in range(0, len(data), chunk_size)]
     else:
         chunks = [data]
+    mock.headers = headers or {}
+    mock.raw = _ChunkedRaw(data, chunk_size)
     mock.iter_content.return_value = iter(chunks)
     return mock
 
@@ -112,28 +138,240 @@ def test_stream_empty_payload():
 def test_stream_chunked_delivery():
     payload = b"chunked-data"
     stream = _build_stream(payload)
-    # Deliver in 1-byte chunks to exercise the read_upto reassembly loop
+    # Deliver in 1-byte chunks to exercise the reassembly of short reads
     frames = list(unwrap_message_stream(_mock_response(stream, chunk_size=1)))
     data_frames = [f[0] for f in frames if not f[1]]
     assert data_frames[0] == payload
 
 
 def test_stream_truncated_header_raises():
-    mock = MagicMock()
-    mock.iter_content.return_value = iter([b"\x00\x00"])  # 2 bytes, need 5
+    mock = _mock_response(b"\x00\x00")  # 2 bytes, need 5
     with pytest.raises(InvalidHeader):
         list(unwrap_message_stream(mock))
 
 
+def test_stream_stops_at_trailer():
+    stream = _build_stream(b"msg") + wrap_message(b"ignored")
+    frames = list(unwrap_message_stream(_mock_response(stream)))
+    assert [bytes(f[0]) for f in frames] == [b"msg", b"grpc-status:0\r\n"]
+
+
+def test_stream_missing_trailer_raises():
+    with pytest.raises(InvalidHeader):
+        list(unwrap_message_stream(_mock_response(wrap_message(b"msg"))))
+
+
 def test_stream_truncated_body_raises():
     # Header says 50 bytes but stream ends immediately
     header = struct.pack(_HEADER_FORMAT, 0, 50)
-    mock = MagicMock()
-    mock.iter_content.return_value = iter([header + b"short"])
+    mock = _mock_response(header + b"short")
     with pytest.raises(ContentDecodingError):
         list(unwrap_message_stream(mock))
 
 
+def test_stream_reads_are_length_directed():
+    mock = _mock_response(_build_stream(b"x" * 1000, b"y" * 10))
+    frames = list(unwrap_message_stream(mock))
+    assert [len(f[0]) for f in frames[:-1]] == [1000, 10]
+    assert mock.raw.read_sizes == [5, 1000, 5, 10, 5, 15]
+    mock.iter_content.assert_not_called()
+
+
+def test_stream_read_size_is_limited():
+    raw = _ChunkedRaw(_build_stream(b"z" * 100))
+    frames = list(read_message_stream(raw, max_read_size=40))
+    assert bytes(frames[0][0]) == b"z" * 100
+    assert raw.read_sizes == [5, 40, 40, 20, 5, 15]
+
+
+def test_stream_large_declared_length_is_not_preallocated():
+    import tracemalloc
+
+    # The header of an HTML error page declares a length of about 1.6 GiB
+    raw = _ChunkedRaw(b"<html><body>Bad Gateway</body></html>")
+    tracemalloc.start()
+    try:
+        with pytest.raises(ContentDecodingError, match="Expected 1752460652 bytes"):
+            list(read_message_stream(raw))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < 4 << 20
+
+
+def test_stream_frame_larger_than_preallocation():
+    payload = bytes(range(256)) * (3 << 12) + b"end"
+    frames = list(read_message_stream(_ChunkedRaw(_build_stream(payload))))
+    assert bytes(frames[0][0]) == payload
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 512])
+def test_stream_fixed_chunk_size(chunk_size):
+    payloads = [b"one", b"two" * 100]
+    mock = _mock_response(_build_stream(*payloads), chunk_size=chunk_size)
+    frames = list(unwrap_message_stream(mock, chunk_size))
+    assert [bytes(f[0]) for f in frames[:-1]] == payloads
+    mock.iter_content.assert_called_once_with(chunk_size)
+
+
+def test_stream_content_encoding_uses_iter_content():
+    mock = _mock_response(_build_stream(b"msg"), headers={"content-encoding": "gzip"})
+    frames = list(unwrap_message_stream(mock))
+    assert bytes(frames[0][0]) == b"msg"
+    mock.iter_content.assert_called_once()
+    assert mock.raw.read_sizes == []
+
+
+# ---------------------------------------------------------------------------
+# MessageDecoder
+# ---------------------------------------------------------------------------
+
+
+def _decode_all(data: bytes, chunk_size: int):
+    decoder = MessageDecoder()
+    frames = []
+    for i in range(0, len(data), chunk_size):
+        frames += decoder.feed(data[i : i + chunk_size])
+    decoder.close()
+    return frames
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 7, 64, 4096])
+def test_decoder_chunk_boundaries(chunk_size):
+    payloads = [b"", b"a", b"hello world", bytes(range(256)) * 3]
+    frames = _decode_all(_build_stream(*payloads), chunk_size)
+    assert [bytes(f[0]) for f in frames[:-1]] == payloads
+    assert [f[1] for f in frames] == [False] * len(payloads) + [True]
+
+
+def test_decoder_returns_nothing_for_partial_frame():
+    decoder = MessageDecoder()
+    assert decoder.feed(wrap_message(b"partial")[:-1]) == []
+    assert decoder.pending
+
+
+def test_decoder_frame_inside_chunk_is_not_copied():
+    chunk = wrap_message(b"payload") + wrap_message(b"more")
+    frames = MessageDecoder().feed(chunk)
+    assert [bytes(f[0]) for f in frames] == [b"payload", b"more"]
+    assert all(f[0].obj is chunk for f in frames)
+
+
+def test_decoder_split_frame_is_not_reused():
+    decoder = MessageDecoder()
+    data = wrap_message(b"first") + wrap_message(b"second")
+    first = decoder.feed(data[:7]) + decoder.feed(data[7:12])
+    second = decoder.feed(data[12:14]) + decoder.feed(data[14:])
+    assert bytes(first[0][0]) == b"first"
+    assert bytes(second[0][0]) == b"second"
+    assert first[0][0].obj is not second[0][0].obj
+
+
+def test_decoder_compressed_flag():
+    frames = MessageDecoder().feed(wrap_message(b"zip", compressed=True))
+    assert frames[0][2] is True
+
+
+def test_decoder_close_truncated_header_raises():
+    decoder = MessageDecoder()
+    decoder.feed(b"\x00\x00")
+    with pytest.raises(InvalidHeader):
+        decoder.close()
+
+
+def test_decoder_close_truncated_body_raises():
+    decoder = MessageDecoder()
+    decoder.feed(struct.pack(_HEADER_FORMAT, 0, 50) + b"short")
+    with pytest.raises(ContentDecodingError):
+        decoder.close()
+
+
+def test_decoder_large_declared_length_is_not_preallocated():
+    import tracemalloc
+
+    decoder = MessageDecoder()
+    tracemalloc.start()
+    try:
+        assert decoder.feed(b"<html><body>") == []
+        with pytest.raises(ContentDecodingError, match="Expected 1752460652 bytes, got 7 bytes"):
+            decoder.close()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < 4 << 20
+
+
+def test_decoder_frame_larger_than_preallocation():
+    payload = bytes(range(256)) * (3 << 12) + b"end"
+    frames = _decode_all(wrap_message(payload) + wrap_message(b"next"), 100_000)
+    assert [bytes(f[0]) for f in frames] == [payload, b"next"]
+
+
+def test_decoder_cost_grows_linearly():
+    def measure(size: int) -> float:
+        data = wrap_message(b"x" * size)
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            frames = _decode_all(data, 512)
+            best = min(best, time.perf_counter() - start)
+        assert len(frames[0][0]) == size
+        return best
+
+    small = measure(1 << 20)
+    large = measure(8 << 20)
+    # 8x the payload: linear decoding is ~8x slower, quadratic would be ~64x.
+    assert large / small < 24
+
+
+# ---------------------------------------------------------------------------
+# grpc-web-text
+# ---------------------------------------------------------------------------
+
+
+def _text_stream(*payloads: bytes) -> bytes:
+    # Each frame is encoded separately, so padding appears mid-stream
+    frames = [wrap_message(p) for p in payloads]
+    frames.append(wrap_message(b"grpc-status:0\r\n", trailer=True))
+    return b"".join(encode_text(f) for f in frames)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 4, 5, 16, 1 << 16])
+def test_base64_decoder_chunks(chunk_size):
+    data = _text_stream(b"a", b"bc", b"def")
+    assert b"=" in data[:-4]
+    decoder = Base64Decoder()
+    decoded = b"".join(decoder.feed(data[i : i + chunk_size]) for i in range(0, len(data), chunk_size))
+    decoder.close()
+    assert decoded == _build_stream(b"a", b"bc", b"def")
+
+
+def test_base64_decoder_incomplete_raises():
+    decoder = Base64Decoder()
+    decoder.feed(b"QUJ")
+    with pytest.raises(ContentDecodingError):
+        decoder.close()
+
+
+@pytest.mark.parametrize("chunk_size", [None, 1, 7])
+def test_stream_text_response(chunk_size):
+    payloads = [b"one", b"two" * 100, b""]
+    mock = _mock_response(
+        _text_stream(*payloads),
+        chunk_size=chunk_size or 0,
+        headers={"content-type": "application/grpc-web-text+proto"},
+    )
+    frames = list(unwrap_message_stream(mock, chunk_size))
+    assert [bytes(f[0]) for f in frames[:-1]] == payloads
+    assert frames[-1][1] is True
+
+
+def test_stream_text_missing_trailer_raises():
+    mock = _mock_response(encode_text(wrap_message(b"msg")), headers={"content-type": "application/grpc-web-text"})
+    with pytest.raises(InvalidHeader):
+        list(unwrap_message_stream(mock))
+
+
 # ---------------------------------------------------------------------------
 # serialize_timeout
 # ---------------------------------------------------------------------------
@@ -175,6 +413,11 @@ def test_deserialize_trailer_single_entry():
     assert deserialize_trailer(data) == {"grpc-status": "2"}
 
 
+def test_deserialize_trailer_memoryview():
+    data = memoryview(bytearray(b"grpc-status:0"))
+    assert deserialize_trailer(data) == {"grpc-status": "0"}
+
+
 # ---------------------------------------------------------------------------
 # _strip_extension_brackets
 # ---------------------------------------------------------------------------
@@ -281,15 +524,3 @@ def test_load_messages_without_package():
     messages = load_messages(fds)
     assert "StandaloneMsg" in messages
     assert ".StandaloneMsg" not in messages
-
-
-# ---------------------------------------------------------------------------
-# _ensure_fds_in_pool (idempotent)
-# ---------------------------------------------------------------------------
-
-
-def test_ensure_fds_in_pool_is_idempotent():
-    fds = make_fds("ensure_pool_idem.proto", package="ensure.pool.v1")
-    # Calling twice must not raise
-    _ensure_fds_in_pool(fds)
-    _ensure_fds_in_pool(fds)
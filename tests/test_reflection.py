@@ -0,0 +1,198 @@
+"""Tests for loading the protobuf of a server with gRPC Server Reflection."""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+
+from google.protobuf import descriptor_pb2, descriptor_pool
+import grpc
+import pytest
+
+from pyease_grpc import _reflection
+from pyease_grpc.protobuf import Protobuf
+from pyease_grpc.rpc_session import RpcSession
+
+reflection = pytest.importorskip("grpc_reflection.v1alpha.reflection")
+reflection_pb2 = pytest.importorskip("grpc_reflection.v1alpha.reflection_pb2")
+reflection_pb2_grpc = pytest.importorskip("grpc_reflection.v1alpha.reflection_pb2_grpc")
+
+EXAMPLE_PROTO = os.path.join(os.path.dirname(__file__), "..", "example", "server", "abc.proto")
+
+_COMMON_PROTO = """
+syntax = "proto3";
+package reflection.test.v1;
+import "google/protobuf/timestamp.proto";
+message Item { string id = 1; google.protobuf.Timestamp at = 2; }
+"""
+
+_MAIN_PROTO = """
+syntax = "proto3";
+package reflection.test.v1;
+import "reflection_common.proto";
+service Items { rpc Get (Item) returns (Item); }
+"""
+
+
+class _FileReflectionServicer(reflection.ReflectionServicer):
+    """Sends only the requested file, without its imports, and records the requests"""
+
+    def __init__(self, service_names, pool) -> None:
+        super().__init__(service_names, pool=pool)
+        self.requests = []
+
+    def ServerReflectionInfo(self, request_iterator, context):
+        def record(requests):
+            for request in requests:
+                self.requests.append(request.WhichOneof("message_request"))
+                yield request
+
+        return super().ServerReflectionInfo(record(request_iterator), context)
+
+    def _file_containing_symbol(self, request, fully_qualified_name):
+        try:
+            descriptor = self._pool.FindFileContainingSymbol(fully_qualified_name)
+        except KeyError:
+            return super()._file_containing_symbol(request, fully_qualified_name)
+        proto = descriptor_pb2.FileDescriptorProto()
+        descriptor.CopyToProto(proto)
+        return reflection_pb2.ServerReflectionResponse(
+            file_descriptor_response=reflection_pb2.FileDescriptorResponse(
+                file_descriptor_proto=[proto.SerializeToString()]
+            ),
+            original_request=request,
+        )
+
+
+@pytest.fixture(scope="module")
+def reflection_server(tmp_path_factory):
+    """Serves the Greeter of the example server, and a service that imports other files,
+    with reflection enabled. Yields the servicer of the reflection service and the target."""
+    path = tmp_path_factory.mktemp("reflection")
+    (path / "reflection_common.proto").write_text(_COMMON_PROTO)
+    (path / "reflection_main.proto").write_text(_MAIN_PROTO)
+    example = Protobuf.from_file(EXAMPLE_PROTO)
+    items = Protobuf.from_file(str(path / "reflection_main.proto"))
+
+    pool = descriptor_pool.DescriptorPool()
+    for proto in list(example.descriptor.file) + list(items.descriptor.file):
+        pool.Add(proto)
+    request = example.messages["pyease.sample.v1.HelloRequest"]
+    response = example.messages["pyease.sample.v1.HelloResponse"]
+    handlers = {
+        "SayHello": grpc.unary_unary_rpc_method_handler(
+            lambda r, _: response(reply=f"Hello, {r.name}!"),
+            request_deserializer=request.FromString,
+            response_serializer=response.SerializeToString,
+        )
+    }
+    names = ["pyease.sample.v1.Greeter", "reflection.test.v1.Items", reflection.SERVICE_NAME]
+    servicer = _FileReflectionServicer(names, pool)
+
+    server = grpc.server(ThreadPoolExecutor(max_workers=4))
+    server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler("pyease.sample.v1.Greeter", handlers),))
+    reflection_pb2_grpc.add_ServerReflectionServicer_to_server(servicer, server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    try:
+        yield servicer, f"127.0.0.1:{port}"
+    finally:
+        server.stop(None)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    _reflection._cache.clear()
+    yield
+    _reflection._cache.clear()
+
+
+# ---------------------------------------------------------------------------
+# Protobuf.from_reflection
+# ---------------------------------------------------------------------------
+
+
+def test_from_reflection_fetches_imports(reflection_server):
+    servicer, target = reflection_server
+    del servicer.requests[:]
+    pb = Protobuf.from_reflection(target, ["reflection.test.v1.Items"])
+    assert [f.name for f in pb.descriptor.file] == [
+        "google/protobuf/timestamp.proto",
+        "reflection_common.proto",
+        "reflection_main.proto",
+    ]
+    # The import of the service file is asked for, and sent with its own import
+    assert servicer.requests == ["file_containing_symbol", "file_by_filename"]
+    method = pb.find_method("/reflection.test.v1.Items/Get")
+    assert method.request is pb.types["reflection.test.v1.Item"]
+
+
+def test_from_reflection_all_services(reflection_server):
+    _, target = reflection_server
+    pb = Protobuf.from_reflection(target)
+    assert sorted(pb.services) == ["Greeter", "Items"]
+
+
+def test_from_reflection_unknown_service(reflection_server):
+    _, target = reflection_server
+    with pytest.raises(ValueError, match="No such service: nope.Nope"):
+        Protobuf.from_reflection(target, ["nope.Nope"])
+
+
+def test_from_reflection_is_cached(reflection_server, tmp_path):
+    servicer, target = reflection_server
+    cache_dir = str(tmp_path)
+    first = Protobuf.from_reflection(target, ["pyease.sample.v1.Greeter"], cache_dir=cache_dir)
+    del servicer.requests[:]
+    assert Protobuf.from_reflection(target, ["pyease.sample.v1.Greeter"]).descriptor == first.descriptor
+    assert servicer.requests == []
+
+    # The disk cache is used by the other processes
+    _reflection._cache.clear()
+    assert Protobuf.from_reflection(target, ["pyease.sample.v1.Greeter"], cache_dir=cache_dir).descriptor == (
+        first.descriptor
+    )
+    assert servicer.requests == []
+
+
+def test_from_reflection_cache_expires(reflection_server, tmp_path):
+    servicer, target = reflection_server
+    cache_dir = str(tmp_path)
+    Protobuf.from_reflection(target, ["pyease.sample.v1.Greeter"], cache_dir=cache_dir, ttl=60)
+    _reflection._cache.clear()
+    for name in os.listdir(cache_dir):
+        os.utime(os.path.join(cache_dir, name), (time.time() - 120, time.time() - 120))
+    del servicer.requests[:]
+    Protobuf.from_reflection(target, ["pyease.sample.v1.Greeter"], cache_dir=cache_dir, ttl=60)
+    assert servicer.requests == ["file_containing_symbol"]
+
+    del servicer.requests[:]
+    Protobuf.from_reflection(target, ["pyease.sample.v1.Greeter"], ttl=0)
+    assert servicer.requests == ["file_containing_symbol"]
+
+
+class _ErrorStream(object):
+    """Answers every reflection request with an error"""
+
+    def ask(self, **request):
+        return reflection_pb2.ServerReflectionResponse(
+            error_response=reflection_pb2.ErrorResponse(error_code=13, error_message="broken"),
+        )
+
+
+def test_from_reflection_list_services_error():
+    with pytest.raises(ValueError, match="Can not list the services: broken"):
+        _reflection._fetch_files(_ErrorStream(), None)
+
+
+# ---------------------------------------------------------------------------
+# RpcSession.from_reflection
+# ---------------------------------------------------------------------------
+
+
+def test_session_from_reflection(reflection_server):
+    _, target = reflection_server
+    with RpcSession.from_reflection(target, ["pyease.sample.v1.Greeter"], base_url=target) as session:
+        assert len(session.channels) == 1
+        response = session.call("/pyease.sample.v1.Greeter/SayHello", {"name": "world"})
+        assert response.single == {"reply": "Hello, world!"}
+        assert len(session.channels) == 1
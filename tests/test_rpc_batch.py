@@ -0,0 +1,202 @@
+"""Tests for pyease_grpc/rpc_batch.py — concurrent batches of calls."""
+
+import io
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import grpc
+import pytest
+
+from pyease_grpc._protocol import unwrap_message, wrap_message
+from pyease_grpc.protobuf import Protobuf
+from pyease_grpc.rpc_batch import RpcBatch, RpcBatchResult
+from pyease_grpc.rpc_session import RpcSession
+from pyease_grpc.rpc_trailer import RpcTrailer
+from pyease_grpc.rpc_uri import RpcUri
+
+from .conftest import make_fds
+
+
+class _Response(object):
+    def __init__(self, value, error=None):
+        self.value = value
+        self.error = error
+        self.closed = False
+
+    @property
+    def single(self):
+        if self.error is not None:
+            raise self.error
+        return {"result": self.value}
+
+    def close(self):
+        self.closed = True
+
+
+def _batch(call, count, **kwargs):
+    return RpcBatch(call, ((f"uri {i}", i) for i in range(count)), **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# RpcBatch
+# ---------------------------------------------------------------------------
+
+
+def test_batch_yields_results_in_order():
+    def call(uri, data):
+        time.sleep(0.001 * (data % 3))
+        return _Response(data)
+
+    results = list(_batch(call, 50, concurrency=4))
+    assert [r.index for r in results] == list(range(50))
+    assert [r.single for r in results] == [{"result": i} for i in range(50)]
+    assert all(r.ok and r.response.closed for r in results)
+    assert results[1].uri == "uri 1"
+    assert results[1].data == 1
+
+
+def test_batch_unordered_yields_as_completed():
+    release = threading.Event()
+
+    def call(uri, data):
+        if data == 0:
+            release.wait(5)
+        return _Response(data)
+
+    batch = _batch(call, 5, concurrency=2, ordered=False)
+    first = next(batch)
+    assert first.index != 0
+    release.set()
+    assert sorted([first.index] + [r.index for r in batch]) == list(range(5))
+
+
+def test_batch_captures_errors():
+    trailer = RpcTrailer({"grpc-status": "5", "grpc-message": "not found"})
+
+    def call(uri, data):
+        if data == 1:
+            raise ValueError("bad request")
+        return _Response(data, error=trailer if data == 2 else None)
+
+    batch = _batch(call, 4, concurrency=2)
+    results = list(batch)
+    assert [r.ok for r in results] == [True, False, False, True]
+    assert isinstance(results[1].error, ValueError)
+    assert results[2].error is trailer
+    with pytest.raises(RpcTrailer):
+        results[2].single
+    assert batch.stats.completed == 4
+    assert batch.stats.failed == 2
+    assert batch.stats.succeeded == 2
+
+
+def test_batch_bounds_concurrency_and_window():
+    lock = threading.Lock()
+    running = []
+    peak = []
+    read = []
+
+    def call(uri, data):
+        with lock:
+            running.append(data)
+            peak.append(len(running))
+        time.sleep(0.005)
+        with lock:
+            running.remove(data)
+        return _Response(data)
+
+    def calls():
+        for i in range(40):
+            read.append(i)
+            yield f"uri {i}", i
+
+    batch = RpcBatch(call, calls(), concurrency=3, window=5)
+    next(batch)
+    assert len(read) <= 6
+    list(batch)
+    assert max(peak) <= 3
+
+
+def test_batch_stats():
+    batch = _batch(lambda uri, data: _Response(data), 10, concurrency=2)
+    assert batch.stats.submitted == 0
+    for result in batch:
+        assert batch.stats.completed >= result.index + 1
+        assert batch.stats.in_flight == batch.stats.submitted - batch.stats.completed
+    stats = batch.stats
+    assert (stats.submitted, stats.completed, stats.failed, stats.in_flight) == (10, 10, 0, 0)
+    assert stats.finished is not None
+    assert stats.elapsed == stats.finished - stats.started
+    assert stats.throughput > 0
+    assert "completed=10/10" in repr(stats)
+
+
+def test_batch_close_stops_submitting():
+    submitted = []
+
+    def call(uri, data):
+        submitted.append(data)
+        return _Response(data)
+
+    with _batch(call, 1000, concurrency=2) as batch:
+        next(batch)
+    assert len(submitted) <= batch.window + 1
+    assert list(batch) == []
+    assert batch.stats.finished is not None
+
+
+def test_invalid_batch_raises():
+    with pytest.raises(ValueError, match="concurrency"):
+        _batch(lambda uri, data: None, 1, concurrency=0)
+    with pytest.raises(ValueError, match="window"):
+        _batch(lambda uri, data: None, 1, concurrency=4, window=2)
+
+
+def test_batch_result_repr():
+    assert repr(RpcBatchResult(3, "uri", {})) == "<RpcBatchResult #3 uri: ok>"
+
+
+# ---------------------------------------------------------------------------
+# RpcSession
+# ---------------------------------------------------------------------------
+
+
+def test_session_request_many():
+    proto = Protobuf(make_fds("batch_test.proto", package="batch.test.v1", service_name="Svc", method_name="Run"))
+    request_type = proto.messages["batch.test.v1.Request"]
+    response_type = proto.messages["batch.test.v1.Response"]
+
+    def post(**kwargs):
+        data, _, _ = unwrap_message(kwargs["data"])
+        value = request_type.FromString(data).value
+        status = b"grpc-status:5\r\ngrpc-message:missing\r\n" if value == "missing" else b"grpc-status:0\r\n"
+        body = wrap_message(response_type(result=value.upper()).SerializeToString())
+        body += wrap_message(status, trailer=True)
+        return MagicMock(headers={}, status_code=200, raw=io.BytesIO(body))
+
+    session = RpcSession(proto)
+    uri = "http://localhost:8080/batch.test.v1.Svc/Run"
+    calls = [(uri, {"value": v}) for v in ["a", "missing", "c"]]
+    with patch.object(session._session, "post", side_effect=post) as mock_post:
+        results = list(session.request_many(calls, concurrency=2, timeout=3))
+    assert mock_post.call_count == 3
+    assert all(c.kwargs["timeout"] == 3 for c in mock_post.call_args_list)
+    assert results[0].single == {"result": "A"}
+    assert results[1].error.code() == grpc.StatusCode.NOT_FOUND
+    assert results[2].single == {"result": "C"}
+
+
+def test_session_call_many(native_server):
+    proto, target = native_server
+    uri = RpcUri(target, "native.test.v1", "TestService", "Unary")
+    with RpcSession(proto) as session:
+        calls = [(uri, {"value": "error" if i % 10 == 5 else str(i)}) for i in range(100)]
+        batch = session.call_many(calls, concurrency=8)
+        results = list(batch)
+        assert [r.index for r in results] == list(range(100))
+        assert results[1].single == {"result": "Hello, 1!"}
+        assert results[5].error.code() == grpc.StatusCode.INVALID_ARGUMENT
+        assert batch.stats.failed == 10
+        entry = next(iter(session.channels._entries.values()))
+        assert entry.active == 0
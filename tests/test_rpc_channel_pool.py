@@ -0,0 +1,129 @@
+"""Tests for pyease_grpc/rpc_channel_pool.py and the pooled RpcSession.call."""
+
+import time
+
+import grpc
+import pytest
+
+from pyease_grpc.rpc_channel_pool import RpcChannelPool
+from pyease_grpc.rpc_session import RpcSession
+from pyease_grpc.rpc_uri import RpcUri
+
+
+def _uri(target, method):
+    return RpcUri(target, "native.test.v1", "TestService", method)
+
+
+# ---------------------------------------------------------------------------
+# RpcChannelPool
+# ---------------------------------------------------------------------------
+
+
+def test_acquire_reuses_channel():
+    with RpcChannelPool() as pool:
+        first = pool.acquire("localhost:1")
+        pool.release(first)
+        assert pool.acquire("localhost:1") is first
+        assert len(pool) == 1
+
+
+def test_acquire_keys_by_target_and_options():
+    with RpcChannelPool(options=[("grpc.max_receive_message_length", -1)]) as pool:
+        base = pool.acquire("localhost:1")
+        assert pool.acquire("localhost:2") is not base
+        assert pool.acquire("localhost:1", options=[("grpc.keepalive_time_ms", 1000)]) is not base
+        # Same merged options in a different order share the channel
+        same = pool.acquire("localhost:1", options=[("grpc.max_receive_message_length", -1)])
+        assert same is base
+        assert len(pool) == 3
+
+
+def test_acquire_round_robin_subchannels():
+    with RpcChannelPool(subchannels=3) as pool:
+        channels = [pool.acquire("localhost:1") for _ in range(6)]
+        assert len(set(map(id, channels))) == 3
+        assert channels[:3] == channels[3:]
+
+
+def test_invalid_subchannels_raises():
+    with pytest.raises(ValueError):
+        RpcChannelPool(subchannels=0)
+
+
+def test_idle_channels_are_evicted():
+    with RpcChannelPool(idle_timeout=0.01) as pool:
+        first = pool.acquire("localhost:1")
+        pool.release(first)
+        time.sleep(0.05)
+        assert pool.acquire("localhost:2") is not first
+        assert len(pool) == 1
+
+
+def test_active_channels_are_not_evicted():
+    with RpcChannelPool(idle_timeout=0.01) as pool:
+        first = pool.acquire("localhost:1")
+        time.sleep(0.05)
+        pool.acquire("localhost:2")
+        assert len(pool) == 2
+        assert pool.acquire("localhost:1") is first
+
+
+def test_close_closes_channels():
+    pool = RpcChannelPool()
+    pool.acquire("localhost:1")
+    pool.close()
+    assert len(pool) == 0
+
+
+# ---------------------------------------------------------------------------
+# RpcSession.call
+# ---------------------------------------------------------------------------
+
+
+def test_call_reuses_pooled_channel(native_server):
+    proto, target = native_server
+    with RpcSession(proto) as session:
+        for name in ["a", "b", "c"]:
+            response = session.call(_uri(target, "Unary"), {"value": name})
+            assert response.single == {"result": f"Hello, {name}!"}
+        assert len(session.channels) == 1
+        channel = session.channels.acquire(target)
+        assert response.channel is channel
+
+
+def test_call_close_keeps_pooled_channel_open(native_server):
+    proto, target = native_server
+    with RpcSession(proto) as session:
+        response = session.call(_uri(target, "ServerStream"), {"value": "s"})
+        response.close()
+        response = session.call(_uri(target, "ServerStream"), {"value": "s"})
+        assert len(response.payloads) == 3
+
+
+def test_call_error_releases_channel(native_server):
+    proto, target = native_server
+    with RpcSession(proto) as session:
+        with pytest.raises(grpc.RpcError):
+            session.call(_uri(target, "Unary"), {"value": "error"})
+        entry = next(iter(session.channels._entries.values()))
+        assert entry.active == 0
+
+
+def test_call_with_channel_options(native_server):
+    proto, target = native_server
+    options = [("grpc.max_receive_message_length", 1 << 20)]
+    with RpcSession(proto, channel_options=options, subchannels=2) as session:
+        response = session.call(_uri(target, "BidiStream"), [{"value": "x"}, {"value": "y"}])
+        assert response.payloads == [{"result": "Hello, x!"}, {"result": "Hello, y!"}]
+
+
+def test_call_with_given_channel_keeps_it_open(native_server):
+    proto, target = native_server
+    with grpc.insecure_channel(target) as channel:
+        with RpcSession(proto) as session:
+            response = session.call(_uri(target, "Unary"), {"value": "mine"}, channel=channel)
+            assert response.single == {"result": "Hello, mine!"}
+            response.close()
+            assert len(session.channels) == 0
+        response = RpcSession(proto).call(_uri(target, "Unary"), {"value": "again"}, channel=channel)
+        assert response.single == {"result": "Hello, again!"}
@@ -0,0 +1,105 @@
+"""Tests for pyease_grpc/rpc_codec.py — codecs and the codec registry."""
+
+import gzip
+import os
+import zlib
+
+import pytest
+from requests.exceptions import ContentDecodingError
+
+from pyease_grpc import rpc_codec
+from pyease_grpc.rpc_codec import (
+    DeflateCodec,
+    GzipCodec,
+    RpcCodec,
+    available_codecs,
+    get_codec,
+    register_codec,
+)
+
+# ---------------------------------------------------------------------------
+# Built-in codecs
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("name", ["identity", "gzip", "deflate"])
+def test_roundtrip(name):
+    codec = get_codec(name)
+    data = b"hello world " * 1000
+    assert codec.decompress(codec.compress(data)) == data
+
+
+@pytest.mark.parametrize("name", ["gzip", "deflate"])
+def test_roundtrip_empty(name):
+    codec = get_codec(name)
+    assert codec.decompress(codec.compress(b"")) == b""
+
+
+def test_gzip_is_compatible_with_stdlib():
+    data = os.urandom(100) * 50
+    assert GzipCodec().decompress(gzip.compress(data)) == data
+    assert gzip.decompress(GzipCodec().compress(data)) == data
+
+
+def test_deflate_is_zlib_stream():
+    data = b"deflate me" * 100
+    assert DeflateCodec().decompress(zlib.compress(data)) == data
+    assert zlib.decompress(DeflateCodec().compress(data)) == data
+
+
+def test_decompress_memoryview():
+    data = b"abc" * 100000
+    compressed = bytearray(GzipCodec().compress(data))
+    assert GzipCodec().decompress(memoryview(compressed)) == data
+
+
+def test_decompress_max_length_exceeded():
+    bomb = GzipCodec().compress(b"\0" * (10 << 20))
+    with pytest.raises(ContentDecodingError):
+        GzipCodec().decompress(bomb, max_length=1 << 20)
+
+
+def test_decompress_max_length_exact():
+    data = b"x" * 1000
+    assert GzipCodec().decompress(GzipCodec().compress(data), max_length=1000) == data
+
+
+def test_identity_max_length_exceeded():
+    with pytest.raises(ContentDecodingError):
+        RpcCodec().decompress(b"x" * 10, max_length=5)
+
+
+def test_decompress_truncated_raises():
+    compressed = GzipCodec().compress(os.urandom(1000))
+    with pytest.raises((ContentDecodingError, zlib.error)):
+        GzipCodec().decompress(compressed[:-10])
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+
+def test_builtin_codecs_registered():
+    assert {"identity", "gzip", "deflate"} <= set(available_codecs())
+
+
+def test_unknown_codec_is_none():
+    assert get_codec("no-such-codec") is None
+
+
+def test_register_custom_codec(monkeypatch):
+    class ReverseCodec(RpcCodec):
+        name = "test-reverse"
+
+        def compress(self, data):
+            return bytes(data)[::-1]
+
+        def decompress(self, data, max_length=None):
+            return bytes(data)[::-1]
+
+    codec = ReverseCodec()
+    monkeypatch.setattr(rpc_codec, "_codecs", dict(rpc_codec._codecs))
+    register_codec(codec)
+    assert get_codec("test-reverse") is codec
+    assert "test-reverse" in available_codecs()
@@ -0,0 +1,160 @@
+"""Tests for pyease_grpc/rpc_decode_pool.py — parallel decoding of streamed messages."""
+
+from unittest.mock import MagicMock
+
+from google.protobuf.message import DecodeError
+from google.protobuf.struct_pb2 import Value
+import grpc
+import pytest
+
+from pyease_grpc.protobuf import Protobuf
+from pyease_grpc.rpc_decode_pool import RpcDecodePool
+from pyease_grpc.rpc_response_native import RpcNativeResponse
+from pyease_grpc.rpc_session import RpcSession
+from pyease_grpc.rpc_uri import RpcUri
+
+PROTO = """
+syntax = "proto3";
+
+package decode.test.v1;
+
+message Item {
+  string name = 1;
+  int64 size = 2;
+  repeated Item children = 3;
+}
+"""
+
+
+@pytest.fixture(scope="module")
+def proto():
+    return Protobuf.from_proto(PROTO, "decode_pool_test")
+
+
+@pytest.fixture(scope="module")
+def pool(proto):
+    with RpcDecodePool(proto, workers=2, window=3) as pool:
+        yield pool
+
+
+def _items(proto, count):
+    item_type = proto.messages["decode.test.v1.Item"]
+    return [item_type(name=f"item {i}", size=i, children=[item_type(name="child")]) for i in range(count)]
+
+
+def _expected(count):
+    return [
+        {"name": f"item {i}", "size": str(i), "children": [{"name": "child", "size": "0", "children": []}]}
+        for i in range(count)
+    ]
+
+
+def _native(proto, messages, **kwargs):
+    item_type = proto.messages["decode.test.v1.Item"]
+    return RpcNativeResponse(MagicMock(spec=grpc.Channel), iter(messages), message_type=item_type, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# RpcDecodePool
+# ---------------------------------------------------------------------------
+
+
+def test_imap_keeps_order(proto, pool):
+    item_type = proto.messages["decode.test.v1.Item"]
+    data = [item.SerializeToString() for item in _items(proto, 20)]
+    assert list(pool.imap(item_type, data)) == _expected(20)
+
+
+def test_imap_unordered(proto):
+    item_type = proto.messages["decode.test.v1.Item"]
+    data = [item.SerializeToString() for item in _items(proto, 20)]
+    with RpcDecodePool(proto, workers=2, ordered=False) as pool:
+        result = list(pool.imap(item_type, data))
+    assert sorted(result, key=lambda d: int(d["size"])) == _expected(20)
+
+
+def test_imap_selected_fields(proto, pool):
+    item_type = proto.messages["decode.test.v1.Item"]
+    data = [item.SerializeToString() for item in _items(proto, 3)]
+    assert list(pool.imap(item_type, data, fields=["name", "children.name"])) == [
+        {"name": f"item {i}", "children": [{"name": "child"}]} for i in range(3)
+    ]
+    with pytest.raises(ValueError, match="No such field"):
+        pool.imap(item_type, data, fields=["nope"])
+
+
+def test_imap_reads_within_window(proto, pool):
+    item_type = proto.messages["decode.test.v1.Item"]
+    read = []
+
+    def messages():
+        for i, item in enumerate(_items(proto, 10)):
+            read.append(i)
+            yield item.SerializeToString()
+
+    results = pool.imap(item_type, messages())
+    assert next(results) == _expected(1)[0]
+    assert len(read) == pool.window + 1
+    results.close()
+
+
+def test_imap_raises_decode_errors(proto, pool):
+    item_type = proto.messages["decode.test.v1.Item"]
+    with pytest.raises(DecodeError):
+        list(pool.imap(item_type, [b"\xff\xff"]))
+
+
+def test_imap_unknown_message_raises(pool):
+    with pytest.raises(ValueError, match="No such message"):
+        pool.imap(Value, [])
+
+
+def test_invalid_pool_raises(proto):
+    with pytest.raises(ValueError, match="worker"):
+        RpcDecodePool(proto, workers=0)
+    with pytest.raises(ValueError, match="window"):
+        RpcDecodePool(proto, workers=1, window=0)
+
+
+# ---------------------------------------------------------------------------
+# Responses
+# ---------------------------------------------------------------------------
+
+
+def test_response_iter_payloads_with_pool(proto, pool):
+    response = _native(proto, _items(proto, 5))
+    assert list(response.iter_payloads(pool=pool)) == _expected(5)
+    assert response.payloads == _expected(5)
+
+
+def test_response_pool_with_prefetch_and_fields(proto, pool):
+    response = _native(proto, _items(proto, 5), fields=["size"], prefetch=2, retain=False)
+    assert list(response.iter_payloads(pool=pool)) == [{"size": str(i)} for i in range(5)]
+    assert response.single == {"size": "4"}
+
+
+def test_response_pool_resumes_after_break(proto, pool):
+    response = _native(proto, _items(proto, 8))
+    for payload in response.iter_payloads(pool=pool):
+        break
+    assert payload == _expected(1)[0]
+    assert list(response.iter_payloads(pool=pool)) == _expected(8)[1:]
+
+
+def test_response_iter_selected_with_pool(proto, pool):
+    response = _native(proto, _items(proto, 3), output="message")
+    assert list(response.iter_payloads(fields="name", pool=pool)) == [{"name": f"item {i}"} for i in range(3)]
+
+
+def test_response_pool_requires_dict_output(proto, pool):
+    response = _native(proto, _items(proto, 1), output="message")
+    with pytest.raises(ValueError, match="dict output"):
+        list(response.iter_payloads(pool=pool))
+
+
+def test_session_call_with_pool(native_server):
+    proto, target = native_server
+    with RpcSession(proto) as session, RpcDecodePool(proto, workers=1) as pool:
+        stream = RpcUri(target, "native.test.v1", "TestService", "ServerStream")
+        response = session.call(stream, {"value": "s"})
+        assert [p["result"] for p in response.iter_payloads(pool=pool)] == ["s 0", "s 1", "s 2"]
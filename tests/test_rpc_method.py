@@ -0,0 +1,66 @@
+"""Tests for pyease_grpc/rpc_method.py — request and response conversion."""
+
+from google.protobuf.struct_pb2 import ListValue, Struct, Value
+import pytest
+
+from pyease_grpc.rpc_method import RpcMethod
+
+
+@pytest.fixture
+def method():
+    return RpcMethod("google.protobuf", "Svc", "Get", Value, Value)
+
+
+def test_serialize_request_dict(method):
+    assert method.serialize_request("text") == Value(string_value="text").SerializeToString()
+
+
+def test_serialize_request_message(method):
+    message = Value(number_value=1.5)
+    assert method.serialize_request(message) == message.SerializeToString()
+
+
+def test_serialize_request_bytes_pass_through(method):
+    data = Value(bool_value=True).SerializeToString()
+    assert method.serialize_request(data) is data
+    assert method.serialize_request(bytearray(data)) == data
+    assert method.serialize_request(memoryview(data)) == data
+
+
+def test_prepare_request_keeps_message(method):
+    message = Value(string_value="same")
+    assert method.prepare_request(message) is message
+
+
+def test_prepare_request_parses_dict():
+    method = RpcMethod("google.protobuf", "Svc", "Get", Struct, Struct)
+    message = method.prepare_request({"a": 1})
+    assert isinstance(message, Struct)
+    assert message["a"] == 1
+
+
+def test_prepare_request_wrong_message_type_raises(method):
+    with pytest.raises(TypeError, match="Expected google.protobuf.Value"):
+        method.prepare_request(ListValue())
+
+
+def test_parse_request_from_bytes(method):
+    data = Value(string_value="x").SerializeToString()
+    assert method.parse_request(data) == Value(string_value="x")
+    assert method.parse_request(Value(string_value="y")) == Value(string_value="y")
+
+
+def test_deserialize_response_dict_caches_decoder():
+    from google.protobuf import json_format
+    from google.protobuf.descriptor_pb2 import FileDescriptorProto
+
+    from pyease_grpc import _json_format
+
+    method = RpcMethod("google.protobuf", "Svc", "Get", Value, FileDescriptorProto)
+    message = FileDescriptorProto(name="a.proto", dependency=["b.proto"])
+    expected = json_format.MessageToDict(message, **{_json_format._PRINT_DEFAULTS: True})
+    assert method.deserialize_response_dict(message.SerializeToString()) == expected
+    to_dict = method._response_to_dict
+    assert to_dict is not None
+    method.deserialize_response_dict(message.SerializeToString())
+    assert method._response_to_dict is to_dict
@@ -177,6 +177,50 @@ def test_web_response_raises_on_compressed(mock_unwrap):
         list(resp.iter_payloads())
 
 
+@patch("pyease_grpc.rpc_response_web._protocol.unwrap_message_stream")
+def test_web_response_raises_on_unknown_encoding(mock_unwrap):
+    mock_unwrap.return_value = iter([(b"data", False, True)])
+    resp, mock_response, _ = _make_web_response(200)
+    mock_response.headers = {"grpc-encoding": "no-such-codec"}
+
+    with pytest.raises(NotImplementedError):
+        list(resp.iter_payloads())
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+@patch("pyease_grpc.rpc_response_web._protocol.unwrap_message_stream")
+def test_web_response_decompresses_messages(mock_unwrap, encoding):
+    from pyease_grpc.rpc_codec import get_codec
+
+    compressed = get_codec(encoding).compress(b"compressed-data")
+    mock_unwrap.return_value = iter(
+        [
+            (memoryview(compressed), False, True),
+            (b"plain-data", False, False),
+            (b"grpc-status:0\r\n", True, False),
+        ]
+    )
+    resp, mock_response, mock_method = _make_web_response(200, stream_frames=True)
+    mock_response.headers = {"grpc-encoding": encoding}
+
+    assert list(resp.iter_payloads()) == [{"raw": "compressed-data"}, {"raw": "plain-data"}]
+
+
+@patch("pyease_grpc.rpc_response_web._protocol.unwrap_message_stream")
+def test_web_response_max_decompressed_size(mock_unwrap):
+    from requests.exceptions import ContentDecodingError
+
+    from pyease_grpc.rpc_codec import get_codec
+
+    compressed = get_codec("gzip").compress(b"x" * 1000)
+    mock_unwrap.return_value = iter([(compressed, False, True)])
+    mock_response = MagicMock(status_code=200, headers={"grpc-encoding": "gzip"})
+    resp = RpcWebResponse(MagicMock(), mock_response, max_decompressed_size=100)
+
+    with pytest.raises(ContentDecodingError):
+        list(resp.iter_payloads())
+
+
 @patch("pyease_grpc.rpc_response_web._protocol.unwrap_message_stream")
 def test_web_response_cached_after_first_iter(mock_unwrap):
     mock_unwrap.return_value = iter(
@@ -196,6 +240,15 @@ def test_web_response_cached_after_first_iter(mock_unwrap):
     assert mock_unwrap.call_count == 1
 
 
+@patch("pyease_grpc.rpc_response_web._protocol.unwrap_message_stream")
+def test_web_response_passes_chunk_size(mock_unwrap):
+    mock_unwrap.return_value = iter([(b"grpc-status:0\r\n", True, False)])
+    mock_response = MagicMock(status_code=200)
+    resp = RpcWebResponse(MagicMock(), mock_response, chunk_size=4096)
+    list(resp.iter_payloads())
+    mock_unwrap.assert_called_once_with(mock_response, 4096)
+
+
 def test_web_response_headers_property():
     resp, mock_response, _ = _make_web_response(200)
     mock_response.headers = {"content-type": "application/grpc-web+proto"}
@@ -206,3 +259,306 @@ def test_web_response_close():
     resp, mock_response, _ = _make_web_response(200)
     resp.close()
     mock_response.close.assert_called_once()
+
+
+# ---------------------------------------------------------------------------
+# Output modes
+# ---------------------------------------------------------------------------
+
+
+def _value_frames(*values):
+    frames = [(Value(string_value=v).SerializeToString(), False, False) for v in values]
+    return iter(frames + [(b"grpc-status:0\r\n", True, False)])
+
+
+def _value_method():
+    from pyease_grpc.rpc_method import RpcMethod
+
+    return RpcMethod("google.protobuf", "Svc", "Get", Value, Value)
+
+
+@pytest.mark.parametrize(
+    "output, expected",
+    [
+        ("dict", ["a", "b"]),
+        ("view", ["a", "b"]),
+        ("message", [Value(string_value="a"), Value(string_value="b")]),
+        ("raw", [Value(string_value="a").SerializeToString(), Value(string_value="b").SerializeToString()]),
+    ],
+)
+@patch("pyease_grpc.rpc_response_web._protocol.unwrap_message_stream")
+def test_web_response_output(mock_unwrap, output, expected):
+    mock_unwrap.return_value = _value_frames("a", "b")
+    resp = RpcWebResponse(_value_method(), MagicMock(status_code=200), output=output)
+    assert resp.payloads == expected
+    assert list(resp.iter_messages()) == [Value(string_value="a"), Value(string_value="b")]
+    assert list(resp.iter_raw()) == [Value(string_value=v).SerializeToString() for v in "ab"]
+
+
+@patch("pyease_grpc.rpc_response_web._protocol.unwrap_message_stream")
+def test_web_response_iter_messages_skips_dict_conversion(mock_unwrap):
+    mock_unwrap.return_value = _value_frames("a", "b")
+    with patch("pyease_grpc.rpc_method._protocol.message_to_dict") as mock_to_dict:
+        resp = RpcWebResponse(_value_method(), MagicMock(status_code=200))
+        assert [m.string_value for m in resp.iter_messages()] == ["a", "b"]
+    mock_to_dict.assert_not_called()
+    assert not resp._payloads_ready
+
+
+@patch("pyease_grpc.rpc_response_web._protocol.unwrap_message_stream")
+def test_web_response_iter_raw_yields_bytes(mock_unwrap):
+    mock_unwrap.return_value = iter([(memoryview(b"\x1a\x01x"), False, False), (b"grpc-status:0\r\n", True, False)])
+    resp = RpcWebResponse(_value_method(), MagicMock(status_code=200))
+    raw = list(resp.iter_raw())
+    assert raw == [b"\x1a\x01x"]
+    assert type(raw[0]) is bytes
+
+
+def test_native_response_output_message():
+    messages = [Value(string_value="a"), Value(string_value="b")]
+    resp = RpcNativeResponse(MagicMock(spec=grpc.Channel), iter(messages), output="message")
+    assert resp.payloads == messages
+    assert list(resp.iter_raw()) == [m.SerializeToString() for m in messages]
+
+
+def test_native_response_output_raw_from_bytes():
+    data = [Value(string_value="a").SerializeToString()]
+    resp = RpcNativeResponse(MagicMock(spec=grpc.Channel), iter(data), output="raw", message_type=Value)
+    assert resp.payloads == data
+    assert list(resp.iter_messages()) == [Value(string_value="a")]
+    assert list(resp.iter_payloads()) == data
+
+
+def test_native_response_iter_messages_streams():
+    messages = [Value(string_value="a")]
+    resp = RpcNativeResponse(MagicMock(spec=grpc.Channel), iter(messages))
+    assert list(resp.iter_messages()) == messages
+    assert not resp._payloads_ready
+
+
+def test_native_response_iter_messages_builds_from_raw():
+    data = [Value(string_value="a").SerializeToString()]
+    resp = RpcNativeResponse(MagicMock(spec=grpc.Channel), iter(data), message_type=Value)
+    with patch("pyease_grpc.rpc_response._protocol.parse_message") as mock_parse:
+        assert list(resp.iter_messages()) == [Value(string_value="a")]
+    mock_parse.assert_not_called()
+
+
+@pytest.mark.parametrize("read", ["iter_messages", "iter_raw"])
+def test_native_response_consumed_stream_raises(read):
+    resp = RpcNativeResponse(MagicMock(spec=grpc.Channel), iter([Value(string_value="a")]))
+    assert len(list(getattr(resp, read)())) == 1
+    with pytest.raises(ValueError, match="already been consumed"):
+        resp.payloads
+    with pytest.raises(ValueError, match="already been consumed"):
+        list(getattr(resp, read)())
+
+
+@pytest.mark.parametrize("read", ["iter_messages", "iter_raw"])
+@patch("pyease_grpc.rpc_response_web._protocol.unwrap_message_stream")
+def test_web_response_consumed_stream_raises(mock_unwrap, read):
+    mock_unwrap.return_value = _value_frames("a")
+    resp = RpcWebResponse(_value_method(), MagicMock(status_code=200))
+    assert len(list(getattr(resp, read)())) == 1
+    with pytest.raises(ValueError, match="already been consumed"):
+        resp.payloads
+
+
+def test_response_invalid_output_raises():
+    with pytest.raises(ValueError, match="Invalid output"):
+        RpcResponse(output="json")
+
+
+# ---------------------------------------------------------------------------
+# Non-retaining responses
+# ---------------------------------------------------------------------------
+
+
+def _native_values(*values, retain=False):
+    messages = iter([Value(string_value=v) for v in values])
+    return RpcNativeResponse(MagicMock(spec=grpc.Channel), messages, output="message", retain=retain)
+
+
+def test_non_retaining_response_reads_once():
+    resp = _native_values("a", "b")
+    assert [m.string_value for m in resp.iter_payloads()] == ["a", "b"]
+    assert resp._payloads == []
+    assert resp.single == Value(string_value="b")
+    with pytest.raises(ValueError, match="not retained"):
+        list(resp.iter_payloads())
+    with pytest.raises(ValueError, match="not retained"):
+        resp.payloads
+
+
+def test_non_retaining_response_single_reads_the_rest():
+    resp = _native_values("a", "b", "c")
+    assert next(resp.iter_payloads()) == Value(string_value="a")
+    assert resp.single == Value(string_value="c")
+    assert _native_values().single is None
+
+
+@patch("pyease_grpc.rpc_response_web._protocol.unwrap_message_stream")
+def test_non_retaining_web_response(mock_unwrap):
+    mock_unwrap.return_value = _value_frames("a", "b")
+    resp = RpcWebResponse(_value_method(), MagicMock(status_code=200), retain=False)
+    assert list(resp.iter_payloads()) == ["a", "b"]
+    assert resp.single == "b"
+    assert resp._payloads == []
+
+
+def test_non_retaining_stream_uses_constant_memory():
+    import tracemalloc
+
+    count = 1_000_000
+    # Every message is a new object, which would be kept if the payloads were retained
+    messages = (b"message %d" % i for i in range(count))
+    resp = RpcNativeResponse(MagicMock(spec=grpc.Channel), messages, output="raw", message_type=Value, retain=False)
+
+    payloads = resp.iter_payloads()
+    for _ in range(1000):
+        next(payloads)
+    # Only the allocations after the warm-up are traced
+    tracemalloc.start()
+    try:
+        for received, _ in enumerate(payloads, 1001):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert received == count
+    assert resp.single == b"message %d" % (count - 1)
+    assert peak < 64 * 1024
+
+
+# ---------------------------------------------------------------------------
+# Prefetch
+# ---------------------------------------------------------------------------
+
+
+class _Stream(object):
+    """A native response iterator that records how far it has been read"""
+
+    def __init__(self, count, error=None, block=False):
+        import threading
+
+        self.count = count
+        self.error = error
+        self.block = block
+        self.read = 0
+        self.threads = set()
+        self.cancelled = threading.Event()
+
+    def __iter__(self):
+        import threading
+
+        for i in range(self.count):
+            self.threads.add(threading.current_thread())
+            if self.cancelled.is_set():
+                raise grpc.RpcError("cancelled")
+            self.read += 1
+            yield Value(string_value=str(i))
+        if self.error is not None:
+            raise self.error
+        if self.block:
+            # waits for more messages until the call is cancelled
+            self.cancelled.wait(5)
+            raise grpc.RpcError("cancelled")
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+def _prefetched(stream, prefetch=2, **kwargs):
+    return RpcNativeResponse(
+        MagicMock(spec=grpc.Channel),
+        iter(stream),
+        release=lambda channel: None,
+        output="message",
+        prefetch=prefetch,
+        **kwargs,
+    )
+
+
+def test_prefetch_reads_ahead_in_background():
+    import threading
+    import time
+
+    stream = _Stream(10)
+    resp = _prefetched(stream, prefetch=3)
+    payloads = resp.iter_payloads()
+    assert next(payloads) == Value(string_value="0")
+    time.sleep(0.2)
+    # one payload consumed, three queued, and one waiting for space in the queue
+    assert stream.read == 5
+    assert threading.current_thread() not in stream.threads
+    assert [p.string_value for p in payloads] == [str(i) for i in range(1, 10)]
+
+
+def test_prefetch_keeps_order_and_payloads():
+    resp = _prefetched(iter([Value(string_value=str(i)) for i in range(100)]), prefetch=4)
+    assert [p.string_value for p in resp.payloads] == [str(i) for i in range(100)]
+    assert resp.single == Value(string_value="99")
+
+
+def test_prefetch_raises_reader_errors():
+    error = grpc.RpcError("broken")
+    resp = _prefetched(_Stream(3, error=error))
+    received = []
+    with pytest.raises(grpc.RpcError) as e:
+        for payload in resp.iter_payloads():
+            received.append(payload.string_value)
+    assert e.value is error
+    assert received == ["0", "1", "2"]
+
+
+@patch("pyease_grpc.rpc_response_web._protocol.unwrap_message_stream")
+def test_prefetch_raises_web_trailer(mock_unwrap):
+    from pyease_grpc.rpc_trailer import RpcTrailer
+
+    frames = [(Value(string_value="a").SerializeToString(), False, False), (b"grpc-status:13\r\n", True, False)]
+    mock_unwrap.return_value = iter(frames)
+    resp = RpcWebResponse(_value_method(), MagicMock(status_code=200), prefetch=2)
+    payloads = resp.iter_payloads()
+    assert next(payloads) == "a"
+    with pytest.raises(RpcTrailer) as e:
+        next(payloads)
+    assert e.value.code() == grpc.StatusCode.INTERNAL
+
+
+def test_prefetch_resumes_after_break():
+    resp = _prefetched(iter([Value(string_value=str(i)) for i in range(5)]), retain=False)
+    for payload in resp.iter_payloads():
+        break
+    assert [p.string_value for p in resp.iter_payloads()] == ["1", "2", "3", "4"]
+
+
+def test_prefetch_stops_when_closed():
+    import time
+
+    stream = _Stream(3, block=True)
+    resp = _prefetched(stream, prefetch=1)
+    payloads = resp.iter_payloads()
+    assert next(payloads) == Value(string_value="0")
+    resp.close()
+    started = time.monotonic()
+    rest = list(payloads)
+    resp._prefetcher._thread.join(1)
+    assert not resp._prefetcher._thread.is_alive()
+    assert time.monotonic() - started < 1
+    assert len(rest) <= 2
+
+
+def test_prefetch_stops_when_dropped():
+    import gc
+    import weakref
+
+    resp = _prefetched(iter([Value(string_value=str(i)) for i in range(100)]), prefetch=1)
+    payloads = resp.iter_payloads()
+    assert next(payloads) == Value(string_value="0")
+    thread = resp._prefetcher._thread
+    ref = weakref.ref(resp)
+    del resp, payloads
+    gc.collect()
+    assert ref() is None
+    thread.join(1)
+    assert not thread.is_alive()
@@ -55,6 +55,18 @@ def test_resolve_wrong_package_raises(session):
         session._resolve_method(_uri(package="wrong.package"))
 
 
+def test_resolve_path(session):
+    paths = RpcSession(session._proto, base_url="localhost:8080/api")
+    method, uri = paths._resolve("/session.test.v1.TestSvc/DoWork")
+    assert method is session._resolve_method(_uri())
+    assert uri.build() == "http://localhost:8080/api/session.test.v1.TestSvc/DoWork"
+    assert uri.path == "/session.test.v1.TestSvc/DoWork"
+    with pytest.raises(ValueError, match="No such method"):
+        paths._resolve("/session.test.v1.TestSvc/Nope")
+    with pytest.raises(ValueError, match="base URL"):
+        session._resolve("/session.test.v1.TestSvc/DoWork")
+
+
 # ---------------------------------------------------------------------------
 # RpcSession construction helpers
 # ---------------------------------------------------------------------------
@@ -67,6 +79,57 @@ def test_from_descriptor(session):
     assert method.method == "DoWork"
 
 
+def test_from_descriptor_passes_options(session):
+    s2 = RpcSession.from_descriptor(session._proto.save(), compression="gzip", text_mode=True)
+    assert s2.compression == "gzip"
+    assert s2.text_mode is True
+
+
+def test_from_file_passes_options():
+    import os
+
+    proto_file = os.path.join(os.path.dirname(__file__), "..", "example", "server", "abc.proto")
+    s2 = RpcSession.from_file(
+        proto_file, compression="gzip", compression_threshold=1024, max_decompressed_size=64 << 20
+    )
+    assert s2.compression == "gzip"
+    assert s2.compression_threshold == 1024
+    assert s2.max_decompressed_size == 64 << 20
+    assert s2._proto.find_method("/pyease.sample.v1.Greeter/SayHello") is not None
+
+
+def test_from_file_passes_channel_options():
+    import os
+
+    proto_file = os.path.join(os.path.dirname(__file__), "..", "example", "server", "abc.proto")
+    with RpcSession.from_file(
+        proto_file,
+        channel_options=[("grpc.keepalive_time_ms", 10000)],
+        subchannels=4,
+        channel_idle_timeout=300,
+    ) as s2:
+        assert s2.channels.options == {"grpc.keepalive_time_ms": 10000}
+        assert s2.channels.subchannels == 4
+        assert s2.channels.idle_timeout == 300
+
+
+def test_from_file_passes_text_mode():
+    import os
+
+    proto_file = os.path.join(os.path.dirname(__file__), "..", "example", "server", "abc.proto")
+    with RpcSession.from_file(proto_file, text_mode=True) as s2:
+        assert s2.text_mode is True
+
+
+@pytest.mark.parametrize("output", ["message", "view"])
+def test_from_file_passes_output(output):
+    import os
+
+    proto_file = os.path.join(os.path.dirname(__file__), "..", "example", "server", "abc.proto")
+    with RpcSession.from_file(proto_file, output=output) as s2:
+        assert s2.output == output
+
+
 def test_context_manager_closes_session():
     fds = make_fds("session_cm_test.proto", package="session.cm.v1")
     from unittest.mock import patch
@@ -82,3 +145,360 @@ def test_session_property_returns_requests_session(session):
     from requests import Session
 
     assert isinstance(session.session, Session)
+
+
+def test_session_chunk_size_defaults_to_length_directed(session):
+    assert session.chunk_size is None
+
+
+def test_session_chunk_size_override():
+    fds = make_fds("session_chunk_test.proto", package="session.chunk.v1")
+    assert RpcSession(Protobuf(fds), chunk_size=4096).chunk_size == 4096
+
+
+# ---------------------------------------------------------------------------
+# Compression
+# ---------------------------------------------------------------------------
+
+
+def _post_request(session, data, **kwargs):
+    from unittest.mock import MagicMock, patch
+
+    with patch.object(session._session, "post") as mock_post:
+        mock_post.return_value = MagicMock(headers={})
+        session.request(_uri(), data, **kwargs)
+    return mock_post.call_args.kwargs
+
+
+def test_request_advertises_accepted_encodings(session):
+    headers = _post_request(session, {"value": "x"})["headers"]
+    assert set(headers["grpc-accept-encoding"].split(",")) >= {"identity", "gzip", "deflate"}
+    assert "grpc-encoding" not in headers
+
+
+def test_request_compresses_large_messages(session):
+    from pyease_grpc._protocol import unwrap_message
+    from pyease_grpc.rpc_codec import get_codec
+
+    gzip_session = RpcSession(session._proto, compression="gzip", compression_threshold=100)
+    kwargs = _post_request(gzip_session, {"value": "x" * 1000})
+    assert kwargs["headers"]["grpc-encoding"] == "gzip"
+    data, _, compressed = unwrap_message(kwargs["data"])
+    assert compressed
+    assert len(data) < 100
+    message = gzip_session._resolve_method(_uri()).request.FromString(get_codec("gzip").decompress(data))
+    assert message.value == "x" * 1000
+
+
+def test_request_skips_compression_below_threshold(session):
+    from pyease_grpc._protocol import unwrap_message
+
+    gzip_session = RpcSession(session._proto, compression="gzip", compression_threshold=100)
+    kwargs = _post_request(gzip_session, {"value": "small"})
+    assert kwargs["headers"]["grpc-encoding"] == "gzip"
+    _, _, compressed = unwrap_message(kwargs["data"])
+    assert not compressed
+
+
+def test_request_identity_compression_is_not_flagged(session):
+    from unittest.mock import MagicMock, patch
+
+    from pyease_grpc._protocol import unwrap_message
+
+    identity_session = RpcSession(session._proto, compression="identity", compression_threshold=0)
+    kwargs = _post_request(identity_session, {"value": "x" * 1000})
+    assert kwargs["data"][0] == 0
+    data, _, compressed = unwrap_message(kwargs["data"])
+    assert not compressed
+    assert identity_session._resolve_method(_uri()).request.FromString(data).value == "x" * 1000
+
+    stub = identity_session.stub("session.test.v1.TestSvc", "http://localhost")
+    with patch.object(identity_session._session, "post") as mock_post:
+        mock_post.return_value = MagicMock(headers={})
+        stub.DoWork({"value": "x" * 1000})
+    assert mock_post.call_args.kwargs["data"][0] == 0
+
+
+def test_unknown_compression_raises(session):
+    with pytest.raises(ValueError, match="No such codec"):
+        RpcSession(session._proto, compression="no-such-codec")
+
+
+# ---------------------------------------------------------------------------
+# grpc-web-text
+# ---------------------------------------------------------------------------
+
+
+def test_request_binary_mode_by_default(session):
+    kwargs = _post_request(session, {"value": "x"})
+    assert kwargs["headers"]["content-type"] == "application/grpc-web+proto"
+
+
+def test_request_text_mode_encodes_body(session):
+    import base64
+
+    from pyease_grpc._protocol import unwrap_message
+
+    kwargs = _post_request(session, {"value": "text"}, text_mode=True)
+    assert kwargs["headers"]["content-type"] == "application/grpc-web-text"
+    assert kwargs["headers"]["accept"] == "application/grpc-web-text"
+    data, _, _ = unwrap_message(base64.b64decode(kwargs["data"]))
+    assert session._resolve_method(_uri()).request.FromString(data).value == "text"
+
+
+def test_session_text_mode_default(session):
+    text_session = RpcSession(session._proto, text_mode=True)
+    kwargs = _post_request(text_session, {"value": "x"})
+    assert kwargs["headers"]["content-type"] == "application/grpc-web-text"
+    kwargs = _post_request(text_session, {"value": "x"}, text_mode=False)
+    assert kwargs["headers"]["content-type"] == "application/grpc-web+proto"
+
+
+# ---------------------------------------------------------------------------
+# Message and bytes input
+# ---------------------------------------------------------------------------
+
+
+def test_request_accepts_message_and_bytes(session):
+    from pyease_grpc._protocol import unwrap_message
+
+    request_type = session._resolve_method(_uri()).request
+    message = request_type(value="msg")
+    for data in [{"value": "msg"}, message, message.SerializeToString()]:
+        body = _post_request(session, data)["data"]
+        assert unwrap_message(body)[0] == message.SerializeToString()
+
+
+def test_call_accepts_message_and_bytes(native_server):
+    proto, target = native_server
+    request_type = proto.messages["native.test.v1.Request"]
+    with RpcSession(proto) as session:
+        unary = RpcUri(target, "native.test.v1", "TestService", "Unary")
+        assert session.call(unary, request_type(value="m")).single == {"result": "Hello, m!"}
+        assert session.call(unary, request_type(value="b").SerializeToString()).single == {"result": "Hello, b!"}
+
+        stream = RpcUri(target, "native.test.v1", "TestService", "ClientStream")
+        data = [{"value": "a"}, request_type(value="b"), request_type(value="c").SerializeToString()]
+        assert session.call(stream, iter(data)).single == {"result": "a, b, c"}
+
+
+def test_call_rejects_wrong_message_type(native_server):
+    proto, target = native_server
+    with RpcSession(proto) as session:
+        unary = RpcUri(target, "native.test.v1", "TestService", "Unary")
+        with pytest.raises(TypeError):
+            session.call(unary, proto.messages["native.test.v1.Response"](result="x"))
+
+
+# ---------------------------------------------------------------------------
+# Field selection
+# ---------------------------------------------------------------------------
+
+
+def test_request_invalid_fields_raise_before_sending(session):
+    from unittest.mock import patch
+
+    with patch.object(session._session, "post") as mock_post:
+        with pytest.raises(ValueError, match="No such field"):
+            session.request(_uri(), {"value": "x"}, fields=["missing"])
+    mock_post.assert_not_called()
+
+
+def test_call_selects_fields(native_server):
+    proto, target = native_server
+    with RpcSession(proto) as session:
+        unary = RpcUri(target, "native.test.v1", "TestService", "Unary")
+        assert session.call(unary, {"value": "x"}, fields=["result"]).single == {"result": "Hello, x!"}
+        assert session.call(unary, {"value": "x"}, fields=[]).single == {}
+
+        stream = RpcUri(target, "native.test.v1", "TestService", "ServerStream")
+        response = session.call(stream, {"value": "s"})
+        assert list(response.iter_payloads(fields=[])) == [{}, {}, {}]
+        assert not response._payloads_ready
+
+        with session.stub("native.test.v1.TestService", target, native=True) as stub:
+            assert stub.Unary({"value": "y"}, fields=["result"]).single == {"result": "Hello, y!"}
+            with pytest.raises(ValueError, match="Can not select fields of result"):
+                stub.Unary({"value": "y"}, fields=["result.x"])
+
+        with pytest.raises(ValueError, match="No such field"):
+            session.call(unary, {"value": "x"}, fields=["missing"])
+        assert all(entry.active == 0 for entry in session.channels._entries.values())
+
+
+def test_fields_require_dict_output(native_server):
+    proto, target = native_server
+    with RpcSession(proto, output="message") as session:
+        unary = RpcUri(target, "native.test.v1", "TestService", "Unary")
+        with pytest.raises(ValueError, match="dict output"):
+            session.call(unary, {"value": "x"}, fields=["result"])
+
+
+# ---------------------------------------------------------------------------
+# Non-retaining responses
+# ---------------------------------------------------------------------------
+
+
+def test_retain_per_session_and_call(native_server):
+    proto, target = native_server
+    stream = RpcUri(target, "native.test.v1", "TestService", "ServerStream")
+    with RpcSession(proto, retain=False) as session:
+        response = session.call(stream, {"value": "s"})
+        assert [p["result"] for p in response.iter_payloads()] == ["s 0", "s 1", "s 2"]
+        assert response.single == {"result": "s 2"}
+        with pytest.raises(ValueError, match="not retained"):
+            response.payloads
+        assert len(session.call(stream, {"value": "s"}, retain=True).payloads) == 3
+
+        with session.stub("native.test.v1.TestService", target, native=True) as stub:
+            assert not stub.ServerStream({"value": "s"}).retain
+            assert stub.ServerStream({"value": "s"}, retain=True).retain
+
+
+def test_request_retain(session):
+    from unittest.mock import MagicMock, patch
+
+    with patch.object(session._session, "post") as mock_post:
+        mock_post.return_value = MagicMock(headers={})
+        assert session.request(_uri(), {"value": "x"}).retain
+        assert not session.request(_uri(), {"value": "x"}, retain=False).retain
+        stub = session.stub("session.test.v1.TestSvc", "http://localhost")
+        assert not stub.DoWork({"value": "x"}, retain=False).retain
+
+
+# ---------------------------------------------------------------------------
+# Prefetch
+# ---------------------------------------------------------------------------
+
+
+def test_call_prefetch(native_server):
+    proto, target = native_server
+    with RpcSession(proto) as session:
+        stream = RpcUri(target, "native.test.v1", "TestService", "ServerStream")
+        response = session.call(stream, {"value": "s"}, prefetch=2)
+        assert response.prefetch == 2
+        assert [p["result"] for p in response.payloads] == ["s 0", "s 1", "s 2"]
+
+        with session.stub("native.test.v1.TestService", target, native=True) as stub:
+            response = stub.ServerStream({"value": "t"}, prefetch=1, retain=False)
+            assert [p["result"] for p in response.iter_payloads()] == ["t 0", "t 1", "t 2"]
+
+
+# ---------------------------------------------------------------------------
+# HTTP connection pool
+# ---------------------------------------------------------------------------
+
+
+def test_session_pool_options(session):
+    import socket
+
+    options = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    pooled = RpcSession(session._proto, pool_connections=4, pool_maxsize=32, pool_block=True, socket_options=options)
+    adapter = pooled.session.get_adapter("https://localhost")
+    assert adapter is pooled.session.get_adapter("http://localhost")
+    kwargs = adapter.poolmanager.connection_pool_kw
+    assert (adapter.poolmanager.pools._maxsize, kwargs["maxsize"], kwargs["block"]) == (4, 32, True)
+    assert options[0] in kwargs["socket_options"]
+    assert (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) in kwargs["socket_options"]
+    assert pooled.session.headers["Connection"] == "keep-alive"
+    assert (
+        "socket_options"
+        not in RpcSession(session._proto).session.get_adapter("http://x").poolmanager.connection_pool_kw
+    )
+
+
+def test_session_without_keep_alive(session):
+    assert RpcSession(session._proto, keep_alive=False).session.headers["Connection"] == "close"
+
+
+def test_thread_safe_session_uses_session_per_thread(session):
+    import threading
+
+    safe = RpcSession(session._proto, thread_safe=True)
+    safe.session.headers["authorization"] = "x"
+    safe.session.verify = False
+    assert safe._http_session() is safe.session
+
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.extend([safe._http_session(), safe._http_session()]))
+    thread.start()
+    thread.join()
+    other, again = sessions
+    assert other is again
+    assert other is not safe.session
+    assert other.headers["authorization"] == "x"
+    assert other.verify is False
+    assert other.cookies is safe.session.cookies
+    assert other.get_adapter("http://localhost") is safe.session.get_adapter("http://localhost")
+
+    shared = RpcSession(session._proto)
+    thread = threading.Thread(target=lambda: sessions.append(shared._http_session()))
+    thread.start()
+    thread.join()
+    assert sessions[-1] is shared.session
+
+
+def _grpc_web_server(response_type, delay=0.002):
+    """Serves gRPC-Web responses over HTTP/1.1 keep-alive connections. Counts the connections."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import threading
+    import time
+
+    from pyease_grpc._protocol import wrap_message
+
+    body = wrap_message(response_type(result="ok").SerializeToString())
+    body += wrap_message(b"grpc-status:0\r\n", trailer=True)
+    connections = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+        wbufsize = 1 << 16
+
+        def setup(self):
+            super().setup()
+            connections.append(self.client_address)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/grpc-web+proto")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, connections
+
+
+@pytest.mark.parametrize("thread_safe", [False, True])
+def test_session_pool_reuses_connections_across_threads(session, thread_safe, caplog):
+    server, connections = _grpc_web_server(session._proto.messages["session.test.v1.Response"])
+    try:
+        uri = RpcUri(f"http://127.0.0.1:{server.server_port}", "session.test.v1", "TestSvc", "DoWork")
+        with RpcSession(session._proto, pool_maxsize=16, thread_safe=thread_safe) as pooled:
+            results = list(pooled.request_many([(uri, {"value": "x"})] * 320, concurrency=16))
+        assert all(r.single == {"result": "ok"} for r in results)
+        assert len(connections) <= 16
+        assert "Connection pool is full" not in caplog.text
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_request_path(session):
+    server, _ = _grpc_web_server(session._proto.messages["session.test.v1.Response"], delay=0)
+    try:
+        with RpcSession(session._proto, base_url=f"http://127.0.0.1:{server.server_port}") as paths:
+            response = paths.request("/session.test.v1.TestSvc/DoWork", {"value": "x"})
+            assert response.single == {"result": "ok"}
+            assert response.response.url.endswith("/session.test.v1.TestSvc/DoWork")
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,389 @@
+"""Tests for pyease_grpc/rpc_session_async.py — asyncio gRPC-Web client."""
+
+import asyncio
+import base64
+
+import pytest
+from requests.exceptions import HTTPError
+
+from pyease_grpc._protocol import unwrap_message, wrap_message
+from pyease_grpc.protobuf import Protobuf
+from pyease_grpc.rpc_codec import get_codec
+from pyease_grpc.rpc_session_async import AsyncRpcSession
+from pyease_grpc.rpc_trailer import RpcTrailer
+from pyease_grpc.rpc_transport import AsyncHttpTransport
+from pyease_grpc.rpc_uri import RpcUri
+
+from .conftest import make_fds
+
+# ---------------------------------------------------------------------------
+# In-process gRPC-Web server
+# ---------------------------------------------------------------------------
+
+
+class _WebServer(object):
+    """Answers every request with ``handler(headers, body) -> (status, headers, frames)``.
+
+    The frames may be an async iterable, and are sent with chunked transfer encoding.
+    """
+
+    def __init__(self, handler, chunked: bool = True, interim: bool = False) -> None:
+        self.handler = handler
+        self.chunked = chunked
+        self.interim = interim
+        self.requests = []
+        self.connections = 0
+        self.closed = asyncio.Event()
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *_):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        self.connections += 1
+        self.reader = reader
+        try:
+            while True:
+                if not await reader.readline():
+                    break
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode().strip()
+                    if not line:
+                        break
+                    key, _, value = line.partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers["content-length"]))
+                self.requests.append((headers, body))
+                status, response_headers, frames = self.handler(headers, body)
+                await self._respond(writer, status, response_headers, frames)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            self.closed.set()
+
+    async def _respond(self, writer, status, headers, frames):
+        if not hasattr(frames, "__aiter__"):
+            frames = _aiter(frames)
+        if self.interim:
+            writer.write(_head(100, {}) + _head(103, {"Link": "</style.css>; rel=preload"}))
+        if self.chunked:
+            headers = dict(headers, **{"Transfer-Encoding": "chunked"})
+            writer.write(_head(status, headers))
+            async for frame in frames:
+                writer.write(b"%x\r\n%s\r\n" % (len(frame), frame))
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+        else:
+            body = b"".join([frame async for frame in frames])
+            writer.write(_head(status, dict(headers, **{"Content-Length": str(len(body))})))
+            writer.write(body)
+        await writer.drain()
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+def _head(status, headers):
+    lines = [f"HTTP/1.1 {status} Status"] + [f"{k}: {v}" for k, v in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+
+_WEB_HEADERS = {"Content-Type": "application/grpc-web+proto"}
+_OK_TRAILER = wrap_message(b"grpc-status:0\r\n", trailer=True)
+
+
+@pytest.fixture(scope="module")
+def proto():
+    fds = make_fds("session_async_test.proto", package="session.async.v1", server_streaming=True)
+    return Protobuf(fds)
+
+
+def _uri(url):
+    return RpcUri(url, "session.async.v1", "TestService", "DoIt")
+
+
+def _reply(proto, *results):
+    response = proto.messages["session.async.v1.Response"]
+    return [wrap_message(response(result=r).SerializeToString()) for r in results]
+
+
+def _echo(proto, count=1):
+    request = proto.messages["session.async.v1.Request"]
+
+    def handler(headers, body):
+        value = request.FromString(unwrap_message(body)[0]).value
+        return 200, _WEB_HEADERS, _reply(proto, *[f"{value} {i}" for i in range(count)]) + [_OK_TRAILER]
+
+    return handler
+
+
+# ---------------------------------------------------------------------------
+# request
+# ---------------------------------------------------------------------------
+
+
+def test_request_unary(proto):
+    async def main():
+        async with _WebServer(_echo(proto)) as server:
+            async with AsyncRpcSession(proto) as session:
+                response = await session.request(_uri(server.url), {"value": "hello"})
+                assert await response.single() == {"result": "hello 0"}
+                headers = server.requests[0][0]
+                assert headers["content-type"] == "application/grpc-web+proto"
+                assert headers["x-grpc-web"] == "1"
+
+    asyncio.run(main())
+
+
+def test_request_string_uri(proto):
+    async def main():
+        async with _WebServer(_echo(proto)) as server:
+            async with AsyncRpcSession(proto) as session:
+                response = await session.request(_uri(server.url).build(), {"value": "str"})
+                assert await response.payloads() == [{"result": "str 0"}]
+
+    asyncio.run(main())
+
+
+def test_request_server_stream(proto):
+    async def main():
+        async with _WebServer(_echo(proto, count=3)) as server:
+            async with AsyncRpcSession(proto) as session:
+                response = await session.request(_uri(server.url), {"value": "s"})
+                results = [payload["result"] async for payload in response.iter_payloads()]
+                assert results == ["s 0", "s 1", "s 2"]
+                # Cached after the first iteration
+                assert len(await response.payloads()) == 3
+
+    asyncio.run(main())
+
+
+def test_request_content_length_body(proto):
+    async def main():
+        async with _WebServer(_echo(proto, count=2), chunked=False) as server:
+            async with AsyncRpcSession(proto) as session:
+                response = await session.request(_uri(server.url), {"value": "cl"})
+                assert len(await response.payloads()) == 2
+
+    asyncio.run(main())
+
+
+def test_request_reuses_connection(proto):
+    async def main():
+        async with _WebServer(_echo(proto)) as server:
+            async with AsyncRpcSession(proto) as session:
+                for _ in range(3):
+                    response = await session.request(_uri(server.url), {"value": "x"})
+                    await response.payloads()
+            assert server.connections == 1
+
+    asyncio.run(main())
+
+
+def test_request_concurrent(proto):
+    async def main():
+        async with _WebServer(_echo(proto)) as server:
+            async with AsyncRpcSession(proto) as session:
+
+                async def one(i):
+                    response = await session.request(_uri(server.url), {"value": str(i)})
+                    return (await response.single())["result"]
+
+                results = await asyncio.gather(*[one(i) for i in range(50)])
+                assert results == [f"{i} 0" for i in range(50)]
+
+    asyncio.run(main())
+
+
+def test_request_error_trailer_raises(proto):
+    def handler(headers, body):
+        trailer = wrap_message(b"grpc-status:3\r\ngrpc-message:bad", trailer=True)
+        return 200, _WEB_HEADERS, _reply(proto, "x") + [trailer]
+
+    async def main():
+        async with _WebServer(handler) as server:
+            async with AsyncRpcSession(proto) as session:
+                response = await session.request(_uri(server.url), {"value": "x"})
+                with pytest.raises(RpcTrailer) as e:
+                    await response.payloads()
+                assert e.value.details() == "bad"
+
+    asyncio.run(main())
+
+
+def test_request_header_trailer_raises(proto):
+    def handler(headers, body):
+        return 200, dict(_WEB_HEADERS, **{"grpc-status": "5", "grpc-message": "missing"}), []
+
+    async def main():
+        async with _WebServer(handler) as server:
+            async with AsyncRpcSession(proto) as session:
+                with pytest.raises(RpcTrailer):
+                    await session.request(_uri(server.url), {"value": "x"})
+
+    asyncio.run(main())
+
+
+def test_request_http_error_raises(proto):
+    async def main():
+        async with _WebServer(lambda h, b: (503, {}, [])) as server:
+            async with AsyncRpcSession(proto) as session:
+                with pytest.raises(HTTPError):
+                    await session.request(_uri(server.url), {"value": "x"})
+
+    asyncio.run(main())
+
+
+def test_request_text_mode(proto):
+    def handler(headers, body):
+        frames = _reply(proto, "a", "b") + [_OK_TRAILER]
+        assert unwrap_message(base64.b64decode(body))
+        return 200, {"Content-Type": "application/grpc-web-text"}, [base64.b64encode(f) for f in frames]
+
+    async def main():
+        async with _WebServer(handler) as server:
+            async with AsyncRpcSession(proto, text_mode=True) as session:
+                response = await session.request(_uri(server.url), {"value": "x"})
+                assert await response.payloads() == [{"result": "a"}, {"result": "b"}]
+                assert server.requests[0][0]["content-type"] == "application/grpc-web-text"
+
+    asyncio.run(main())
+
+
+def test_request_compressed_response(proto):
+    def handler(headers, body):
+        message = proto.messages["session.async.v1.Response"](result="zipped").SerializeToString()
+        frame = wrap_message(get_codec("gzip").compress(message), compressed=True)
+        return 200, dict(_WEB_HEADERS, **{"grpc-encoding": "gzip"}), [frame, _OK_TRAILER]
+
+    async def main():
+        async with _WebServer(handler) as server:
+            async with AsyncRpcSession(proto) as session:
+                response = await session.request(_uri(server.url), {"value": "x"})
+                assert await response.single() == {"result": "zipped"}
+
+    asyncio.run(main())
+
+
+def test_request_cancellation_closes_connection(proto):
+    async def main():
+        first = asyncio.Event()
+
+        async def frames():
+            yield _reply(proto, "first")[0]
+            await server.reader.read()  # returns when the client closes the connection
+
+        async with _WebServer(lambda h, b: (200, _WEB_HEADERS, frames())) as server:
+            async with AsyncRpcSession(proto) as session:
+
+                async def consume():
+                    response = await session.request(_uri(server.url), {"value": "x"})
+                    async for _ in response.iter_payloads():
+                        first.set()
+
+                task = asyncio.ensure_future(consume())
+                await asyncio.wait_for(first.wait(), 5)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+                await asyncio.wait_for(server.closed.wait(), 5)
+
+    asyncio.run(main())
+
+
+def test_request_timeout(proto):
+    async def main():
+        async def handler_frames():
+            await asyncio.Event().wait()
+            yield b""
+
+        server_handler = lambda h, b: (200, _WEB_HEADERS, handler_frames())  # noqa: E731
+        async with _WebServer(server_handler, chunked=False) as server:
+            async with AsyncRpcSession(proto) as session:
+                with pytest.raises(asyncio.TimeoutError):
+                    await session.request(_uri(server.url), {"value": "x"}, timeout=0.2)
+
+    asyncio.run(main())
+
+
+def test_request_skips_interim_responses(proto):
+    async def main():
+        async with _WebServer(_echo(proto), interim=True) as server:
+            async with AsyncRpcSession(proto) as session:
+                response = await session.request(_uri(server.url), {"value": "hello"})
+                assert response.headers.get("link") is None
+                assert await response.single() == {"result": "hello 0"}
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [{"x-value": "a\r\nx-injected: b"}, {"x-value": "a\nb"}, {"x-value": "a\0b"}, {"x-name\r\n": "a"}],
+)
+def test_transport_rejects_invalid_headers(headers):
+    from pyease_grpc.rpc_transport import AsyncioHttpTransport
+
+    async def main():
+        transport = AsyncioHttpTransport()
+        with pytest.raises(ValueError, match="Invalid header"):
+            await transport.post("http://127.0.0.1:1/path", b"", headers)
+
+    asyncio.run(main())
+
+
+# ---------------------------------------------------------------------------
+# Pluggable transport
+# ---------------------------------------------------------------------------
+
+
+def test_custom_transport(proto):
+    from requests.structures import CaseInsensitiveDict
+
+    from pyease_grpc.rpc_transport import AsyncHttpResponse
+
+    class MemoryResponse(AsyncHttpResponse):
+        def __init__(self, body):
+            super().__init__(200, "OK", CaseInsensitiveDict(_WEB_HEADERS))
+            self._body = body
+
+        async def read(self, size=-1):
+            data, self._body = self._body[:size], self._body[size:]
+            return data
+
+        async def aclose(self):
+            self._body = b""
+
+    class MemoryTransport(AsyncHttpTransport):
+        def __init__(self):
+            self.urls = []
+
+        async def post(self, url, data, headers, timeout=None):
+            self.urls.append(url)
+            return MemoryResponse(b"".join(_reply(proto, "memory") + [_OK_TRAILER]))
+
+    async def main():
+        transport = MemoryTransport()
+        async with AsyncRpcSession(proto, transport=transport) as session:
+            assert session.transport is transport
+            response = await session.request(_uri("http://memory"), {"value": "x"})
+            assert await response.single() == {"result": "memory"}
+        assert transport.urls == ["http://memory/session.async.v1.TestService/DoIt"]
+
+    asyncio.run(main())
+
+
+def test_resolve_unknown_method_raises(proto):
+    session = AsyncRpcSession(proto)
+    with pytest.raises(ValueError, match="No such method"):
+        session._resolve_method(RpcUri("http://localhost", "session.async.v1", "TestService", "Nope"))
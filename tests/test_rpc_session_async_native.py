@@ -0,0 +1,131 @@
+"""Tests for AsyncRpcSession.call — native gRPC calls with grpc.aio."""
+
+import asyncio
+
+import grpc
+import pytest
+
+from pyease_grpc.rpc_response_native_async import AsyncRpcNativeResponse
+from pyease_grpc.rpc_session_async import AsyncRpcSession
+from pyease_grpc.rpc_uri import RpcUri
+
+
+def _uri(target, method):
+    return RpcUri(target, "native.test.v1", "TestService", method)
+
+
+async def _names(*names):
+    for name in names:
+        await asyncio.sleep(0)
+        yield {"value": name}
+
+
+def test_call_unary(native_server):
+    proto, target = native_server
+
+    async def main():
+        async with AsyncRpcSession(proto) as session:
+            response = await session.call(_uri(target, "Unary"), {"value": "world"})
+            assert isinstance(response, AsyncRpcNativeResponse)
+            assert await response.single() == {"result": "Hello, world!"}
+            assert await response.payloads() == [{"result": "Hello, world!"}]
+
+    asyncio.run(main())
+
+
+def test_call_server_stream(native_server):
+    proto, target = native_server
+
+    async def main():
+        async with AsyncRpcSession(proto) as session:
+            response = await session.call(_uri(target, "ServerStream"), {"value": "s"})
+            results = [payload["result"] async for payload in response.iter_payloads()]
+            assert results == ["s 0", "s 1", "s 2"]
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("make_data", [lambda: _names("A", "B", "C"), lambda: iter([{"value": v} for v in "ABC"])])
+def test_call_client_stream(native_server, make_data):
+    proto, target = native_server
+
+    async def main():
+        async with AsyncRpcSession(proto) as session:
+            response = await session.call(_uri(target, "ClientStream"), make_data())
+            assert await response.single() == {"result": "A, B, C"}
+
+    asyncio.run(main())
+
+
+def test_call_bidi_stream(native_server):
+    proto, target = native_server
+
+    async def main():
+        async with AsyncRpcSession(proto) as session:
+            response = await session.call(_uri(target, "BidiStream"), _names("A", "B"))
+            results = [payload["result"] async for payload in response.iter_payloads()]
+            assert results == ["Hello, A!", "Hello, B!"]
+
+    asyncio.run(main())
+
+
+def test_call_error_raises(native_server):
+    proto, target = native_server
+
+    async def main():
+        async with AsyncRpcSession(proto) as session:
+            response = await session.call(_uri(target, "Unary"), {"value": "error"})
+            with pytest.raises(grpc.RpcError) as e:
+                await response.single()
+            assert e.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+
+    asyncio.run(main())
+
+
+def test_call_concurrent_reuses_channel(native_server):
+    proto, target = native_server
+
+    async def main():
+        async with AsyncRpcSession(proto) as session:
+            responses = await asyncio.gather(
+                *[session.call(_uri(target, "Unary"), {"value": str(i)}) for i in range(200)]
+            )
+            results = await asyncio.gather(*[r.single() for r in responses])
+            assert [r["result"] for r in results] == [f"Hello, {i}!" for i in range(200)]
+            assert list(session._channels) == [target]
+        assert session._channels == {}
+
+    asyncio.run(main())
+
+
+def test_call_with_given_channel(native_server):
+    proto, target = native_server
+
+    async def main():
+        async with grpc.aio.insecure_channel(target) as channel:
+            async with AsyncRpcSession(proto) as session:
+                response = await session.call(_uri(target, "Unary"), {"value": "ch"}, channel=channel)
+                assert (await response.single())["result"] == "Hello, ch!"
+                assert session._channels == {}
+
+    asyncio.run(main())
+
+
+def test_call_aclose_cancels(native_server):
+    proto, target = native_server
+
+    async def main():
+        async with AsyncRpcSession(proto) as session:
+
+            async def forever():
+                yield {"value": "first"}
+                await asyncio.Event().wait()
+
+            response = await session.call(_uri(target, "BidiStream"), forever())
+            async for payload in response.iter_payloads():
+                assert payload["result"] == "Hello, first!"
+                break
+            await response.aclose()
+            assert response.call.cancelled()
+
+    asyncio.run(main())
@@ -0,0 +1,181 @@
+"""Tests for pyease_grpc/rpc_stub.py — bound method stubs of RpcSession."""
+
+from unittest.mock import MagicMock, patch
+
+import grpc
+import pytest
+
+from pyease_grpc import MessageView
+from pyease_grpc._protocol import unwrap_message
+from pyease_grpc.protobuf import Protobuf
+from pyease_grpc.rpc_response_native import RpcNativeResponse
+from pyease_grpc.rpc_session import RpcSession
+from pyease_grpc.rpc_stub import RpcStub
+from pyease_grpc.rpc_uri import RpcUri
+
+from .conftest import make_fds
+
+
+@pytest.fixture(scope="module")
+def proto():
+    return Protobuf(make_fds("stub_test.proto", package="stub.test.v1", service_name="Svc", method_name="Run"))
+
+
+def _post_stub(stub, data, **kwargs):
+    with patch.object(stub.Run._session._session, "post") as mock_post:
+        mock_post.return_value = MagicMock(headers={})
+        stub.Run(data, **kwargs)
+    return mock_post.call_args.kwargs
+
+
+# ---------------------------------------------------------------------------
+# gRPC-Web stub
+# ---------------------------------------------------------------------------
+
+
+def test_web_stub_binds_methods(proto):
+    stub = RpcSession(proto).stub("stub.test.v1.Svc", "localhost:8080")
+    assert isinstance(stub, RpcStub)
+    assert list(stub) == ["Run"]
+    assert stub["Run"] is stub.Run
+    assert stub.Run.url == "http://localhost:8080/stub.test.v1.Svc/Run"
+
+
+def test_web_stub_matches_request(proto):
+    session = RpcSession(proto)
+    stub = session.stub("stub.test.v1.Svc", "http://localhost:8080", headers={"authorization": "x"})
+    kwargs = _post_stub(stub, {"value": "hi"})
+    assert kwargs["url"] == "http://localhost:8080/stub.test.v1.Svc/Run"
+    assert kwargs["headers"]["authorization"] == "x"
+    assert kwargs["headers"]["content-type"] == "application/grpc-web+proto"
+    data, trailer, _ = unwrap_message(kwargs["data"])
+    assert not trailer
+    assert proto.messages["stub.test.v1.Request"].FromString(data).value == "hi"
+
+    with patch.object(session._session, "post") as mock_post:
+        mock_post.return_value = MagicMock(headers={})
+        session.request(stub.Run.url, {"value": "hi"}, headers={"authorization": "x"})
+    expected = mock_post.call_args.kwargs
+    assert expected["headers"] == kwargs["headers"]
+    assert expected["data"] == kwargs["data"]
+
+
+def test_web_stub_reuses_headers(proto):
+    stub = RpcSession(proto).stub("stub.test.v1.Svc", "http://localhost:8080")
+    first = _post_stub(stub, {"value": "a"})["headers"]
+    second = _post_stub(stub, {"value": "b"})["headers"]
+    assert first is second
+
+
+def test_web_stub_call_headers_and_timeout(proto):
+    stub = RpcSession(proto).stub("stub.test.v1.Svc", "http://localhost:8080", headers={"a": "1"})
+    kwargs = _post_stub(stub, {"value": "x"}, headers={"b": "2"}, timeout=1.5)
+    assert kwargs["headers"]["a"] == "1"
+    assert kwargs["headers"]["b"] == "2"
+    assert kwargs["headers"]["grpc-timeout"] == "1500000000n"
+    assert kwargs["timeout"] == 1.5
+    assert "b" not in _post_stub(stub, {"value": "x"})["headers"]
+
+
+def test_web_stub_text_mode(proto):
+    stub = RpcSession(proto, text_mode=True).stub("stub.test.v1.Svc", "http://localhost")
+    assert _post_stub(stub, {"value": "x"})["headers"]["content-type"] == "application/grpc-web-text"
+
+
+def test_web_stub_session_base_url(proto):
+    stub = RpcSession(proto, base_url="http://localhost:8080").stub("stub.test.v1.Svc")
+    assert stub.Run.url == "http://localhost:8080/stub.test.v1.Svc/Run"
+    with pytest.raises(ValueError, match="A base URL is required"):
+        RpcSession(proto).stub("stub.test.v1.Svc")
+
+
+def test_stub_unknown_service_raises(proto):
+    session = RpcSession(proto)
+    with pytest.raises(ValueError, match="No such service"):
+        session.stub("stub.test.v1.Nope", "http://localhost")
+    with pytest.raises(ValueError, match="No such service"):
+        session.stub("other.v1.Svc", "http://localhost")
+
+
+# ---------------------------------------------------------------------------
+# Native stub
+# ---------------------------------------------------------------------------
+
+
+def test_native_stub_calls_all_method_types(native_server):
+    proto, target = native_server
+    with RpcSession(proto) as session:
+        with session.stub("native.test.v1.TestService", target, native=True) as stub:
+            response = stub.Unary({"value": "world"})
+            assert isinstance(response, RpcNativeResponse)
+            assert response.single == {"result": "Hello, world!"}
+            assert len(stub.ServerStream({"value": "s"}).payloads) == 3
+            assert stub.ClientStream(iter([{"value": "a"}, {"value": "b"}])).single == {"result": "a, b"}
+            assert len(stub.BidiStream([{"value": "a"}, {"value": "b"}]).payloads) == 2
+
+
+def test_native_stub_holds_pooled_channel(native_server):
+    proto, target = native_server
+    with RpcSession(proto) as session:
+        stub = session.stub("native.test.v1.TestService", target, native=True)
+        for _ in range(3):
+            response = stub.Unary({"value": "x"})
+            response.close()
+        assert stub.Unary({"value": "y"}).single == {"result": "Hello, y!"}
+        assert response.channel is stub.Unary.channel
+        entry = next(iter(session.channels._entries.values()))
+        assert entry.active == 1
+        stub.close()
+        stub.close()
+        assert entry.active == 0
+
+
+def test_native_stub_error_raises(native_server):
+    proto, target = native_server
+    with RpcSession(proto) as session:
+        stub = session.stub("native.test.v1.TestService", target, native=True)
+        with pytest.raises(grpc.RpcError) as e:
+            stub.Unary({"value": "error"})
+        assert e.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+
+
+# ---------------------------------------------------------------------------
+# Output modes
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("output", ["dict", "view", "message", "raw"])
+def test_native_output_modes(native_server, output):
+    proto, target = native_server
+    response_type = proto.messages["native.test.v1.Response"]
+    expected = {
+        "dict": {"result": "Hello, x!"},
+        "view": {"result": "Hello, x!"},
+        "message": response_type(result="Hello, x!"),
+        "raw": response_type(result="Hello, x!").SerializeToString(),
+    }[output]
+    with RpcSession(proto, output=output) as session:
+        uri = RpcUri(target, "native.test.v1", "TestService", "Unary")
+        assert session.call(uri, {"value": "x"}).single == expected
+        with session.stub("native.test.v1.TestService", target, native=True) as stub:
+            assert stub.Unary({"value": "x"}).single == expected
+            assert list(stub.ServerStream({"value": "s"}).iter_messages())[0] == response_type(result="s 0")
+
+
+def test_web_output_view(proto):
+    response_type = proto.messages["stub.test.v1.Response"]
+    stub = RpcSession(proto, output="view").stub("stub.test.v1.Svc", "http://localhost")
+    frames = [(response_type(result="a").SerializeToString(), False, False), (b"grpc-status:0\r\n", True, False)]
+    with patch("pyease_grpc.rpc_response_web._protocol.unwrap_message_stream", return_value=iter(frames)):
+        with patch.object(stub.Run._session._session, "post") as mock_post:
+            mock_post.return_value = MagicMock(headers={}, status_code=200)
+            response = stub.Run({"value": "x"})
+            payload = response.single
+    assert isinstance(payload, MessageView)
+    assert payload == {"result": "a"}
+    assert list(response.iter_messages()) == [response_type(result="a")]
+
+
+def test_session_invalid_output_raises(proto):
+    with pytest.raises(ValueError, match="Invalid output"):
+        RpcSession(proto, output="json")
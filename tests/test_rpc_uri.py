@@ -83,6 +83,11 @@ def test_path_property():
     assert uri.path == "/my.pkg.MySvc/MyRpc"
 
 
+def test_path_without_package():
+    uri = RpcUri("http://host", "", "MySvc", "MyRpc")
+    assert uri.path == "/MySvc/MyRpc"
+
+
 # ---------------------------------------------------------------------------
 # RpcUri.__str__
 # ---------------------------------------------------------------------------